@@ -0,0 +1,58 @@
+"""Peak RSS of per-task os.environ copies versus shared-base env overlays.
+
+Each mode runs in a fresh interpreter with an inflated environment (hundreds of
+variables, some multi-KB) and builds the env for every task of a generated
+tasks.json, as a full run over the whole file would.
+
+Usage: python benchmarks/bench_env_memory.py [TASKS]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = r"""
+import os, resource, sys
+from taskrun.parser import parse_tasks
+
+mode, root, path = sys.argv[1:]
+tasks, _ = parse_tasks(root, path)
+if mode == "copy":
+    # Previous behaviour: a full os.environ copy per task
+    envs = []
+    for task in tasks:
+        environ = os.environ.copy()
+        environ.update(task.env.maps[0])
+        envs.append(environ)
+else:
+    envs = [task.env for task in tasks]
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    env = dict(os.environ)
+    for i in range(300):
+        env[f"BENCH_VAR_{i}"] = ("x" * 4096) if i % 10 == 0 else f"value-{i}"
+
+    with tempfile.TemporaryDirectory() as root:
+        os.mkdir(os.path.join(root, ".vscode"))
+        path = os.path.join(root, ".vscode", "tasks.json")
+        tasks = [
+            {"label": f"t{i}", "command": "true", "options": {"env": {"TASK": str(i)}}}
+            for i in range(count)
+        ]
+        with open(path, "w") as fh:
+            json.dump({"version": "2.0.0", "tasks": tasks}, fh)
+
+        env["HOME"] = root  # keep the parse cache out of the real home directory
+        for mode in ("copy", "overlay"):
+            out = subprocess.check_output([sys.executable, "-c", CHILD, mode, root, path], env=env)
+            print(f"{mode:<8} {count} tasks: peak RSS {int(out) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Per-keystroke latency of the menu's fuzzy search over a large task list.
+
+Types a few queries one character at a time into a fresh FuzzyIndex over
+generated "group:name-variant" labels, as the menu does while the user types,
+and reports the index build time and the slowest keystroke of each query.
+
+Usage: python benchmarks/bench_fuzzy.py [LABELS]
+"""
+
+import random
+import sys
+import time
+
+from taskrun.fuzzy import FuzzyIndex
+
+WORDS = ["build", "test", "lint", "deploy", "api", "web", "db", "unit", "e2e", "docs"]
+WORDS += ["release", "watch", "clean", "format", "migrate", "bundle"]
+QUERIES = ["build:t", "e2e", "tw", "bdt", "mgr", "xyz"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(1)
+    labels = [
+        f"{rng.choice(WORDS)}:{rng.choice(WORDS)}-{rng.choice(WORDS)}{i}" for i in range(count)
+    ]
+    weights = {label: rng.random() * 5 for label in rng.sample(labels, count // 20)}
+
+    start = time.perf_counter()
+    FuzzyIndex(labels, weights)
+    print(f"{count} labels, index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for query in QUERIES:
+        index = FuzzyIndex(labels, weights)
+        slowest = 0.0
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            matches = index.search(query[:length])
+            slowest = max(slowest, time.perf_counter() - start)
+        print(
+            f"  {query!r:>10}: {len(matches):5d} matches, slowest keystroke {slowest * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
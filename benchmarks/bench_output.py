@@ -0,0 +1,52 @@
+"""Throughput of OutputMux with several chatty tasks writing at once.
+
+Each task is a child process writing compiler-like lines as fast as it can; the
+mux prefixes them and writes to /dev/null, so the figure is the pipeline's own
+ceiling rather than the terminal's.
+
+Usage: python benchmarks/bench_output.py [TASKS] [MB_PER_TASK]
+"""
+
+import subprocess
+import sys
+import time
+
+from taskrun.output import OutputMux
+
+CHILD = r"""
+import os, sys
+line = b"src/module/file.c:123:45: warning: unused variable 'x' [-Wunused-variable]\n"
+block = line * (65536 // len(line))
+for _ in range(int(sys.argv[1]) * 1024 * 1024 // len(block)):
+    os.write(1, block)
+"""
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    megabytes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with open("/dev/null", "wb") as sink:
+        start = time.perf_counter()
+        with OutputMux(out=sink, err=sink) as mux:
+            children = []
+            for i in range(count):
+                piped = mux.attach(f"task-{i}")
+                children.append(
+                    subprocess.Popen(
+                        [sys.executable, "-c", CHILD, str(megabytes)],
+                        stdout=piped.stdout,
+                        stderr=piped.stderr,
+                    )
+                )
+                piped.close_child_ends()
+            for child in children:
+                child.wait()
+        elapsed = time.perf_counter() - start
+
+    total = count * megabytes
+    print(f"{count} tasks x {megabytes} MiB: {elapsed:.2f}s, {total / elapsed:.0f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the tasks.json parser tiers on small, medium and multi-megabyte files.
+
+Usage: python benchmarks/bench_parse.py  (json5 on the large file takes a minute or two)
+"""
+
+import json
+import time
+
+import json5
+
+from taskrun.jsonc import loads, strip_jsonc
+
+SIZES = {"small": 10, "medium": 500, "large": 12000}
+
+
+def make_tasks(count):
+    return {
+        "version": "2.0.0",
+        "tasks": [
+            {
+                "label": f"service-{i}:build",
+                "type": "shell",
+                "command": f"make -C services/{i} build",
+                "args": ["--jobs", "${env:JOBS}", f"TARGET=${{workspaceFolder}}/out/{i}"],
+                "dependsOn": [f"service-{i - 1}:build"] if i else [],
+                "options": {"cwd": "${workspaceFolder}", "env": {"SERVICE": str(i)}},
+                "problemMatcher": ["$gcc"],
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def as_jsonc(data):
+    """Render data as JSONC: comments before each task plus trailing commas."""
+    text = json.dumps(data, indent=2)
+    text = text.replace('    {\n      "label"', '    // generated task\n    {\n      "label"')
+    return text.replace("\n    }", ",\n    }")
+
+
+def best_of(func, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'size':<8}{'bytes':>11}  {'json':>9}  {'jsonc':>9}  {'json5':>9}  tier")
+    for name, count in SIZES.items():
+        data = make_tasks(count)
+        text = as_jsonc(data)
+        repeat = 1 if name == "large" else 5
+        strict = json.dumps(data)
+        t_json = best_of(json.loads, strict, repeat * 4)
+        t_jsonc = best_of(lambda s: json.loads(strip_jsonc(s)), text, repeat * 4)
+        t_json5 = best_of(json5.loads, text, repeat)
+        _, tier = loads(text)
+        print(
+            f"{name:<8}{len(text):>11}  {t_json * 1e3:>7.2f}ms  {t_jsonc * 1e3:>7.2f}ms"
+            f"  {t_json5 * 1e3:>7.1f}ms  {tier}"
+        )
+
+
+if __name__ == "__main__":
+    main()
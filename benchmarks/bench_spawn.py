@@ -0,0 +1,44 @@
+"""Cost of starting a trivial task: /bin/sh -c through subprocess versus posix_spawn.
+
+Runs a shell task whose command is plain words ("ls -d .") many times through
+Task.execute, once with the direct-spawn fast path and once with it disabled,
+so the difference is the shell process plus subprocess's own setup.
+
+Usage: python benchmarks/bench_spawn.py [RUNS]
+"""
+
+import os
+import sys
+import time
+
+from taskrun import task as task_module
+from taskrun.task import Task
+
+
+def _time(runs):
+    cwd = os.getcwd()
+    task = Task("t", "ls -d .", [], cwd, None, "shell", [], "parallel", cwd, False)
+    with open(os.devnull, "w") as sink:
+        stdout = sys.stdout
+        sys.stdout = sink  # the "Running task" lines
+        try:
+            start = time.perf_counter()
+            for _ in range(runs):
+                task.execute(stdout=sink.fileno())
+            return time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    direct = _time(runs)
+    task_module.shell_argv = lambda command: None  # always go through /bin/sh
+    shell = _time(runs)
+    print(f"{runs} runs of an 'ls -d .' shell task")
+    print(f"  posix_spawn, no shell: {direct / runs * 1e6:8.0f} us per task")
+    print(f"  subprocess + /bin/sh:  {shell / runs * 1e6:8.0f} us per task")
+
+
+if __name__ == "__main__":
+    main()
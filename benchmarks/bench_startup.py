@@ -0,0 +1,58 @@
+"""Import-time budget for the CLI, measured with ``python -X importtime``.
+
+Reports the cumulative import time of taskrun.cli (best of N runs) and the slowest
+modules it pulls in, and exits non-zero if the budget is exceeded.
+
+Usage: python benchmarks/bench_startup.py [--budget-ms 35] [--runs 10]
+
+The default budget fits a typical developer machine; CI runners may need their own.
+"""
+
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module):
+    """Return {module: (self_us, cumulative_us)} for one fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=35.0)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="taskrun.cli")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        times = import_times(args.module)
+        if best is None or times[args.module][1] < best[args.module][1]:
+            best = times
+
+    total_ms = best[args.module][1] / 1000
+    print(f"{args.module}: {total_ms:.1f} ms cumulative (budget {args.budget_ms:.1f} ms)")
+    print("slowest modules by self time:")
+    for name, (self_us, _) in sorted(best.items(), key=lambda kv: -kv[1][0])[:10]:
+        print(f"  {self_us / 1000:6.2f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print("FAIL: import budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,17 +17,114 @@ function! s:Executable()
   return get(g:, 'taskrun_executable', 'taskrun')
 endfunction
 
-" Populate completion list from `taskrun --list`
+" Return the socket of a `taskrun --serve` daemon (override with g:taskrun_socket)
+function! s:SocketPath()
+  if exists('g:taskrun_socket')
+    return g:taskrun_socket
+  endif
+  if !empty($TASKRUN_SOCKET)
+    return $TASKRUN_SOCKET
+  endif
+  return expand('~/.cache/taskrun/server.sock')
+endfunction
+
+function! s:NvimOnData(chan, data, name)
+  let s:nvim_reply[-1] .= a:data[0]
+  call extend(s:nvim_reply, a:data[1:])
+endfunction
+
+" Send one request to the daemon; return its response dict, or v:null if the
+" daemon is not running or the request failed (callers then fall back to the CLI)
+function! s:DaemonRequest(request)
+  let l:path = s:SocketPath()
+  if getftype(l:path) !=# 'socket'
+    return v:null
+  endif
+  let l:payload = json_encode(a:request) . "\n"
+  try
+    if has('nvim')
+      let s:nvim_reply = ['']
+      let l:chan = sockconnect('pipe', l:path, {'on_data': function('s:NvimOnData')})
+      call chansend(l:chan, l:payload)
+      call wait(500, {-> len(s:nvim_reply) > 1})
+      call chanclose(l:chan)
+      let l:line = s:nvim_reply[0]
+    elseif has('channel')
+      let l:ch = ch_open('unix:' . l:path, {'mode': 'nl', 'timeout': 500})
+      if ch_status(l:ch) !=# 'open'
+        return v:null
+      endif
+      let l:line = ch_evalraw(l:ch, l:payload)
+      call ch_close(l:ch)
+    else
+      return v:null
+    endif
+    let l:response = json_decode(l:line)
+  catch
+    return v:null
+  endtry
+  if type(l:response) != v:t_dict || !get(l:response, 'ok', 0)
+    return v:null
+  endif
+  return l:response
+endfunction
+
+" Populate completion list from the daemon, or from `taskrun --list`; a typed
+" prefix is matched fuzzily, best match (and most frecent task) first
 function! TaskrunComplete(ArgLead, CmdLine, CursorPos)
-  let l:exe = s:Executable()
-  let l:tasks = systemlist(l:exe . ' --list 2>/dev/null')
+  if a:ArgLead ==# ''
+    let l:request = {'op': 'list', 'cwd': getcwd()}
+    let l:command = ' --list'
+  else
+    let l:request = {'op': 'query', 'cwd': getcwd(), 'query': a:ArgLead}
+    let l:command = ' --query ' . shellescape(a:ArgLead)
+  endif
+  let l:response = s:DaemonRequest(l:request)
+  if type(l:response) == v:t_dict
+    return l:response.labels
+  endif
+  let l:tasks = systemlist(s:Executable() . l:command . ' 2>/dev/null')
   if v:shell_error != 0
     return []
   endif
-  if a:ArgLead ==# ''
-    return l:tasks
+  return l:tasks
+endfunction
+
+" Return the quickfix file dispatched runs write their problems to (override
+" with g:taskrun_quickfix)
+function! s:QuickfixPath()
+  if !exists('s:quickfix')
+    let s:quickfix = get(g:, 'taskrun_quickfix', tempname())
   endif
-  return filter(copy(l:tasks), 'v:val =~# "^" . a:ArgLead')
+  return s:quickfix
+endfunction
+
+" Return the taskrun command line that runs a task and records its problems
+function! s:RunCommand(task)
+  return s:Executable() . ' --quickfix ' . shellescape(s:QuickfixPath())
+        \ . ' --label ' . shellescape(a:task)
+endfunction
+
+" Format of the lines written by `taskrun --quickfix`: file:line:col: severity: message
+let s:errorformat = '%f:%l:%c: %t%*[a-z]: %m,%f:%l: %t%*[a-z]: %m,%f: %t%*[a-z]: %m'
+
+" Load the problems of the last dispatched run into the quickfix list
+function! s:LoadProblems()
+  let l:path = s:QuickfixPath()
+  if !filereadable(l:path)
+    echohl WarningMsg
+    echom 'taskrun: no problems recorded yet'
+    echohl None
+    return
+  endif
+  let l:errorformat = &errorformat
+  try
+    let &errorformat = s:errorformat
+    execute 'cgetfile ' . fnameescape(l:path)
+  finally
+    let &errorformat = l:errorformat
+  endtry
+  cwindow
 endfunction
 
 " Run a task asynchronously via vim-dispatch
@@ -38,8 +135,7 @@ function! s:RunTask(task)
     echohl None
     return
   endif
-  let l:exe = s:Executable()
-  execute 'Dispatch ' . l:exe . ' --label ' . shellescape(a:task)
+  execute 'Dispatch ' . s:RunCommand(a:task)
 endfunction
 
 " Interactively choose a task and dispatch it
@@ -49,7 +145,7 @@ function! s:ChooseAndRun()
   if v:shell_error != 0 || l:choice ==# ''
     return
   endif
-  execute 'Dispatch ' . l:exe . ' --label ' . shellescape(l:choice)
+  execute 'Dispatch ' . s:RunCommand(l:choice)
 endfunction
 
 " :Taskrun <task>   — run a task asynchronously with tab-completion
@@ -64,3 +160,6 @@ command! -bang -nargs=? -complete=customlist,TaskrunComplete Taskrun
       \   echom 'taskrun: no task specified. Usage: :Taskrun <task> or :Taskrun!' |
       \   echohl None |
       \ endif
+
+" :TaskrunProblems  — load the problems the last run's problemMatchers found
+command! TaskrunProblems call s:LoadProblems()
@@ -0,0 +1,62 @@
+import os
+
+# Seconds between re-checks of system pressure while launches are held back
+PRESSURE_POLL_INTERVAL = 0.5
+
+
+def load_average():
+    """Return the 1-minute load average, or None where it is unavailable."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def available_memory_mib(path="/proc/meminfo"):
+    """Return MemAvailable in MiB from /proc/meminfo, or None where it is unavailable."""
+    try:
+        with open(path, "rb") as fh:
+            for line in fh:
+                if line.startswith(b"MemAvailable:"):
+                    return int(line.split()[1]) / 1024  # reported in kB
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Admission:
+    """Decides how many slots a task occupies and when new launches must wait.
+
+    Each task costs one of the run's ``jobs`` slots unless its "taskrun" object
+    declares ``"weight": N`` (N slots) or ``"exclusive": true`` (every slot, so it
+    runs alone). With ``max_load`` and/or ``min_available_mib`` set, no new task
+    starts while the 1-minute load average is above, or available memory below,
+    the threshold, unless nothing is running at all (so a run always progresses).
+    """
+
+    def __init__(self, max_load=None, min_available_mib=None):
+        self.max_load = max_load
+        self.min_available_mib = min_available_mib
+
+    def cost(self, task, jobs):
+        """Return the number of slots (1..jobs) the task occupies while it runs."""
+        extensions = task.extensions
+        if extensions.get("exclusive"):
+            return jobs
+        try:
+            weight = int(extensions.get("weight", 1))
+        except (TypeError, ValueError):
+            weight = 1
+        return min(max(weight, 1), jobs)
+
+    def pressure(self):
+        """Return why launches should be held back right now, or None."""
+        if self.max_load is not None:
+            load = load_average()
+            if load is not None and load > self.max_load:
+                return f"load average {load:.2f} above {self.max_load:g}"
+        if self.min_available_mib is not None:
+            available = available_memory_mib()
+            if available is not None and available < self.min_available_mib:
+                return f"available memory {available:.0f} MiB below {self.min_available_mib:g} MiB"
+        return None
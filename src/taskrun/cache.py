@@ -1,19 +1,64 @@
+import fcntl
 import hashlib
+import heapq
 import json
 import os
 import time
+from contextlib import contextmanager
+from functools import partial
+
+# Size in bytes the run log may reach before it is folded into the JSON snapshot
+COMPACT_THRESHOLD = 64 * 1024
+
+# Weight of the newest sample in a task's moving-average duration
+EWMA_ALPHA = 0.3
+
+# Number of recent durations kept per task, for the 95th-percentile estimate
+DURATION_WINDOW = 20
+
+# Seconds after which a task's runs count half as much towards its frecency
+FRECENCY_HALF_LIFE = 7 * 24 * 3600
+
+
+def cache_dir():
+    """Return (creating it if needed) the directory holding taskrun's cache files."""
+    path = os.path.join(os.path.expanduser("~"), ".cache", "taskrun")
+    os.makedirs(path, exist_ok=True)
+    return path
 
 
 def cache_path(root_dir):
     """Return the path to the cache file for a given project root."""
-    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "taskrun")
-    os.makedirs(cache_dir, exist_ok=True)
     key = hashlib.sha256(root_dir.encode()).hexdigest()[:16]
-    return os.path.join(cache_dir, f"{key}.json")
+    return os.path.join(cache_dir(), f"{key}.json")
 
 
-def load_cache(root_dir):
-    """Load task run history for the given project root."""
+def log_path(root_dir):
+    """Return the path to the append-only run log for a given project root."""
+    return cache_path(root_dir)[: -len(".json")] + ".log"
+
+
+def rank_path(root_dir):
+    """Return the path to the precomputed menu ranking for a given project root."""
+    return cache_path(root_dir)[: -len(".json")] + ".rank"
+
+
+@contextmanager
+def _locked(root_dir, mode):
+    """Hold an flock on the project's lock file.
+
+    Appenders and readers take LOCK_SH, so they never block each other; compaction
+    takes LOCK_EX so it never sees (or discards) a half-applied log.
+    """
+    fd = os.open(cache_path(root_dir)[: -len(".json")] + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, mode)  # raises BlockingIOError if LOCK_NB and contended
+        yield
+    finally:
+        os.close(fd)
+
+
+def _read_snapshot(root_dir):
     path = cache_path(root_dir)
     if os.path.exists(path):
         try:
@@ -24,24 +69,272 @@ def load_cache(root_dir):
     return {"root_dir": root_dir, "tasks": {}}
 
 
-def save_cache(root_dir, cache):
-    """Persist task run history for the given project root."""
-    path = cache_path(root_dir)
+def write_atomic(path, write):
+    """Replace a file atomically so readers see either the old or new file.
+
+    ``write(fh)`` writes the new contents to a text file. Raises OSError, leaving
+    the old file in place, if it could not be written.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        with open(path, "w") as fh:
-            json.dump(cache, fh, indent=2)
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            write(fh)
+        os.replace(tmp_path, path)
     except OSError:
-        pass
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, data, indent=None):
+    """Replace a JSON file atomically; returns False if it could not be written."""
+    try:
+        write_atomic(path, partial(json.dump, data, indent=indent))
+    except OSError:
+        return False
+    return True
+
+
+def _pending_logs(root_dir):
+    """Return log files renamed aside by compaction but possibly not yet deleted."""
+    prefix = os.path.basename(log_path(root_dir)) + "."
+    try:
+        names = os.listdir(cache_dir())
+    except OSError:
+        return []
+    return sorted(name for name in names if name.startswith(prefix))
+
+
+def _read_events(path):
+    """Yield every complete event in a log file."""
+    try:
+        with open(path, "r") as fh:
+            lines = fh.readlines()
+    except OSError:
+        return
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn final line from a crashed writer
+
+
+def _replay(cache, path):
+    """Apply every event in a log file to the cache dict.
+
+    Run events ({"label", "ts"}) count invocations; duration events ({"label",
+    "dur"}) update the task's rolling duration statistics; input events ({"input",
+    "value"}) remember the last answer given for an ${input:ID}.
+    """
+    for event in _read_events(path):
+        if "input" in event:
+            cache.setdefault("inputs", {})[event["input"]] = event["value"]
+            continue
+        stats = cache["tasks"].setdefault(event["label"], {"count": 0, "last_run": None})
+        if "dur" in event:
+            _add_duration(stats, event["dur"])
+            continue
+        stats["count"] += 1
+        stats["last_run"] = max(stats["last_run"] or 0, event["ts"])
+
+
+def _add_duration(stats, seconds):
+    ewma = stats.get("ewma")
+    stats["ewma"] = seconds if ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * ewma
+    stats["durations"] = (stats.get("durations", []) + [seconds])[-DURATION_WINDOW:]
+
+
+def _ranking(cache):
+    """Return [label, last_run] pairs in menu order: most recent first, then by count."""
+    ranked = [
+        (label, stats["last_run"], stats.get("count", 0))
+        for label, stats in cache.get("tasks", {}).items()
+        if stats.get("last_run") is not None
+    ]
+    ranked.sort(key=lambda item: (-item[1], -item[2]))
+    return [[label, last_run] for label, last_run, _ in ranked]
+
+
+def _write_snapshot(root_dir, cache):
+    """Write the ranking, then the snapshot, each atomically."""
+    return write_json(rank_path(root_dir), _ranking(cache)) and write_json(
+        cache_path(root_dir), cache, indent=2
+    )
+
+
+def _load_unlocked(root_dir):
+    cache = _read_snapshot(root_dir)
+    folded = set(cache.pop("folded", []))
+    directory = cache_dir()
+    for name in _pending_logs(root_dir):
+        if name not in folded:
+            _replay(cache, os.path.join(directory, name))
+    _replay(cache, log_path(root_dir))
+    return cache
+
+
+def load_cache(root_dir):
+    """Load task run history for the given project root (snapshot plus run log)."""
+    with _locked(root_dir, fcntl.LOCK_SH):
+        return _load_unlocked(root_dir)
+
+
+def save_cache(root_dir, cache):
+    """Persist task run history for the given project root, replacing any run log."""
+    with _locked(root_dir, fcntl.LOCK_EX):
+        if _write_snapshot(root_dir, cache):
+            for path in [log_path(root_dir)] + [
+                os.path.join(cache_dir(), name) for name in _pending_logs(root_dir)
+            ]:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+def compact_history(root_dir, blocking=True):
+    """Fold the run log into the snapshot.
+
+    The log is first renamed aside under a unique name and the snapshot records that
+    name as folded before the file is deleted, so a crash at any point neither loses
+    nor double-counts runs. With ``blocking=False`` compaction is skipped if another
+    process holds the lock. Returns True if compaction ran.
+    """
+    try:
+        with _locked(root_dir, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)):
+            path = log_path(root_dir)
+            if os.path.exists(path):
+                os.replace(path, f"{path}.{os.urandom(16).hex()}")
+            cache = _load_unlocked(root_dir)
+            pending = _pending_logs(root_dir)
+            cache["folded"] = pending
+            if not _write_snapshot(root_dir, cache):
+                return False
+            for name in pending:
+                try:
+                    os.unlink(os.path.join(cache_dir(), name))
+                except OSError:
+                    pass
+            return True
+    except BlockingIOError:
+        return False
 
 
 def record_task_run(root_dir, label):
-    """Increment the run count and update last_run timestamp for a task."""
+    """Increment the run count and update last_run timestamp for a task.
+
+    Appends one small event line to the run log (a single O_APPEND write, so
+    concurrent recorders never interleave) and compacts once the log grows large.
+    """
+    _append_events(root_dir, [{"label": label, "ts": time.time()}])
+
+
+def record_durations(root_dir, durations):
+    """Add each task's duration (label -> seconds of a successful run) to its history."""
+    if durations:
+        _append_events(root_dir, [{"label": label, "dur": dur} for label, dur in durations.items()])
+
+
+def remember_inputs(root_dir, answers):
+    """Store the answers (input id -> value) given for a project's ${input:ID}s."""
+    if answers:
+        _append_events(root_dir, [{"input": key, "value": value} for key, value in answers.items()])
+
+
+def remembered_inputs(root_dir):
+    """Return the last answer stored for each input id of a project."""
+    return load_cache(root_dir).get("inputs", {})
+
+
+def _append_events(root_dir, events):
+    line = "".join(json.dumps(event) + "\n" for event in events)
+    with _locked(root_dir, fcntl.LOCK_SH):
+        fd = os.open(log_path(root_dir), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    if size > COMPACT_THRESHOLD:
+        compact_history(root_dir, blocking=False)
+
+
+def ranked_labels(root_dir):
+    """Return labels with run history, most recently run first.
+
+    Reads the ranking precomputed at compaction plus the (bounded) run log, so the
+    full stats snapshot is never loaded or sorted. Replaying a log is idempotent for
+    recency, so logs already folded into the ranking may safely be read again.
+    """
+    with _locked(root_dir, fcntl.LOCK_SH):
+        try:
+            with open(rank_path(root_dir), "r") as fh:
+                ranking = json.load(fh)
+        except (json.JSONDecodeError, OSError):
+            # No ranking yet (history predates it): derive it from the snapshot once
+            ranking = _ranking(_read_snapshot(root_dir))
+
+        recent = {}
+        directory = cache_dir()
+        paths = [os.path.join(directory, name) for name in _pending_logs(root_dir)]
+        for path in paths + [log_path(root_dir)]:
+            for event in _read_events(path):
+                if "ts" not in event:
+                    continue  # a duration event, not an invocation
+                recent[event["label"]] = max(recent.get(event["label"], 0), event["ts"])
+
+    if not recent:
+        return [label for label, _ in ranking]
+    newest = sorted(([label, ts] for label, ts in recent.items()), key=lambda item: -item[1])
+    older = (item for item in ranking if item[0] not in recent)
+    return [label for label, _ in heapq.merge(newest, older, key=lambda item: -item[1])]
+
+
+def frecency_scores(root_dir, now=None):
+    """Return label -> frecency for tasks with run history.
+
+    Frecency is the run count, halved for every FRECENCY_HALF_LIFE since the last
+    run, so a task run often and recently outranks one run often long ago.
+    """
+    now = time.time() if now is None else now
+    return {
+        label: stats.get("count", 0) * 0.5 ** (max(now - stats["last_run"], 0) / FRECENCY_HALF_LIFE)
+        for label, stats in load_cache(root_dir).get("tasks", {}).items()
+        if stats.get("last_run") is not None
+    }
+
+
+def duration_p95(stats):
+    """Return the 95th percentile of a task's recent durations (nearest rank), or None."""
+    durations = sorted(stats.get("durations", []))
+    if not durations:
+        return None
+    return durations[max(0, -(-95 * len(durations) // 100) - 1)]
+
+
+def duration_estimates(root_dir, slow=False):
+    """Return label -> expected duration in seconds for tasks with history.
+
+    That is the EWMA of their durations or, with ``slow``, the 95th percentile of
+    the recent ones (see duration_p95): what a slow run takes.
+    """
     cache = load_cache(root_dir)
-    stats = cache["tasks"].get(label, {"count": 0, "last_run": None})
-    stats["count"] += 1
-    stats["last_run"] = time.time()
-    cache["tasks"][label] = stats
-    save_cache(root_dir, cache)
+    estimate = duration_p95 if slow else (lambda stats: stats.get("ewma"))
+    estimates = {}
+    for label, stats in cache.get("tasks", {}).items():
+        value = estimate(stats)
+        if value is not None:
+            estimates[label] = value
+    return estimates
+
+
+def sort_tasks_by_rank(tasks, ranked):
+    """Order tasks by a ranked label list; unranked tasks follow in their original order."""
+    by_label = {task.label: task for task in tasks}
+    head = [by_label.pop(label) for label in ranked if label in by_label]
+    return head + [task for task in tasks if task.label in by_label]
 
 
 def sort_tasks_by_history(tasks, cache):
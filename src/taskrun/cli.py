@@ -1,74 +1,428 @@
 import argparse
 import os
-import subprocess
+import re
 import sys
+from contextlib import nullcontext
 
-from simple_term_menu import TerminalMenu
+from taskrun.cache import (
+    duration_estimates,
+    frecency_scores,
+    ranked_labels,
+    record_durations,
+    record_task_run,
+    remember_inputs,
+    remembered_inputs,
+    sort_tasks_by_rank,
+)
+from taskrun.discovery import root_dir_for
+from taskrun.parser import find_vscode_tasks, list_task_labels, load_workspace
 
-from taskrun.cache import load_cache, record_task_run, sort_tasks_by_history
-from taskrun.parser import find_vscode_tasks, get_task_by_label, list_task_labels, parse_tasks
+# Modules only some modes need (the terminal menu, subprocess, the scheduler's
+# thread pool) are imported where they are used, so that `--list`, which editor
+# completion calls on every keystroke, starts as fast as possible.
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run or list VS Code tasks from tasks.json")
-    parser.add_argument("--label", help="Label of the task to run", type=str)
+    parser.add_argument(
+        "--label",
+        help="Label(s) of the task(s) to run: exact labels, globs such as 'test:*', "
+        "or regular expressions written 're:PATTERN'",
+        nargs="+",
+        type=str,
+    )
     parser.add_argument("--list", help="List all task labels", action="store_true")
+    parser.add_argument(
+        "--query",
+        help="List the task labels fuzzy-matching TEXT, best match first (as the menu's "
+        "search ranks them)",
+        metavar="TEXT",
+        type=str,
+    )
     parser.add_argument("--edit", help="Edit tasks.json file", action="store_true")
+    parser.add_argument(
+        "--file",
+        "-f",
+        help="Use this tasks.json instead of searching for one (also $TASKRUN_FILE)",
+        type=str,
+    )
+    parser.add_argument(
+        "--workspace-root",
+        "-w",
+        help="Use every .vscode/tasks.json under DIR (or the folders of a "
+        ".code-workspace file), with labels namespaced as FOLDER/LABEL",
+        metavar="DIR",
+        type=str,
+    )
     parser.add_argument(
         "--choice-only",
         help="Print chosen task label without running it",
         action="store_true",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Slots for concurrently running tasks; each task takes one unless its "
+        "'taskrun' object sets 'weight' or 'exclusive' (default: CPU count)",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-load",
+        help="Start no new task while the 1-minute load average is above LOAD",
+        metavar="LOAD",
+        type=float,
+    )
+    parser.add_argument(
+        "--min-free-mem",
+        help="Start no new task while available memory is below MIB megabytes",
+        metavar="MIB",
+        type=float,
+    )
+    parser.add_argument(
+        "--input",
+        help="Answer ${input:ID} with VALUE instead of prompting (repeatable; "
+        "also $TASKRUN_INPUT_<ID>)",
+        metavar="ID=VALUE",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--remember-inputs",
+        help="Reuse the input answers remembered from earlier runs, and remember "
+        "this run's answers",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--exec",
+        help="Run the task's dependencies, then replace taskrun with the task's own "
+        "command, so taskrun does not stay resident while it runs",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--keep-going",
+        "-k",
+        help="Keep starting independent tasks after one fails (default: stop)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--force",
+        help="Run tasks even if their declared inputs are unchanged since the last run",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--log-dir",
+        help="Also write each task's output to DIR/<label>.log",
+        metavar="DIR",
+        type=str,
+    )
+    parser.add_argument(
+        "--quickfix",
+        help="Write the problems found by the tasks' problemMatchers to FILE, in "
+        "quickfix format (for Vim's :cfile)",
+        metavar="FILE",
+        type=str,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print per-task timings and the critical path after running",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--trace",
+        help="Write a Chrome trace-event JSON timeline of the run to FILE",
+        metavar="FILE",
+        type=str,
+    )
+    parser.add_argument(
+        "--watch",
+        help="Run the task(s), then rerun the affected ones whenever files change "
+        "(takes the labels too, like --label)",
+        metavar="LABEL",
+        nargs="*",
+        type=str,
+    )
+    parser.add_argument(
+        "--serve",
+        help="Run a daemon that answers editor requests over a Unix socket",
+        action="store_true",
+    )
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.exec and args.watch is not None:
+        parser.error("--exec cannot be combined with --watch")
+    supplied = {}
+    for item in args.input:
+        input_id, sep, value = item.partition("=")
+        if not sep or not input_id:
+            parser.error(f"--input expects ID=VALUE, got {item!r}")
+        supplied[input_id] = value
+
+    if args.serve:
+        from taskrun.server import serve
+
+        serve()
+        return
+
+    profile = None
+    if args.profile or args.trace:
+        from taskrun.profile import Profile
+
+        profile = Profile()
+
+    with profile.phase("parse") if profile else nullcontext():
+        if args.workspace_root:
+            from taskrun.multiroot import load_multi_workspace, resolve_folders, tasks_file
+
+            try:
+                root_dir, folders = resolve_folders(args.workspace_root)
+            except (OSError, ValueError) as exc:
+                print(f"Error: cannot read {args.workspace_root}: {exc}", file=sys.stderr)
+                sys.exit(1)
+            if not folders:
+                print(f"No tasks.json found under {args.workspace_root}.", file=sys.stderr)
+                sys.exit(1)
+
+            def load():
+                return load_multi_workspace(root_dir, folders)
+
+            workspace = load()
+            edit_paths = [tasks_file(folder) for _, folder in folders]
+        else:
+            file_path = find_vscode_tasks(file_path=args.file)
+            if file_path is None:
+                sys.exit(1)
 
-    file_path = find_vscode_tasks()
-    if file_path is None:
-        sys.exit(1)
+            root_dir = root_dir_for(file_path)
 
-    root_dir = os.path.dirname(os.path.dirname(os.path.realpath(file_path)))
-    tasks, inputs_defs = parse_tasks(root_dir, file_path)
-    cache = load_cache(root_dir)
+            def load():
+                return load_workspace(root_dir, file_path)
+
+            workspace = load()
+            edit_paths = [file_path]
+    for label in workspace.duplicates:
+        print(f"Warning: duplicate task label '{label}'; using the first one.", file=sys.stderr)
 
     if args.edit:
-        subprocess.call(os.environ.get("EDITOR", "vim").split(" ") + [file_path])
+        import subprocess
+
+        subprocess.call(os.environ.get("EDITOR", "vim").split(" ") + edit_paths)
         return
 
     if args.list:
-        visible = [t for t in tasks if not t.hide]
-        list_task_labels(sort_tasks_by_history(visible, cache))
+        list_task_labels(sort_tasks_by_rank(workspace.visible(), ranked_labels(root_dir)))
+        return
+
+    if args.query is not None:
+        from taskrun.fuzzy import FuzzyIndex
+
+        visible = sort_tasks_by_rank(workspace.visible(), ranked_labels(root_dir))
+        index = FuzzyIndex([task.label for task in visible], frecency_scores(root_dir))
+        for label in index.rank(args.query):
+            print(label)
         return
 
-    task_to_run = None
+    labels = []
+    patterns = (args.label or []) + (args.watch or [])
 
-    if args.label:
-        task_to_run = get_task_by_label(tasks, args.label)
-        if not task_to_run:
-            print(f"No task found with label: {args.label}")
-    elif len(tasks) == 1:
-        task_to_run = tasks[0]
+    if patterns:
+        try:
+            labels, unmatched = workspace.select(patterns)
+        except re.error as exc:
+            print(f"Error: invalid label pattern: {exc}", file=sys.stderr)
+            sys.exit(1)
+        for pattern in unmatched:
+            print(f"No task found with label: {pattern}")
+    elif len(workspace) == 1:
+        labels = [workspace.tasks[0].label]
     else:
-        # Show only non-hidden tasks in the interactive menu, sorted by history
-        visible = sort_tasks_by_history([t for t in tasks if not t.hide], cache)
+        from taskrun.menu import FuzzyTerminalMenu
+
+        # Show only non-hidden tasks in the interactive menu, sorted by history;
+        # typing searches them fuzzily, ranked by match quality and frecency
+        visible = sort_tasks_by_rank(workspace.visible(), ranked_labels(root_dir))
         if not visible:
             print("No tasks available.")
             return
-        terminal_menu = TerminalMenu([t.label for t in visible], search_key=None)
+        terminal_menu = FuzzyTerminalMenu(
+            [t.label for t in visible], weights=frecency_scores(root_dir), search_key=None
+        )
         try:
             choice = terminal_menu.show()
             if choice is not None:
-                task_to_run = visible[choice]
+                labels = [visible[choice].label]
         except ValueError:
             sys.exit(0)
 
-    if task_to_run:
+    if labels:
         if args.choice_only:
-            print(task_to_run.label)
+            for label in labels:
+                print(label)
+            return
+        if args.exec and len(labels) > 1:
+            print("Error: --exec runs a single task.", file=sys.stderr)
+            sys.exit(1)
+        from taskrun.admission import Admission
+        from taskrun.fingerprint import FingerprintStore
+        from taskrun.scheduler import DependencyCycleError, build_graph, exit_code
+        from taskrun.task import (
+            MissingInputError,
+            RunOptions,
+            input_env_var,
+            resolve_inputs,
+            run_tasks,
+        )
+        from taskrun.variables import collect_input_ids
+
+        for label in labels:
+            record_task_run(root_dir, label)
+        if args.watch is not None:
+            from taskrun.watch import watch
+
+            try:
+                watch(
+                    load,
+                    edit_paths,
+                    labels,
+                    jobs=args.jobs,
+                    keep_going=args.keep_going,
+                    run_options=RunOptions(admission=Admission(args.max_load, args.min_free_mem)),
+                    answers=dict(supplied),
+                    interactive=sys.stdin.isatty(),
+                )
+            except DependencyCycleError as exc:
+                print(f"Error: {exc}", file=sys.stderr)
+                sys.exit(1)
             return
-        record_task_run(root_dir, task_to_run.label)
-        task_to_run.run(all_tasks=tasks, inputs_defs=inputs_defs)
+        try:
+            planned = build_graph(workspace, labels)[0]
+        except DependencyCycleError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        target = workspace.get(labels[0]) if args.exec else None
+        fingerprints = FingerprintStore(root_dir, force=args.force)
+        durations = {}
+        several = len(planned) > 1
+        # A task's problemMatcher needs to see its output, so it is piped like a log
+        matched = any(
+            workspace.get(label).problem_matcher
+            for label in planned
+            if target is None or label != target.label
+        )
+        problems = None
+        if matched or args.quickfix:
+            from taskrun.problems import Diagnostics
+
+            problems = Diagnostics()
+        output = None
+        if several or args.log_dir or matched:
+            from taskrun.output import OutputMux
+
+            # Prefix lines only when several tasks may be writing at once; a lone task
+            # keeps the terminal unless its output must also be logged or scanned
+            output = OutputMux(log_dir=args.log_dir, prefix=several)
+        answers = {}
+        if args.remember_inputs:
+            # $TASKRUN_INPUT_<ID> overrides a remembered answer, --input overrides both
+            answers = {
+                input_id: value
+                for input_id, value in remembered_inputs(root_dir).items()
+                if input_env_var(input_id) not in os.environ
+            }
+        answers.update(supplied)
+        results = {}
+        only = None
+        try:
+            if target is not None:
+                # Its inputs are asked for now, alongside its dependencies', since
+                # nothing can be prompted for once taskrun has been replaced
+                target_inputs = collect_input_ids([target.command] + target.args)
+                answers.update(
+                    resolve_inputs(target_inputs, workspace.inputs, answers, sys.stdin.isatty())
+                )
+                only = set(planned) - {target.label}
+            results = run_tasks(
+                workspace,
+                labels,
+                jobs=args.jobs,
+                estimates=duration_estimates(root_dir),
+                slow_estimates=duration_estimates(root_dir, slow=True),
+                durations=durations,
+                keep_going=args.keep_going,
+                answers=answers,
+                interactive=sys.stdin.isatty(),
+                only=only,
+                run_options=RunOptions(
+                    fingerprints=fingerprints,
+                    output=output,
+                    problems=problems,
+                    profile=profile,
+                    admission=Admission(args.max_load, args.min_free_mem),
+                ),
+            )
+        except (DependencyCycleError, MissingInputError) as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if args.remember_inputs:
+                remember_inputs(
+                    root_dir,
+                    {
+                        input_id: value
+                        for input_id, value in answers.items()
+                        if not workspace.inputs.get(input_id, {}).get("password")
+                    },
+                )
+            fingerprints.save()
+            record_durations(
+                root_dir, {label: t for label, t in durations.items() if results.get(label) == 0}
+            )
+        if len(results) > 1:
+            _print_summary(results, durations)
+        if problems is not None:
+            problems.report(relative_to=root_dir)
+            if args.quickfix:
+                try:
+                    problems.write_quickfix(args.quickfix)
+                except OSError as exc:
+                    print(f"Error: cannot write {args.quickfix}: {exc}", file=sys.stderr)
+        if args.profile:
+            profile.report()
+        if args.trace:
+            profile.write_trace(args.trace)
+        ret = exit_code(results, labels)
+        if ret:
+            sys.exit(ret)
+        if target is not None:
+            if fingerprints.up_to_date(target):
+                print(f"Task '{target.label}' is up to date, skipping.")
+                return
+            try:
+                target.replace_process(answers)
+            except OSError as exc:
+                print(f"Error: cannot run task '{target.label}': {exc}", file=sys.stderr)
+                sys.exit(127)
     else:
         print("No task to run.")
 
 
+def _print_summary(results, durations):
+    """Print one row per task of a run: its outcome and how long it took."""
+    width = max(len(label) for label in results)
+    print("\nSummary:")
+    for label, ret in results.items():
+        if ret is None:
+            status = "skipped"
+        elif ret == 0:
+            status = "ok" if label in durations else "up to date"
+        else:
+            status = f"failed (exit {ret})"
+        elapsed = f"{durations[label]:.2f}s" if label in durations else "-"
+        print(f"  {label:<{width}}  {status:<18}  {elapsed:>8}")
+    failed = sum(1 for ret in results.values() if ret)
+    skipped = sum(1 for ret in results.values() if ret is None)
+    print(f"  {len(results) - failed - skipped} succeeded, {failed} failed, {skipped} skipped")
+
+
 if __name__ == "__main__":
     main()
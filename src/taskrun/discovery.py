@@ -0,0 +1,98 @@
+import os
+import threading
+
+# Directories containing one of these end the upward search (after being checked)
+BOUNDARY_MARKERS = (".git",)
+
+# start dir -> (tasks.json path or None, searched dirs, their signature); per process,
+# so only a long-lived one (the --serve daemon) gets hits
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def root_dir_for(file_path):
+    """Return the workspace folder for a tasks.json: the parent of its .vscode dir."""
+    directory = os.path.dirname(os.path.realpath(file_path))
+    if os.path.basename(directory) == ".vscode":
+        return os.path.dirname(directory)
+    return directory
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _search(start_dir):
+    """Walk up from start_dir; return (tasks.json path or None, searched dirs)."""
+    home_dir = os.path.expanduser("~")
+    current_dir = os.path.abspath(start_dir)
+    searched = []
+    device = None
+
+    while current_dir != home_dir:
+        try:
+            st = os.stat(current_dir)
+        except OSError:
+            st = None
+        # Crossing onto another device means the previous level was a mount point
+        if st is not None and device is not None and st.st_dev != device:
+            break
+        device = st.st_dev if st is not None else device
+
+        searched.append(current_dir)
+        tasks_json_path = os.path.join(current_dir, ".vscode", "tasks.json")
+        if os.path.isfile(tasks_json_path):
+            return tasks_json_path, searched
+        if any(os.path.exists(os.path.join(current_dir, m)) for m in BOUNDARY_MARKERS):
+            break
+
+        parent = os.path.dirname(current_dir)
+        if parent == current_dir:  # filesystem root
+            break
+        current_dir = parent
+
+    return None, searched
+
+
+def _signature(searched):
+    # A new .vscode dir changes its parent's mtime; a new tasks.json changes .vscode's
+    return tuple(
+        (_mtime(directory), _mtime(os.path.join(directory, ".vscode"))) for directory in searched
+    )
+
+
+def find_tasks_file(start_dir=None, file_path=None):
+    """Return the tasks.json that applies to start_dir (default: cwd), or None.
+
+    An explicit ``file_path`` or $TASKRUN_FILE skips discovery. Otherwise the search
+    walks up from start_dir and stops at the first .vscode/tasks.json, or at a
+    boundary: a directory containing .git, a mount point, the home directory (not
+    searched) or the filesystem root. Results are memoized per start dir for the
+    life of the process and revalidated with one stat per searched directory and
+    its .vscode; a one-shot CLI invocation always searches.
+    """
+    file_path = file_path or os.environ.get("TASKRUN_FILE")
+    if file_path:
+        return file_path if os.path.isfile(file_path) else None
+
+    start_dir = os.path.abspath(start_dir or os.getcwd())
+    with _memo_lock:
+        cached = _memo.get(start_dir)
+    if cached is not None:
+        found, searched, signature = cached
+        if _signature(searched) == signature and (found is None or os.path.isfile(found)):
+            return found
+
+    found, searched = _search(start_dir)
+    with _memo_lock:
+        _memo[start_dir] = (found, searched, _signature(searched))
+    return found
+
+
+def clear_memo():
+    """Forget all memoized discovery results."""
+    with _memo_lock:
+        _memo.clear()
@@ -0,0 +1,121 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+
+from taskrun.cache import cache_path, write_json
+from taskrun.variables import collect_input_ids, expand_variables
+
+
+def fingerprint_path(root_dir):
+    """Return the path to the fingerprint store for a given project root."""
+    return cache_path(root_dir)[: -len(".json")] + ".fingerprints.json"
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def expand_globs(task, patterns):
+    """Return the sorted files matched by a task's globs (relative to the workspace)."""
+    files = set()
+    for pattern in patterns:
+        pattern = expand_variables(str(pattern), task.root_dir)
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(glob.escape(task.root_dir), pattern)
+        files.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+class FingerprintStore:
+    """Fingerprints of each task's last successful run, for skipping up-to-date tasks.
+
+    A task opts in by declaring ``"taskrun": {"inputs": [globs], "outputs": [globs]}``.
+    Its fingerprint covers the contents of the input files plus the expanded command,
+    args, cwd and options.env. Files whose mtime and size match the previous run reuse
+    that run's content hash, so only changed files are read.
+    """
+
+    def __init__(self, root_dir, force=False):
+        self.root_dir = root_dir
+        self.force = force  # run everything, but still record fingerprints
+        self._lock = threading.Lock()
+        self._pending = {}  # label -> fingerprint computed before this run's execution
+        self._updated = {}
+        try:
+            with open(fingerprint_path(root_dir), "r") as fh:
+                self._tasks = json.load(fh).get("tasks", {})
+        except (json.JSONDecodeError, OSError):
+            self._tasks = {}
+
+    def compute(self, task):
+        """Return the fingerprint dict for a task's current inputs, or None if not tracked.
+
+        Tasks without declared inputs, or whose command uses ${input:ID} (the answer is
+        unknown until prompted), are never considered up to date.
+        """
+        patterns = task.extensions.get("inputs")
+        if not patterns or collect_input_ids([task.command] + task.args):
+            return None
+
+        with self._lock:
+            previous = self._tasks.get(task.label, {}).get("files", {})
+        files = {}
+        digest = hashlib.sha256()
+        env = getattr(task.env, "maps", [task.env or {}])[0]
+        header = [task.task_type, task.command, task.args, task.cwd, sorted(env.items())]
+        digest.update(json.dumps(header).encode())
+        for path in expand_globs(task, patterns):
+            try:
+                st = os.stat(path)
+                old = previous.get(path)
+                if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                    content = old[2]
+                else:
+                    content = _hash_file(path)
+            except OSError:
+                continue  # vanished between glob and stat
+            files[path] = [st.st_mtime_ns, st.st_size, content]
+            digest.update(f"{path}\0{content}\n".encode())
+        return {"digest": digest.hexdigest(), "files": files}
+
+    def up_to_date(self, task):
+        """Return True if a task can be skipped; remember its fingerprint for record()."""
+        fingerprint = self.compute(task)
+        if fingerprint is None:
+            return False
+        with self._lock:
+            self._pending[task.label] = fingerprint
+            previous = self._tasks.get(task.label, {}).get("digest")
+        if self.force or previous != fingerprint["digest"]:
+            return False
+        outputs = task.extensions.get("outputs") or []
+        return all(expand_globs(task, [pattern]) for pattern in outputs)
+
+    def record(self, task):
+        """Store the pre-run fingerprint of a task that just succeeded."""
+        with self._lock:
+            fingerprint = self._pending.pop(task.label, None)
+            if fingerprint is not None:
+                self._tasks[task.label] = fingerprint
+                self._updated[task.label] = fingerprint
+
+    def save(self):
+        """Merge this run's fingerprints into the on-disk store (atomic replace)."""
+        with self._lock:
+            if not self._updated:
+                return
+            updated = dict(self._updated)
+        path = fingerprint_path(self.root_dir)
+        try:
+            with open(path, "r") as fh:
+                tasks = json.load(fh).get("tasks", {})
+        except (json.JSONDecodeError, OSError):
+            tasks = {}
+        tasks.update(updated)
+        write_json(path, {"tasks": tasks})
@@ -0,0 +1,152 @@
+import math
+import re
+
+# Characters after which a new word of a label starts ("test:unit", "api/build")
+WORD_SEPARATORS = " -_:./\\"
+_CAMEL_START = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def _separators_to_newlines(text):
+    for separator in WORD_SEPARATORS:
+        text = text.replace(separator, "\n")
+    return text
+
+
+def _words(label):
+    """Return a label's text for word-start tests: separators turned into newlines.
+
+    ``_words(query)`` (less its leading newline) is in it iff the query occurs where
+    a word starts: at the start, after a separator, or at a lower-to-upper case
+    change ("runTests"), for which the suffix from there is appended.
+    """
+    words = "\n" + _separators_to_newlines(label.lower())
+    if not label.islower():
+        for match in _CAMEL_START.finditer(label):
+            words += "\n" + _separators_to_newlines(label[match.start() :].lower())
+    return words
+
+
+def _word_start(label, position):
+    return (
+        position == 0
+        or label[position - 1] in WORD_SEPARATORS
+        or (label[position].isupper() and label[position - 1].islower())
+    )
+
+
+def _pattern(query):
+    # Lazy gaps find the leftmost start, then the nearest occurrence of each next char
+    return re.compile(".*?".join(re.escape(char) for char in query), re.DOTALL)
+
+
+class FuzzyIndex:
+    """Labels prepared once for fuzzy search, ranked by match quality and frecency.
+
+    A label matches when the query's characters appear in it in order (case is
+    ignored). Matches are ranked in tiers: the query is a prefix of the label, then
+    a prefix of one of its words, then a substring anywhere, then a scattered match
+    (fewest skipped characters first). Within a tier, labels with higher frecency
+    (see cache.frecency_scores) come first, then shorter ones.
+
+    Every step of a search is a C-level string test, and searches are incremental:
+    typing another character only extends the matches of the shorter query.
+    """
+
+    def __init__(self, labels, weights=None):
+        weights = weights or {}
+        self.labels = list(labels)
+        self._folded = [label.lower() for label in self.labels]
+        # One pass over all labels at once (NUL-separated) rather than one per label
+        self._words = _separators_to_newlines("\n" + "\0\n".join(self._folded)).split("\0")
+        for index, label in enumerate(self.labels):
+            if not label.islower():  # may have camelCase word starts
+                self._words[index] = _words(label)
+        self._order = sorted(
+            range(len(self.labels)),
+            key=lambda index: (
+                -math.log1p(weights[self.labels[index]]) if self.labels[index] in weights else 0,
+                len(self.labels[index]),
+                index,
+            ),
+        )
+        self._rank = [0] * len(self.labels)  # index -> position in self._order
+        for rank, index in enumerate(self._order):
+            self._rank[index] = rank
+        # [(query, indices of labels containing it, [(span length, rank, index, start,
+        # end)] of the labels matching it only scattered)], each a prefix of the next
+        self._searches = []
+
+    def _candidates(self, query):
+        # The matches of the longest earlier query that ``query`` extends
+        while self._searches and not query.startswith(self._searches[-1][0]):
+            self._searches.pop()
+        if self._searches:
+            return self._searches[-1]
+        return "", self._order, []
+
+    def search(self, query):
+        """Return the indices of the labels matching ``query``, best first."""
+        folded = query.lower()
+        if not folded:
+            return list(self._order)
+        labels = self._folded
+        words = self._words
+        previous, contained, spans = self._candidates(folded)
+
+        # Most matches contain the query outright (all of them while it is one
+        # character long); these are tiered with C-level substring tests alone
+        hits = [index for index in contained if folded in labels[index]]
+        at_word = _words(folded)
+        starts_word = [index for index in hits if at_word in words[index]]
+        prefix = [index for index in starts_word if labels[index].startswith(folded)]
+        word = [index for index in starts_word if not labels[index].startswith(folded)]
+        if len(starts_word) == len(hits):
+            substring = []
+        else:
+            at_words = set(starts_word)
+            substring = [index for index in hits if index not in at_words]
+
+        # Scattered matches: earlier ones are extended past their end, each next
+        # character being searched for after the previous one; earlier substring
+        # matches that no longer contain the query are scanned once
+        scattered = []
+        rest = folded[len(previous) :]
+        rank = self._rank
+        for _, _, index, start, end in spans:
+            label = labels[index]
+            for char in rest:
+                end = label.find(char, end) + 1
+                if not end:
+                    break
+            else:
+                scattered.append((end - start, rank[index], index, start, end))
+        if len(hits) < len(contained) and (previous or len(folded) > 1):
+            scan = _pattern(folded).search
+            last = folded[-1]
+            misses = [index for index in contained if folded not in labels[index]]
+            for index in [index for index in misses if last in labels[index]]:
+                match = scan(labels[index])
+                if match is not None:
+                    start, end = match.span()
+                    scattered.append((end - start, rank[index], index, start, end))
+        self._searches.append((folded, hits, scattered))
+        scattered = sorted(scattered)  # fewest skipped characters, then by rank
+        return prefix + word + substring + [entry[2] for entry in scattered]
+
+    def span(self, index, query):
+        """Return the match of ``query`` in a label (``start()``/``end()``), or None."""
+        folded = query.lower()
+        if not folded:
+            return None
+        label = self.labels[index]
+        exact = re.compile(re.escape(folded))
+        # Highlight the occurrence at a word start, else the first, else the scattered one
+        matches = [match for match in exact.finditer(self._folded[index])]
+        for match in matches:
+            if _word_start(label, match.start()):
+                return match
+        return matches[0] if matches else _pattern(folded).search(self._folded[index])
+
+    def rank(self, query):
+        """Return the matching labels, best first (every label by frecency if empty)."""
+        return [self.labels[index] for index in self.search(query)]
@@ -0,0 +1,47 @@
+import json
+import re
+
+# The string pattern is written "unrolled" so the regex engine scans runs of plain
+# characters in one step instead of alternating per character.
+_STRING = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+_COMMENT = r"//[^\n]*|/\*.*?\*/"
+# A comma is trailing if only whitespace and comments separate it from } or ]
+_TRAILING_COMMA = r",(?=(?:\s|" + _COMMENT + r")*[}\]])"
+# re.split with a capturing group puts every string, comment and trailing comma at
+# an odd index, so the text can be rewritten without a Python callback per match.
+_TOKEN_RE = re.compile(r"(" + _STRING + r"|" + _COMMENT + r"|" + _TRAILING_COMMA + r")", re.DOTALL)
+
+
+def _rewrite(token):
+    if token[0] == '"':
+        return token
+    return "" if token == "," else " "
+
+
+def strip_jsonc(text):
+    """Remove // and /* */ comments and trailing commas from JSONC text."""
+    parts = _TOKEN_RE.split(text)
+    parts[1::2] = map(_rewrite, parts[1::2])
+    return "".join(parts)
+
+
+def loads(text):
+    """Parse tasks.json text, trying the cheapest parser that accepts it.
+
+    Returns (data, tier) where tier is "json" (strict JSON via the stdlib),
+    "jsonc" (comments and trailing commas stripped, then the stdlib) or "json5"
+    (the pure-Python json5 package, only needed for real JSON5 syntax).
+    """
+    try:
+        return json.loads(text), "json"
+    except ValueError:
+        pass
+
+    try:
+        return json.loads(strip_jsonc(text)), "jsonc"
+    except ValueError:
+        pass
+
+    import json5
+
+    return json5.loads(text), "json5"
@@ -0,0 +1,64 @@
+from collections.abc import Sequence
+from functools import partial
+
+from simple_term_menu import TerminalMenu
+
+from taskrun.fuzzy import FuzzyIndex
+
+
+class _RankedMatches(Sequence):
+    """The (menu index, match) pairs of a search, in rank order.
+
+    The menu iterates over all of them only for the indices, and reads the match
+    (for highlighting) only of the rows it draws, so spans are found on demand.
+    """
+
+    def __init__(self, index, query, ranked):
+        self._index = index
+        self._query = query
+        self._ranked = ranked
+
+    def __len__(self):
+        return len(self._ranked)
+
+    def __getitem__(self, position):
+        menu_index = self._ranked[position]
+        return menu_index, self._index.span(menu_index, self._query)
+
+    def __iter__(self):
+        return ((menu_index, None) for menu_index in self._ranked)
+
+
+class FuzzySearch(TerminalMenu.Search):
+    """TerminalMenu search that ranks entries with a FuzzyIndex instead of a regex."""
+
+    def __init__(self, menu_entries, *args, weights=None, **kwargs):
+        self._index = FuzzyIndex(menu_entries, weights)
+        self._ranked = _RankedMatches(self._index, "", [])
+        self._matched = frozenset()
+        super().__init__(menu_entries, *args, **kwargs)
+
+    def _update_matches(self):
+        query = self._search_text or ""
+        ranked = self._index.search(query) if query else []
+        self._ranked = _RankedMatches(self._index, query, ranked)
+        self._matched = frozenset(ranked)
+
+    @property
+    def matches(self):
+        # The base class copies its list on every access, once per drawn row
+        return self._ranked
+
+    def __contains__(self, menu_index):
+        return menu_index in self._matched
+
+
+class FuzzyTerminalMenu(TerminalMenu):
+    """TerminalMenu whose type-to-search is fuzzy and ranked by frecency.
+
+    ``weights`` maps entries to frecency scores (see cache.frecency_scores).
+    """
+
+    def __init__(self, menu_entries, weights=None, **kwargs):
+        self.Search = partial(FuzzySearch, weights=weights)
+        super().__init__(menu_entries, **kwargs)
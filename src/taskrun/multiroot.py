@@ -0,0 +1,122 @@
+import os
+import sys
+
+from taskrun import jsonc
+from taskrun.parse_cache import cached_tasks_data, load_tasks_data
+from taskrun.parser import tasks_from_data
+from taskrun.workspace import Workspace
+
+# Joins a folder's name and a task label into the label used across the workspace
+NAMESPACE_SEPARATOR = "/"
+
+# Directories never searched for tasks.json (hidden directories are skipped too)
+PRUNED_DIRS = {"node_modules", "__pycache__"}
+
+# Below this many files to parse, doing it in-process beats starting a process pool
+PARALLEL_PARSE_MIN = 4
+
+
+def tasks_file(folder):
+    """Return the path of a workspace folder's tasks.json."""
+    return os.path.join(folder, ".vscode", "tasks.json")
+
+
+def find_folders(root):
+    """Return every directory under root (inclusive) that has a .vscode/tasks.json."""
+    found = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(
+            name for name in dirnames if not name.startswith(".") and name not in PRUNED_DIRS
+        )
+        if os.path.isfile(tasks_file(dirpath)):
+            found.append(dirpath)
+    return found
+
+
+def read_code_workspace(path):
+    """Return [(name or None, folder path)] from a VS Code .code-workspace file."""
+    with open(path, "r") as fh:
+        data, _ = jsonc.loads(fh.read())
+    base = os.path.dirname(os.path.abspath(path))
+    return [
+        (entry.get("name"), os.path.normpath(os.path.join(base, entry.get("path", "."))))
+        for entry in data.get("folders", [])
+    ]
+
+
+def resolve_folders(path):
+    """Return (root_dir, [(namespace, folder)]) for a --workspace-root argument.
+
+    ``path`` is a .code-workspace file (its folders, named as in the file) or a
+    directory (every folder below it with a tasks.json). Namespaces default to the
+    folder's base name, or its path relative to the root where base names clash.
+    """
+    if os.path.isfile(path):
+        root_dir = os.path.dirname(os.path.abspath(path))
+        entries = read_code_workspace(path)
+    else:
+        root_dir = os.path.abspath(path)
+        entries = [(None, folder) for folder in find_folders(root_dir)]
+
+    basenames = [os.path.basename(folder) for name, folder in entries if name is None]
+    folders = []
+    for name, folder in entries:
+        if name is None:
+            name = os.path.basename(folder)
+            if not name or basenames.count(name) > 1:
+                name = os.path.relpath(folder, root_dir)
+        folders.append((name, folder))
+    return root_dir, folders
+
+
+def _load(file_path):
+    # Runs in a pool worker; errors are returned so one bad file spoils nothing else
+    try:
+        return load_tasks_data(file_path)
+    except (OSError, ValueError) as exc:
+        return exc
+
+
+def _load_all(paths):
+    # Warm cache entries are read in-process; only the files that must be hashed or
+    # reparsed are worth a process pool, and only when there are enough of them
+    results = [cached_tasks_data(path) for path in paths]
+    misses = [index for index, data in enumerate(results) if data is None]
+    if len(misses) < PARALLEL_PARSE_MIN:
+        loaded = [_load(paths[index]) for index in misses]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(len(misses), os.cpu_count() or 1)) as pool:
+            loaded = list(pool.map(_load, [paths[index] for index in misses], chunksize=4))
+    for index, data in zip(misses, loaded):
+        results[index] = data
+    return results
+
+
+def load_multi_workspace(root_dir, folders, file_path=None):
+    """Parse every folder's tasks.json into one Workspace with namespaced labels.
+
+    Files are decoded concurrently in a process pool, each through its own parse
+    cache entry, so editing one folder's tasks.json leaves the others' cached.
+    A task labelled "build" in folder "api" becomes "api/build". In dependsOn, a
+    label of the same folder refers to that folder's task; any other label is
+    taken as a namespaced label of another folder (e.g. "web/build"). Inputs are
+    shared: the first folder defining an input id wins. Folders whose tasks.json is
+    missing or invalid are reported on stderr and left out.
+    """
+    paths = [tasks_file(folder) for _, folder in folders]
+    tasks, inputs_defs = [], []
+    for (name, folder), path, data in zip(folders, paths, _load_all(paths)):
+        if isinstance(data, Exception):
+            print(f"Warning: skipping {path}: {data}", file=sys.stderr)
+            continue
+        folder_tasks, folder_inputs = tasks_from_data(data, folder)
+        local = {task.label for task in folder_tasks}
+        prefix = name + NAMESPACE_SEPARATOR
+        for task in folder_tasks:
+            task.label = prefix + task.label
+            task.depends_on = [prefix + dep if dep in local else dep for dep in task.depends_on]
+        tasks.extend(folder_tasks)
+        inputs_defs.extend(folder_inputs)
+    return Workspace(tasks, inputs_defs, root_dir=root_dir, file_path=file_path)
@@ -0,0 +1,255 @@
+import os
+import queue
+import re
+import selectors
+import sys
+import threading
+
+# Bytes read per wakeup; large reads keep per-syscall overhead low for chatty children
+CHUNK_SIZE = 1 << 16
+# An unterminated line longer than this is emitted in pieces instead of buffered whole
+MAX_LINE = 1 << 16
+# Seconds a task's pipes may stay open after it exited (held by a process it left
+# running in the background, e.g. `server &`) before they are no longer read
+EOF_GRACE = 0.2
+
+
+def log_file_name(label):
+    """Return the file name of a task's log (the label made filesystem-safe)."""
+    return (re.sub(r"[^\w.-]+", "_", label).strip("_.") or "task") + ".log"
+
+
+class TaskOutput:
+    """The pipes carrying one task's stdout and stderr into an OutputMux.
+
+    Pass ``stdout``/``stderr`` (write ends) to the child, then call
+    close_child_ends() once it has been spawned and finish() after it exits.
+    """
+
+    def __init__(self, label, prefix, log, scanners=None):
+        self.label = label
+        self.prefix = prefix
+        self.log = log
+        self.scanners = scanners
+        self._read_stdout, self.stdout = os.pipe()
+        self._read_stderr, self.stderr = os.pipe()
+        self._open = 2
+        self._done = threading.Event()
+
+    def close_child_ends(self):
+        """Close taskrun's copies of the write ends so EOF follows the child's exit."""
+        for fd in (self.stdout, self.stderr):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def wait(self, timeout=None):
+        """Block until both pipes reached EOF and their last lines were written."""
+        return self._done.wait(timeout)
+
+    def finish(self, mux):
+        """Wait for the pipes' EOF after the child exited, at most EOF_GRACE seconds.
+
+        Pipes still held open by a background process the task started are then
+        closed by ``mux``, so neither the task's dependents nor the run wait for it.
+        """
+        if not self.wait(EOF_GRACE):
+            mux.detach(self)
+            self.wait()
+
+    def _closed(self):
+        # Called from the mux thread when one of the two pipes hits EOF
+        self._open -= 1
+        if not self._open:
+            if self.log is not None:
+                self.log.close()
+            self._done.set()
+
+
+class _Pipe:
+    """Line-buffering state of one pipe; only touched by the mux thread."""
+
+    def __init__(self, output, sink):
+        self.output = output
+        self.sink = sink
+        self.partial = b""
+        self.scanner = output.scanners() if output.scanners is not None else None
+
+    def lines(self, chunk):
+        """Return the prefixed complete lines in chunk, keeping the remainder."""
+        prefix = self.output.prefix
+        data = self.partial + chunk if self.partial else chunk
+        end = data.rfind(b"\n") + 1
+        out = b""
+        if end:
+            out = prefix + data[: end - 1].replace(b"\n", b"\n" + prefix) + b"\n"
+            data = data[end:]
+        if len(data) > MAX_LINE:
+            out += prefix + data + b"\n"
+            data = b""
+        self.partial = data
+        return out
+
+    def rest(self):
+        """Return the unterminated last line, if any, at EOF."""
+        rest, self.partial = self.partial, b""
+        return self.output.prefix + rest + b"\n" if rest else b""
+
+
+class OutputMux:
+    """Multiplexes the output of concurrently running tasks onto one terminal.
+
+    One background thread reads every task's pipes through a selector and writes
+    whole lines, each prefixed with ``[label]``, to ``out`` (stdout) or ``err``
+    (stderr), so concurrent tasks never interleave mid-line. Output is streamed,
+    never accumulated: only an unterminated last line is buffered per pipe. With
+    ``log_dir`` each task's raw output is also written to ``<log_dir>/<label>.log``,
+    and a task attached with ``scanners`` has its raw output fed to them too.
+    Use as a context manager around the run.
+    """
+
+    def __init__(self, out=None, err=None, log_dir=None, prefix=True):
+        self.out = out if out is not None else sys.stdout.buffer
+        self.err = err if err is not None else sys.stderr.buffer
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self._pending = queue.SimpleQueue()
+        self._detaching = queue.SimpleQueue()
+        self._closing = False
+        self._thread = None
+        self._broken = set()  # sinks that failed (e.g. closed pager); keep draining
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        if self.log_dir:
+            os.makedirs(self.log_dir, exist_ok=True)
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._loop, name="taskrun-output", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Wait for every attached pipe to reach EOF, then stop the reader thread."""
+        if self._thread is None:
+            return
+        self._closing = True
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        self._selector.close()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    def attach(self, label, scanners=None):
+        """Create the pipes for a task about to be spawned; return a TaskOutput.
+
+        ``scanners()``, if given, returns an object (see problems.ProblemScanner)
+        fed each chunk of one of the pipes, then closed at its EOF.
+        """
+        log = None
+        if self.log_dir:
+            log = open(os.path.join(self.log_dir, log_file_name(label)), "wb")
+        prefix = f"[{label}] ".encode() if self.prefix else b""
+        output = TaskOutput(label, prefix, log, scanners)
+        for fd in (output._read_stdout, output._read_stderr):
+            os.set_blocking(fd, False)
+        self._pending.put(output)
+        self._wake()
+        return output
+
+    def detach(self, output):
+        """Stop reading a task's pipes, as if both had reached EOF."""
+        self._detaching.put(output)
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_write, b"\0")
+        except BlockingIOError:
+            pass  # a wakeup is already pending
+
+    def _register_pending(self):
+        while True:
+            try:
+                output = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            self._selector.register(
+                output._read_stdout, selectors.EVENT_READ, _Pipe(output, self.out)
+            )
+            self._selector.register(
+                output._read_stderr, selectors.EVENT_READ, _Pipe(output, self.err)
+            )
+
+    def _detach_pending(self):
+        while True:
+            try:
+                output = self._detaching.get_nowait()
+            except queue.Empty:
+                return
+            for fd in (output._read_stdout, output._read_stderr):
+                key = self._selector.get_map().get(fd)
+                # An fd that reached EOF is closed, and its number may be reused since
+                if key is not None and key.data.output is output:
+                    self._close_pipe(key)
+
+    def _write(self, sink, data):
+        if not data or sink in self._broken:
+            return
+        try:
+            sink.write(data)
+            sink.flush()
+        except (OSError, ValueError):
+            self._broken.add(sink)
+
+    def _loop(self):
+        selector = self._selector
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj == self._wake_read:
+                    try:
+                        os.read(self._wake_read, 4096)
+                    except BlockingIOError:
+                        pass
+                    self._register_pending()
+                    self._detach_pending()
+                    continue
+                self._read(key)
+            if self._closing and len(selector.get_map()) == 1 and self._pending.empty():
+                return
+
+    def _read(self, key):
+        pipe = key.data
+        try:
+            chunk = os.read(key.fd, CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if chunk:
+            log = pipe.output.log
+            if log is not None:
+                log.write(chunk)
+            self._write(pipe.sink, pipe.lines(chunk) if self.prefix else chunk)
+            if pipe.scanner is not None:
+                pipe.scanner.feed(chunk)
+            return
+        self._close_pipe(key)
+
+    def _close_pipe(self, key):
+        pipe = key.data
+        self._selector.unregister(key.fd)
+        os.close(key.fd)
+        self._write(pipe.sink, pipe.rest())
+        if pipe.scanner is not None:
+            pipe.scanner.close()
+        pipe.output._closed()
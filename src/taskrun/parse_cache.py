@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import time
+
+from taskrun import jsonc
+from taskrun.cache import cache_dir, write_json
+
+# Entries written less than this long after the file's mtime are "racy": a same-size
+# edit within the filesystem's timestamp granularity would not change the stat
+# signature, so such entries are confirmed by content hash instead of trusted.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def parse_cache_path(file_path):
+    """Return the path of the parse cache entry for a tasks.json file."""
+    key = hashlib.sha256(os.path.realpath(file_path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"parsed-{key}.json")
+
+
+def _read_entry(path):
+    try:
+        with open(path, "r") as fh:
+            return json.load(fh)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _fresh(entry, st):
+    # The stat signature is unchanged and the entry was not written racily
+    return (
+        entry is not None
+        and entry.get("mtime_ns") == st.st_mtime_ns
+        and entry.get("size") == st.st_size
+        and entry.get("written_ns", 0) - st.st_mtime_ns > RACY_WINDOW_NS
+    )
+
+
+def cached_tasks_data(file_path):
+    """Return the parsed contents of tasks.json if its cache entry can be trusted
+    on the file's stat signature alone, else None (load_tasks_data must run)."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    entry = _read_entry(parse_cache_path(file_path))
+    return entry["data"] if _fresh(entry, st) else None
+
+
+def load_tasks_data(file_path):
+    """Return the parsed contents of tasks.json, reusing the on-disk parse cache.
+
+    The cache entry is trusted when the file's mtime and size are unchanged; otherwise
+    the file is hashed and only reparsed when its content actually changed.
+    """
+    st = os.stat(file_path)
+    path = parse_cache_path(file_path)
+    entry = _read_entry(path)
+    now_ns = time.time_ns()
+
+    if _fresh(entry, st):
+        return entry["data"]
+
+    with open(file_path, "rb") as fh:
+        raw = fh.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if entry is not None and entry.get("sha256") == digest:
+        data, tier = entry["data"], entry.get("parser")
+    else:
+        data, tier = jsonc.loads(raw.decode("utf-8-sig"))
+
+    # Atomic, so concurrent readers never see a partial entry
+    write_json(
+        path,
+        {
+            "path": os.path.realpath(file_path),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": digest,
+            "written_ns": now_ns,
+            "parser": tier,  # which jsonc.loads tier accepted the file
+            "data": data,
+        },
+    )
+    return data
@@ -1,79 +1,114 @@
 import os
-import platform
 import sys
+from functools import partial
 
-import json5
+from taskrun.discovery import find_tasks_file
+from taskrun.parse_cache import load_tasks_data
+from taskrun.task import Task, overlay_environment
+from taskrun.variables import VariableContext, expand_variables
+from taskrun.workspace import Workspace
 
-from taskrun.task import Task
-from taskrun.variables import expand_variables
 
+def _platform_key():
+    # sys.platform rather than platform.system(): same answer, no extra import
+    return {"darwin": "osx", "win32": "windows", "cygwin": "windows"}.get(
+        sys.platform, "linux" if sys.platform.startswith("linux") else None
+    )
 
-def get_platform_overrides(task_json):
+
+def get_platform_overrides(task_json, key=None):
     """Return the platform-specific override block for the current OS, or {}."""
-    system = platform.system().lower()
-    key = {"linux": "linux", "darwin": "osx", "windows": "windows"}.get(system)
+    key = key or _platform_key()
     return task_json.get(key, {}) if key else {}
 
 
+def expand_task_fields(task_json, overrides, root_dir, context=None):
+    """Compute a task's expanded command, args, cwd and env (see Task.deferred)."""
+    if context is None:
+        context = VariableContext(root_dir)
+
+    def field(key, default=None):
+        """Return platform override if present, otherwise task-level value."""
+        return overrides.get(key, task_json.get(key, default))
+
+    # Expand predefined variables (${input:ID} deferred to run time)
+    command = expand_variables(str(field("command", "")), root_dir, context=context)
+    args = [expand_variables(str(a), root_dir, context=context) for a in field("args", [])]
+
+    # Merge options: task-level first, then platform overrides on top
+    options = {**task_json.get("options", {}), **overrides.get("options", {})}
+    cwd = expand_variables(options.get("cwd", root_dir), root_dir, context=context)
+
+    env = {}
+    for key, value in options.get("env", {}).items():
+        env[key] = expand_variables(str(value), root_dir, context=context)
+
+    return {
+        "command": command,
+        "args": args,
+        "cwd": cwd,
+        "env": overlay_environment(env, context.environ),
+    }
+
+
 def parse_tasks(root_dir, file_path):
-    """Parse .vscode/tasks.json; return (list[Task], list[input_def])."""
-    with open(file_path, "r") as fh:
-        data = json5.load(fh)
+    """Parse .vscode/tasks.json; return (list[Task], list[input_def]).
+
+    Tasks are lightweight: only label, type, hide and dependsOn are read here (and
+    the raw "taskrun" and "problemMatcher" values, compiled only when used).
+    Variable expansion and environment setup happen when a task is first used.
+    """
+    return tasks_from_data(load_tasks_data(file_path), root_dir)
 
+
+def tasks_from_data(data, root_dir):
+    """Build (list[Task], list[input_def]) from already-decoded tasks.json data."""
     inputs_defs = data.get("inputs", [])
+    platform_key = _platform_key()
+    context = VariableContext(root_dir)  # shared by every task of this parse
     tasks = []
 
     for task_json in data.get("tasks", []):
         label = task_json.get("label", "")
 
         # Platform-specific overrides (linux / osx / windows)
-        overrides = get_platform_overrides(task_json)
+        overrides = get_platform_overrides(task_json, platform_key)
 
         def field(key, default=None):
             """Return platform override if present, otherwise task-level value."""
             return overrides.get(key, task_json.get(key, default))
 
-        task_type = field("type", "shell")
-        command = field("command", "")
-        args = field("args", [])
-
-        # Expand predefined variables at parse time (${input:ID} deferred to run time)
-        command = expand_variables(str(command), root_dir)
-        args = [expand_variables(str(a), root_dir) for a in args]
-
-        # Merge options: task-level first, then platform overrides on top
-        options = {**task_json.get("options", {}), **overrides.get("options", {})}
-        cwd = expand_variables(options.get("cwd", root_dir), root_dir)
-
-        environ = os.environ.copy()
-        for key, value in options.get("env", {}).items():
-            environ[key] = expand_variables(str(value), root_dir)
-
         depends_on_raw = field("dependsOn", [])
         depends_on = [depends_on_raw] if isinstance(depends_on_raw, str) else list(depends_on_raw)
-        depends_order = field("dependsOrder", "parallel")
-
-        hide = bool(field("hide", False))
 
         tasks.append(
-            Task(
+            Task.deferred(
                 label=label,
-                command=command,
-                args=args,
-                cwd=cwd,
-                env=environ,
-                task_type=task_type,
+                task_type=field("type", "shell"),
                 depends_on=depends_on,
-                depends_order=depends_order,
+                depends_order=field("dependsOrder", "parallel"),
                 root_dir=root_dir,
-                hide=hide,
+                hide=bool(field("hide", False)),
+                extensions=field("taskrun", {}),
+                problem_matcher=field("problemMatcher"),
+                resolve=partial(
+                    expand_task_fields, task_json, overrides, root_dir, context=context
+                ),
             )
         )
 
     return tasks, inputs_defs
 
 
+def load_workspace(root_dir, file_path):
+    """Parse tasks.json into an indexed Workspace."""
+    tasks, inputs_defs = parse_tasks(root_dir, file_path)
+    return Workspace(tasks, inputs_defs, root_dir=root_dir, file_path=file_path)
+
+
 def get_task_by_label(tasks, label):
+    if isinstance(tasks, Workspace):
+        return tasks.get(label)
     for task in tasks:
         if task.label == label:
             return task
@@ -85,15 +120,16 @@ def list_task_labels(tasks):
         print(task.label)
 
 
-def find_vscode_tasks():
-    current_dir = os.getcwd()
-    home_dir = os.path.expanduser("~")
-
-    while current_dir != home_dir:
-        tasks_json_path = os.path.join(current_dir, ".vscode", "tasks.json")
-        if os.path.exists(tasks_json_path):
-            return tasks_json_path
-        current_dir = os.path.dirname(current_dir)
-
-    print("tasks.json not found in any .vscode directory up to the home directory.", file=sys.stderr)
-    return None
+def find_vscode_tasks(start_dir=None, file_path=None):
+    """Locate tasks.json (see discovery.find_tasks_file), reporting failure on stderr."""
+    tasks_json_path = find_tasks_file(start_dir, file_path)
+    if tasks_json_path is None:
+        explicit = file_path or os.environ.get("TASKRUN_FILE")
+        if explicit:
+            print(f"tasks.json not found: {explicit}", file=sys.stderr)
+        else:
+            print(
+                "tasks.json not found in any .vscode directory up to the project boundary.",
+                file=sys.stderr,
+            )
+    return tasks_json_path
@@ -0,0 +1,463 @@
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+from functools import lru_cache, partial
+
+from taskrun.cache import write_atomic
+from taskrun.output import MAX_LINE
+from taskrun.variables import expand_variables
+
+# Distinct problems kept per run; beyond this they are only counted
+MAX_PROBLEMS = 10_000
+
+# Pattern fields that name a capture group
+PATTERN_FIELDS = (
+    "file",
+    "location",
+    "line",
+    "column",
+    "endLine",
+    "endColumn",
+    "severity",
+    "code",
+    "message",
+)
+FILE_LOCATIONS = ("absolute", "relative", "autoDetect", "search")
+_SEVERITIES = {"e": "error", "f": "error", "w": "warning", "i": "info", "n": "info", "h": "info"}
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+# JavaScript named groups, (?<name>...), but not lookbehinds (?<=...) and (?<!...)
+_JS_NAMED_GROUP = re.compile(r"\(\?<(?![=!])")
+
+# The common matchers VS Code and its extensions predefine, referenced as "$name"
+BUILTIN_MATCHERS = {
+    "gcc": {
+        "owner": "cpp",
+        "fileLocation": ["relative", "${workspaceFolder}"],
+        "pattern": {
+            "regexp": r"^(.*?):(\d+):(\d*):?\s+(?:fatal\s+)?(warning|error):\s+(.*)$",
+            "file": 1,
+            "line": 2,
+            "column": 3,
+            "severity": 4,
+            "message": 5,
+        },
+    },
+    "tsc": {
+        "owner": "typescript",
+        "fileLocation": ["relative", "${cwd}"],
+        "pattern": {
+            "regexp": r"^([^\s].*)[\(:](\d+)[,:](\d+)(?:\):\s+|\s+-\s+)(error|warning|info)"
+            r"\s+TS(\d+)\s*:\s*(.*)$",
+            "file": 1,
+            "line": 2,
+            "column": 3,
+            "severity": 4,
+            "code": 5,
+            "message": 6,
+        },
+    },
+    "go": {
+        "owner": "go",
+        "fileLocation": ["relative", "${cwd}"],
+        "pattern": {
+            "regexp": r"^([^:]*: )?((.:)?[^:]*):(\d+)(:(\d+))?: (.*)$",
+            "file": 2,
+            "line": 4,
+            "column": 6,
+            "message": 7,
+        },
+    },
+    "eslint-compact": {
+        "owner": "eslint",
+        "fileLocation": "absolute",
+        "pattern": {
+            "regexp": r"^(.+):\sline\s(\d+),\scol\s(\d+),\s(Error|Warning|Info)"
+            r"\s-\s(.+)\s\((.+)\)$",
+            "file": 1,
+            "line": 2,
+            "column": 3,
+            "severity": 4,
+            "message": 5,
+            "code": 6,
+        },
+    },
+    "eslint-stylish": {
+        "owner": "eslint",
+        "fileLocation": "absolute",
+        "pattern": [
+            {"regexp": r"^([^\s].*)$", "file": 1},
+            {
+                "regexp": r"^\s+(\d+):(\d+)\s+(error|warning|info)\s+(.+?)(?:\s\s+(.*))?$",
+                "line": 1,
+                "column": 2,
+                "severity": 3,
+                "message": 4,
+                "code": 5,
+                "loop": True,
+            },
+        ],
+    },
+    "msCompile": {
+        "owner": "msCompile",
+        "fileLocation": "absolute",
+        "pattern": {
+            "regexp": r"^(?:\s*\d+>)?(\S.*?)(?:\((\d+|\d+,\d+|\d+,\d+,\d+,\d+)\))?\s*:\s+"
+            r"(?:(\S+)\s+)?(error|warning|info)\s+(\w+\d+)\s*:\s*(.*)$",
+            "file": 1,
+            "location": 2,
+            "severity": 4,
+            "code": 5,
+            "message": 6,
+        },
+    },
+}
+
+
+class ProblemMatcherError(ValueError):
+    """A problemMatcher definition that is unknown or invalid."""
+
+
+# One problem found in task output; line and column are None when not reported
+Diagnostic = namedtuple("Diagnostic", "file line column severity message code owner")
+
+# A compiled problem pattern: ((field, group), ...) are the fields it captures
+Pattern = namedtuple("Pattern", "regexp groups loop")
+
+# A compiled matcher: file_location is (kind, directory prefix)
+ProblemMatcher = namedtuple("ProblemMatcher", "owner severity file_location patterns")
+
+
+def _builtin(name):
+    builtin = None
+    if isinstance(name, str) and name.startswith("$"):
+        builtin = BUILTIN_MATCHERS.get(name[1:])
+    if builtin is None:
+        raise ProblemMatcherError(f"unknown problem matcher {name!r}")
+    return builtin
+
+
+def _compile_pattern(definition, last):
+    if not isinstance(definition, dict) or not isinstance(definition.get("regexp"), str):
+        raise ProblemMatcherError("a problem pattern needs a 'regexp' string")
+    try:
+        regexp = re.compile(_JS_NAMED_GROUP.sub("(?P<", definition["regexp"]))
+    except re.error as exc:
+        raise ProblemMatcherError(f"invalid regexp {definition['regexp']!r}: {exc}") from None
+    groups = []
+    for field in PATTERN_FIELDS:
+        group = definition.get(field)
+        if group is None:
+            continue
+        if not isinstance(group, int) or isinstance(group, bool) or group < 0:
+            raise ProblemMatcherError(f"pattern field '{field}' must be a group number")
+        if group > regexp.groups:
+            raise ProblemMatcherError(
+                f"pattern field '{field}' refers to group {group}, but "
+                f"{definition['regexp']!r} has only {regexp.groups}"
+            )
+        groups.append((field, group))
+    return Pattern(regexp, tuple(groups), bool(definition.get("loop")) and last)
+
+
+def compile_matcher(definition):
+    """Compile one problemMatcher entry: "$name" (see BUILTIN_MATCHERS) or an object.
+
+    An object's "base" names a built-in matcher whose settings it overrides. Its
+    "pattern" is one pattern object or, for problems reported over several lines,
+    a list of them matched on consecutive lines; the last may set "loop" to match
+    any number of further lines, each a problem of its own. Raises
+    ProblemMatcherError for an unknown name or an invalid definition.
+    """
+    if isinstance(definition, str):
+        definition = _builtin(definition)
+    if not isinstance(definition, dict):
+        raise ProblemMatcherError("a problem matcher must be a name or an object")
+    if definition.get("base") is not None:
+        definition = {**_builtin(definition["base"]), **definition}
+
+    patterns = definition.get("pattern")
+    if isinstance(patterns, dict):
+        patterns = [patterns]
+    if not isinstance(patterns, list) or not patterns:
+        raise ProblemMatcherError("a problem matcher needs a 'pattern' object or list")
+    compiled = tuple(
+        _compile_pattern(pattern, index == len(patterns) - 1)
+        for index, pattern in enumerate(patterns)
+    )
+    fields = {field for pattern in compiled for field, _ in pattern.groups}
+    if "file" not in fields or "message" not in fields:
+        raise ProblemMatcherError("a problem matcher's patterns must capture a file and a message")
+
+    location = definition.get("fileLocation", "relative")
+    if isinstance(location, str):
+        location = [location]
+    if not isinstance(location, list) or not location or location[0] not in FILE_LOCATIONS:
+        raise ProblemMatcherError(f"unsupported fileLocation {definition.get('fileLocation')!r}")
+    kind = location[0]
+    prefix = location[1] if len(location) > 1 and isinstance(location[1], str) else None
+    if kind == "search":  # VS Code searches directories; the workspace folder is checked
+        kind = "autoDetect"
+    severity = _SEVERITIES.get(str(definition.get("severity", "error"))[:1].lower(), "error")
+    return ProblemMatcher(
+        definition.get("owner", "taskrun"),
+        severity,
+        (kind, prefix or "${workspaceFolder}"),
+        compiled,
+    )
+
+
+def compile_matchers(spec):
+    """Return the compiled matchers of a task's "problemMatcher" value (one or a list).
+
+    Definitions are compiled once and shared by every task and run using them.
+    Raises ProblemMatcherError if any of them is invalid.
+    """
+    if not spec:
+        return ()
+    try:
+        key = json.dumps(spec, sort_keys=True)
+    except (TypeError, ValueError):
+        raise ProblemMatcherError("a problem matcher must be a name or an object") from None
+    return _compile_matchers(key)
+
+
+@lru_cache(maxsize=None)
+def _compile_matchers(key):
+    spec = json.loads(key)
+    definitions = spec if isinstance(spec, list) else [spec]
+    return tuple(compile_matcher(definition) for definition in definitions if definition)
+
+
+def _capture(pattern, match, fields):
+    for field, group in pattern.groups:
+        value = match.group(group)
+        if value:
+            fields[field] = value
+
+
+def _number(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+class _MatchState:
+    """One matcher's progress through the lines of one stream.
+
+    ``index`` is the pattern the next line must match (0: none started) and
+    ``fields`` what the earlier patterns of a multi-line problem captured.
+    """
+
+    def __init__(self, matcher, directory):
+        self.matcher = matcher
+        self.directory = directory
+        self.patterns = matcher.patterns
+        self.index = 0
+        self.fields = {}
+
+    def line(self, text):
+        """Advance over one line of output; return the Diagnostic it completes, if any."""
+        patterns = self.patterns
+        if self.index:
+            pattern = patterns[self.index]
+            match = pattern.regexp.search(text)
+            if match is not None:
+                if self.index < len(patterns) - 1:
+                    _capture(pattern, match, self.fields)
+                    self.index += 1
+                    return None
+                fields = dict(self.fields)
+                _capture(pattern, match, fields)
+                if not pattern.loop:
+                    self.index, self.fields = 0, {}
+                return self._diagnostic(fields)
+            self.index, self.fields = 0, {}  # the problem ended; this line may start one
+        pattern = patterns[0]
+        match = pattern.regexp.search(text)
+        if match is None:
+            return None
+        fields = {}
+        _capture(pattern, match, fields)
+        if len(patterns) == 1:
+            return self._diagnostic(fields)
+        self.index, self.fields = 1, fields
+        return None
+
+    def _diagnostic(self, fields):
+        file = fields.get("file")
+        if file is None:
+            return None
+        line, column = _number(fields.get("line")), _number(fields.get("column"))
+        if "location" in fields:
+            parts = fields["location"].split(",")
+            line = _number(parts[0])
+            column = _number(parts[1]) if len(parts) > 1 else None
+        severity = fields.get("severity")
+        severity = _SEVERITIES.get(severity[:1].lower()) if severity else None
+        return Diagnostic(
+            self._path(file.strip()),
+            line,
+            column,
+            severity or self.matcher.severity,
+            fields.get("message", ""),
+            fields.get("code"),
+            self.matcher.owner,
+        )
+
+    def _path(self, file):
+        kind = self.matcher.file_location[0]
+        if kind == "absolute":
+            return os.path.normpath(file)
+        path = os.path.normpath(os.path.join(self.directory, file))
+        if kind == "autoDetect" and not os.path.exists(path):
+            return os.path.normpath(file)
+        return path
+
+
+def _directory(matcher, root_dir, cwd):
+    # ${cwd} is the task's working directory, which relative tool output refers to
+    prefix = matcher.file_location[1].replace("${cwd}", cwd or root_dir)
+    return os.path.join(root_dir, expand_variables(prefix, root_dir))
+
+
+class ProblemScanner:
+    """Applies problem matchers to one output stream of a task, a chunk at a time.
+
+    Only the unterminated last line (at most output.MAX_LINE bytes) and each
+    matcher's progress through a multi-line problem are kept, so memory stays
+    constant however long the output. Every problem found is passed to ``report``.
+    """
+
+    def __init__(self, matchers, report, root_dir, cwd=None):
+        self._states = [
+            _MatchState(matcher, _directory(matcher, root_dir, cwd)) for matcher in matchers
+        ]
+        self._report = report
+        self._partial = b""
+
+    def feed(self, chunk):
+        data = self._partial + chunk if self._partial else chunk
+        end = data.rfind(b"\n") + 1
+        if end:
+            for line in data[: end - 1].decode("utf-8", "replace").split("\n"):
+                self._line(line)
+            data = data[end:]
+        if len(data) > MAX_LINE:
+            self._line(data.decode("utf-8", "replace"))
+            data = b""
+        self._partial = data
+
+    def close(self):
+        """Match the unterminated last line, if any, at EOF."""
+        if self._partial:
+            self._line(self._partial.decode("utf-8", "replace"))
+        self._partial = b""
+
+    def _line(self, text):
+        if "\x1b" in text:  # tools forcing colour still match
+            text = _ANSI_ESCAPE.sub("", text)
+        text = text.rstrip("\r")
+        for state in self._states:
+            diagnostic = state.line(text)
+            if diagnostic is not None:
+                self._report(diagnostic)
+
+
+def format_diagnostic(diagnostic, relative_to=None):
+    """Return a diagnostic as a ``file:line:column: severity: message [code]`` line.
+
+    The file is shown relative to ``relative_to`` when it lies below it.
+    """
+    file = diagnostic.file
+    if relative_to is not None:
+        relative = os.path.relpath(file, relative_to) if os.path.isabs(file) else file
+        if not relative.startswith(os.pardir):
+            file = relative
+    if diagnostic.line is not None:
+        file += f":{diagnostic.line}"
+        if diagnostic.column is not None:
+            file += f":{diagnostic.column}"
+    text = f"{file}: {diagnostic.severity}: {diagnostic.message}"
+    return text + f" [{diagnostic.code}]" if diagnostic.code else text
+
+
+class Diagnostics:
+    """The problems the tasks of a run report, deduplicated, in the order first seen.
+
+    Fed from the OutputMux thread, by the ProblemScanners of scanners(). At most
+    ``limit`` distinct problems are kept; any beyond are only counted in
+    ``dropped``.
+    """
+
+    def __init__(self, limit=MAX_PROBLEMS):
+        self.limit = limit
+        self.dropped = 0
+        self._seen = {}  # Diagnostic -> None: an insertion-ordered set
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __iter__(self):
+        return iter(list(self._seen))
+
+    def add(self, diagnostic):
+        if diagnostic in self._seen:
+            return
+        if len(self._seen) >= self.limit:
+            self.dropped += 1
+            return
+        self._seen[diagnostic] = None
+
+    def scanners(self, task):
+        """Return a factory of ProblemScanners for the output streams of ``task``.
+
+        Each invalid definition in the task's problemMatcher is reported on stderr
+        and skipped; the others are still used. Returns None if the task has no
+        valid matcher (it still runs).
+        """
+        spec = task.problem_matcher
+        matchers = []
+        for definition in spec if isinstance(spec, list) else [spec]:
+            try:
+                matchers.extend(compile_matchers(definition))
+            except ProblemMatcherError as exc:
+                print(f"Warning: task '{task.label}': {exc}", file=sys.stderr)
+        if not matchers:
+            return None
+        return partial(ProblemScanner, tuple(matchers), self.add, task.root_dir, task.cwd)
+
+    def report(self, relative_to=None, file=None):
+        """Print every problem, then the number of each severity."""
+        if not self._seen and not self.dropped:
+            return
+        file = file or sys.stdout
+        counts = {}
+        print("\nProblems:", file=file)
+        for diagnostic in self._seen:
+            counts[diagnostic.severity] = counts.get(diagnostic.severity, 0) + 1
+            print(f"  {format_diagnostic(diagnostic, relative_to)}", file=file)
+        totals = ", ".join(
+            f"{counts[severity]} {severity}{'' if counts[severity] == 1 else 's'}"
+            for severity in ("error", "warning", "info")
+            if severity in counts
+        )
+        if self.dropped:
+            totals += f" (and {self.dropped} more not shown)"
+        print(f"  {totals}", file=file)
+
+    def write_quickfix(self, path):
+        """Write the problems to ``path`` in quickfix format, one per line, with
+        absolute file names (load it in Vim with :TaskrunProblems or :cfile).
+
+        The file is replaced atomically. Raises OSError if it cannot be written.
+        """
+
+        def write(fh):
+            for diagnostic in self._seen:
+                absolute = diagnostic._replace(file=os.path.abspath(diagnostic.file))
+                fh.write(format_diagnostic(absolute) + "\n")
+
+        write_atomic(path, write)
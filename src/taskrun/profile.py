@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _maxrss_kib(rusage):
+    # ru_maxrss is in KiB on Linux but in bytes on macOS
+    return rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+
+
+class TaskTiming:
+    """Wall and CPU time and peak memory of one executed task."""
+
+    def __init__(self, label, start, end, rusage, exit_code, lane):
+        self.label = label
+        self.start = start  # perf_counter seconds
+        self.end = end
+        self.user = rusage.ru_utime
+        self.sys = rusage.ru_stime
+        self.max_rss_kib = _maxrss_kib(rusage)
+        self.exit_code = exit_code
+        self.lane = lane  # which worker ran it, for the trace timeline
+
+    @property
+    def wall(self):
+        return self.end - self.start
+
+
+class Profile:
+    """Timings collected over one taskrun invocation (see --profile and --trace).
+
+    Phases (parse, schedule, inputs, ...) are taskrun's own work; tasks are the
+    executed child processes. Both are safe to record from worker threads.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []  # (name, start, end, lane)
+        self.tasks = {}  # label -> TaskTiming
+        self.order = []  # the scheduled graph (see scheduler.build_graph)
+        self.prereqs = {}
+        self._lock = threading.Lock()
+        self._lanes = {}  # thread ident -> small lane number
+
+    @contextmanager
+    def phase(self, name):
+        """Record the time spent in the with-block as a named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases.append((name, start, end, self._lane()))
+
+    def _lane(self):
+        return self._lanes.setdefault(threading.get_ident(), len(self._lanes))
+
+    def record_task(self, label, start, end, rusage, exit_code):
+        with self._lock:
+            self.tasks[label] = TaskTiming(label, start, end, rusage, exit_code, self._lane())
+
+    def phase_totals(self):
+        """Return {phase name: total seconds}, in first-seen order."""
+        totals = {}
+        for name, start, end, _ in self.phases:
+            totals[name] = totals.get(name, 0.0) + end - start
+        return totals
+
+    def critical_path(self):
+        """Return (seconds, labels) of the longest chain of executed tasks.
+
+        Chains follow the scheduled dependsOn graph and are weighted by each task's
+        wall time; tasks that did not execute (skipped or up to date) weigh zero.
+        """
+        finish = {}
+        via = {}
+        for label in self.order:  # topological: prerequisites come first
+            best = None
+            for need in sorted(self.prereqs.get(label, ())):
+                if best is None or finish[need] > finish[best]:
+                    best = need
+            timing = self.tasks.get(label)
+            finish[label] = (finish[best] if best is not None else 0.0) + (
+                timing.wall if timing else 0.0
+            )
+            via[label] = best
+        if not finish:
+            return 0.0, []
+        end = max(self.order, key=finish.__getitem__)
+        path = []
+        while end is not None:
+            path.append(end)
+            end = via[end]
+        return finish[path[0]], path[::-1]
+
+    def report(self, file=None):
+        """Print the per-task table, phase totals and critical path."""
+        file = file or sys.stderr
+        print("\nProfile:", file=file)
+        for name, seconds in self.phase_totals().items():
+            print(f"  {name:<12} {seconds * 1000:9.1f} ms", file=file)
+        if self.tasks:
+            width = max(len("task"), *(len(label) for label in self.tasks))
+            print(
+                f"  {'task':<{width}}  {'wall':>8}  {'user':>8}  {'sys':>8}  {'max RSS':>11}  exit",
+                file=file,
+            )
+            for timing in sorted(self.tasks.values(), key=lambda t: t.start):
+                print(
+                    f"  {timing.label:<{width}}  {timing.wall:7.2f}s  {timing.user:7.2f}s  "
+                    f"{timing.sys:7.2f}s  {timing.max_rss_kib / 1024:7.1f} MiB  "
+                    f"{timing.exit_code}",
+                    file=file,
+                )
+        seconds, path = self.critical_path()
+        if path:
+            print(f"  critical path ({seconds:.2f}s): {' -> '.join(path)}", file=file)
+
+    def chrome_trace(self):
+        """Return the run as Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+
+        def micros(seconds):
+            return round((seconds - self.origin) * 1e6)
+
+        events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "taskrun"}},
+        ]
+        for name, start, end, lane in self.phases:
+            events.append(
+                {
+                    "name": name,
+                    "cat": "taskrun",
+                    "ph": "X",
+                    "ts": micros(start),
+                    "dur": micros(end) - micros(start),
+                    "pid": pid,
+                    "tid": lane,
+                }
+            )
+        for timing in self.tasks.values():
+            events.append(
+                {
+                    "name": timing.label,
+                    "cat": "task",
+                    "ph": "X",
+                    "ts": micros(timing.start),
+                    "dur": micros(timing.end) - micros(timing.start),
+                    "pid": pid,
+                    "tid": timing.lane,
+                    "args": {
+                        "exit": timing.exit_code,
+                        "user_s": round(timing.user, 6),
+                        "sys_s": round(timing.sys, 6),
+                        "max_rss_kib": timing.max_rss_kib,
+                        "depends_on": sorted(self.prereqs.get(timing.label, ())),
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as fh:
+            json.dump(self.chrome_trace(), fh)
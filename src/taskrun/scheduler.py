@@ -0,0 +1,250 @@
+import heapq
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from taskrun.admission import PRESSURE_POLL_INTERVAL, Admission
+
+# Result of a task whose run_task raised, e.g. because its program does not exist
+# (the shell's "command not found" status)
+LAUNCH_FAILED = 127
+
+
+class DependencyCycleError(ValueError):
+    """Raised when the dependsOn graph of the requested tasks contains a cycle."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__("circular dependency: " + " -> ".join(cycle))
+
+
+def build_graph(workspace, targets):
+    """Build the dependency graph reachable from the target labels.
+
+    Returns (order, prereqs): ``order`` is a topological ordering of every reachable
+    label (prerequisites first) and ``prereqs`` maps each label to the set of labels
+    that must succeed before it may start. A "sequence" dependsOrder is modelled as
+    extra edges chaining each dependency to the one listed before it. Raises
+    DependencyCycleError if the graph is cyclic.
+    """
+    prereqs = {}
+    seen = set()
+    stack = list(reversed(targets))
+    discovered = []
+    while stack:
+        label = stack.pop()
+        if label in seen:
+            continue
+        seen.add(label)
+        discovered.append(label)
+        task = workspace.get(label)
+        deps = []
+        for dep_label in task.depends_on:
+            if dep_label not in workspace:
+                print(f"Warning: dependency task '{dep_label}' not found.")
+                continue
+            deps.append(dep_label)
+        prereqs.setdefault(label, set()).update(deps)
+        if task.depends_order == "sequence":
+            # Each sequenced dependency also waits for the one listed before it
+            for before, after in zip(deps, deps[1:]):
+                prereqs.setdefault(after, set()).add(before)
+        stack.extend(reversed(deps))
+
+    # Kahn's algorithm, keeping discovery order among ready labels for stable output
+    remaining = {label: len(prereqs[label]) for label in discovered}
+    dependents = {label: [] for label in discovered}
+    for label in discovered:
+        for need in prereqs[label]:
+            dependents[need].append(label)
+    ready = [label for label in reversed(discovered) if not remaining[label]]
+    order = []
+    while ready:
+        label = ready.pop()
+        order.append(label)
+        for dependent in dependents[label]:
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                ready.append(dependent)
+
+    if len(order) < len(discovered):
+        raise DependencyCycleError(_find_cycle(prereqs, set(discovered) - set(order)))
+
+    return order, prereqs
+
+
+def _find_cycle(prereqs, candidates):
+    """Return one cycle, as a list of labels, among the given unsortable labels."""
+    start = min(candidates)
+    path = [start]
+    position = {start: 0}
+    current = start
+    while True:
+        current = min(need for need in prereqs[current] if need in candidates)
+        if current in position:
+            return path[position[current] :] + [current]
+        position[current] = len(path)
+        path.append(current)
+
+
+def _dependents(order, prereqs):
+    dependents = {label: [] for label in order}
+    for label in order:
+        for need in prereqs[label]:
+            dependents[need].append(label)
+    return dependents
+
+
+def _mean_estimate(order, estimates):
+    known = [estimates[label] for label in order if label in estimates]
+    return sum(known) / len(known) if known else 0.0
+
+
+def critical_paths(order, prereqs, estimates):
+    """Return label -> estimated seconds from a task's start to the end of the run.
+
+    That is the task's own estimate plus the longest chain of dependents after it,
+    given ``estimates`` (label -> expected duration). Labels without an estimate
+    are assumed to take the mean of the known ones.
+    """
+    default = _mean_estimate(order, estimates)
+    dependents = _dependents(order, prereqs)
+    paths = {}
+    for label in reversed(order):  # dependents before the tasks they wait for
+        tail = max((paths[dependent] for dependent in dependents[label]), default=0.0)
+        paths[label] = estimates.get(label, default) + tail
+    return paths
+
+
+def estimate_duration(order, prereqs, estimates, jobs):
+    """Return the expected wall time of running the graph with ``jobs`` slots.
+
+    This is the larger of the critical path and the total work spread evenly over
+    the slots, a lower bound that list scheduling stays close to in practice.
+    """
+    paths = critical_paths(order, prereqs, estimates)
+    if not paths:
+        return 0.0
+    default = _mean_estimate(order, estimates)
+    work = sum(estimates.get(label, default) for label in order)
+    return max(max(paths.values()), work / jobs)
+
+
+def run_graph(
+    workspace,
+    targets,
+    run_task,
+    jobs=1,
+    graph=None,
+    priority=None,
+    keep_going=True,
+    admission=None,
+    console=None,
+):
+    """Run every task reachable from ``targets`` exactly once, respecting dependsOn.
+
+    ``run_task(task)`` executes a single task and returns its exit code; if it
+    raises (say, the program or cwd does not exist), the error is reported and the
+    task fails with LAUNCH_FAILED, like any other failure. A task is
+    started as soon as all of its prerequisites have succeeded and enough of the
+    ``jobs`` slots are free for its cost (see admission.Admission, which may also
+    hold launches back under system pressure); tasks whose prerequisites failed are
+    skipped. Ready tasks start in order of highest ``priority`` (label -> number,
+    e.g. critical_paths), then earliest in the graph order; a task that does not
+    fit yet is not overtaken by cheaper ones behind it.
+    With ``keep_going=False`` the first failure stops any further task from being
+    started (running ones finish). Returns a dict label -> exit code (None for
+    skipped tasks), in completion order. ``graph`` is build_graph's result, if the
+    caller already has it. Progress messages go to ``console`` (default: stdout).
+    """
+    order, prereqs = graph or build_graph(workspace, targets)
+    waiting = {label: set(prereqs[label]) for label in order}
+    dependents = _dependents(order, prereqs)
+    position = {label: index for index, label in enumerate(order)}
+    priority = priority or {}
+
+    def rank(label):
+        return (-priority.get(label, 0.0), position[label], label)
+
+    ready = [rank(label) for label in order if not waiting[label]]
+    heapq.heapify(ready)
+
+    admission = admission or Admission()
+    used = 0  # slots taken by running tasks
+    held_back = None  # the pressure reason last reported
+    results = {}
+    running = {}
+    stopped_by = None  # first failed task, once a fail-fast run stops starting tasks
+
+    def skip(label, cause):
+        # Mark everything downstream of a failed task as not run
+        stack = [label]
+        while stack:
+            current = stack.pop()
+            if current in results:
+                continue
+            results[current] = None
+            waiting.pop(current, None)
+            print(f"Skipping task '{current}': dependency '{cause}' failed.", file=console)
+            stack.extend(dependents[current])
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while waiting or running:
+            pressure = None
+            while ready and stopped_by is None:
+                task = workspace.get(ready[0][2])
+                cost = admission.cost(task, jobs)
+                if used + cost > jobs:
+                    break
+                pressure = admission.pressure() if running else None
+                if pressure:
+                    if pressure != held_back:
+                        print(f"Holding back task '{task.label}': {pressure}.", file=console)
+                    break
+                heapq.heappop(ready)
+                del waiting[task.label]
+                used += cost
+                running[pool.submit(run_task, task)] = (task.label, cost)
+            held_back = pressure
+            if not running:
+                break
+            timeout = PRESSURE_POLL_INTERVAL if pressure else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                label, cost = running.pop(future)
+                used -= cost
+                try:
+                    ret = future.result()
+                except Exception as exc:
+                    message = f"Error: task '{label}' could not run: {exc}"
+                    print(message, file=console or sys.stderr)
+                    ret = LAUNCH_FAILED
+                results[label] = ret
+                if label not in targets:
+                    print(f"Task '{label}' finished (exit {ret}).", file=console)
+                if ret != 0 and not keep_going and stopped_by is None:
+                    stopped_by = label
+                for dependent in dependents[label]:
+                    if ret != 0:
+                        skip(dependent, label)
+                    elif dependent in waiting:
+                        waiting[dependent].discard(label)
+                        if not waiting[dependent]:
+                            heapq.heappush(ready, rank(dependent))
+
+    for label in order:
+        if label not in results:  # only left over when a fail-fast run stopped
+            results[label] = None
+            message = f"Skipping task '{label}': stopped after '{stopped_by}' failed."
+            print(message, file=console)
+    return results
+
+
+def exit_code(results, targets):
+    """Return the overall exit code for a run: the first non-zero task result."""
+    for label in targets:
+        if results.get(label):
+            return results[label]
+    for ret in results.values():
+        if ret:
+            return ret
+    return 0
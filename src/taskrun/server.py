@@ -0,0 +1,273 @@
+import codecs
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from taskrun.cache import (
+    cache_dir,
+    frecency_scores,
+    ranked_labels,
+    record_task_run,
+    sort_tasks_by_rank,
+)
+from taskrun.discovery import find_tasks_file, root_dir_for
+from taskrun.fuzzy import FuzzyIndex
+from taskrun.parser import load_workspace
+from taskrun.task import RunOptions
+from taskrun.variables import VariableContext, collect_input_ids
+from taskrun.workspace import Workspace
+
+# Seconds between checks of the loaded tasks.json files for changes
+POLL_INTERVAL = 1.0
+
+
+def socket_path():
+    """Return the Unix socket the daemon listens on ($TASKRUN_SOCKET overrides)."""
+    return os.environ.get("TASKRUN_SOCKET") or os.path.join(cache_dir(), "server.sock")
+
+
+def _signature(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class WorkspaceCache:
+    """Parsed workspaces kept in memory and reloaded when their tasks.json changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # tasks.json path -> (signature, workspace)
+
+    def get(self, cwd):
+        """Return the Workspace for a working directory, or None if it has no tasks.json."""
+        file_path = find_tasks_file(cwd)  # memoized and revalidated per call
+        if file_path is None:
+            return None
+        return self._load(file_path)
+
+    def _load(self, file_path):
+        signature = _signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        workspace = load_workspace(root_dir_for(file_path), file_path)
+        with self._lock:
+            self._entries[file_path] = (signature, workspace)
+        return workspace
+
+    def refresh(self):
+        """Reparse any loaded tasks.json that changed; forget ones that disappeared."""
+        with self._lock:
+            paths = list(self._entries)
+        for file_path in paths:
+            try:
+                self._load(file_path)
+            except OSError:
+                with self._lock:
+                    self._entries.pop(file_path, None)
+            except ValueError as exc:
+                # Mid-edit files may briefly be invalid; keep serving the last good parse
+                print(f"taskrun: failed to reload {file_path}: {exc}", file=sys.stderr)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch(json.loads(line), self._send)
+            except Exception as exc:  # report, never kill the daemon
+                response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            try:
+                self._send(response)
+            except OSError:
+                return
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+
+class TaskServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answers newline-delimited JSON requests over a Unix socket.
+
+    Requests carry an "op" and the client's "cwd"; "resolve" and "run" also carry
+    its "env" (a dict), since tasks are expanded and run as if by the client:
+    ${cwd}, ${env:VAR} and the tasks' environment come from these, never from the
+    daemon's own state, and nothing expanded for one client is kept for another.
+      list     -> {"ok": true, "labels": [...]}  (visible tasks in menu order)
+      query    -> {"ok": true, "labels": [...]}  (visible tasks fuzzy-matching the
+                  request's "query", best first; see fuzzy.FuzzyIndex)
+      resolve  -> {"ok": true, "task": {...}}    (expanded command, args, cwd, ...)
+      run      -> zero or more {"out": "..."} messages with the tasks' output, then
+                  {"ok": true, "exit": N}
+    A client can thus run any command as the daemon's user, so the socket is only
+    accessible to that user (mode 0600).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.workspaces = WorkspaceCache()
+        super().__init__(path, _Handler)
+
+    def server_bind(self):
+        # Created with the restrictive mode already, so it is never briefly open to others
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+    def dispatch(self, request, send):
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        workspace = self.workspaces.get(request.get("cwd") or os.getcwd())
+        if workspace is None:
+            return {"ok": False, "error": "tasks.json not found"}
+
+        if op == "list":
+            ranked = sort_tasks_by_rank(workspace.visible(), ranked_labels(workspace.root_dir))
+            return {"ok": True, "labels": [task.label for task in ranked]}
+        if op == "query":
+            ranked = sort_tasks_by_rank(workspace.visible(), ranked_labels(workspace.root_dir))
+            index = FuzzyIndex([task.label for task in ranked], frecency_scores(workspace.root_dir))
+            return {"ok": True, "labels": index.rank(request.get("query") or "")}
+
+        task = workspace.get(request.get("label"))
+        if task is None:
+            return {"ok": False, "error": f"No task found with label: {request.get('label')}"}
+        environ = request.get("env")
+        if environ is not None and not isinstance(environ, dict):
+            return {"ok": False, "error": "env must be an object"}
+
+        def context(task):
+            return VariableContext(task.root_dir, request.get("cwd") or os.getcwd(), environ)
+
+        if op == "resolve":
+            task = task.in_context(context(task))
+            return {
+                "ok": True,
+                "task": {
+                    "label": task.label,
+                    "type": task.task_type,
+                    "command": task.command,
+                    "args": task.args,
+                    "cwd": task.cwd,
+                    "dependsOn": task.depends_on,
+                    "dependsOrder": task.depends_order,
+                },
+            }
+        if op == "run":
+            return self._run(workspace, task, context, request.get("jobs"), send)
+        return {"ok": False, "error": f"unknown op: {op!r}"}
+
+    def _run(self, workspace, task, context, jobs, send):
+        from taskrun.scheduler import build_graph
+
+        # The run's tasks are copies expanded for this client (see Task.in_context)
+        order, _ = build_graph(workspace, [task.label])
+        tasks = [workspace.get(label).in_context(context(workspace.get(label))) for label in order]
+        for dep in tasks:
+            if collect_input_ids([dep.command] + dep.args):
+                return {"ok": False, "error": f"task '{dep.label}' needs interactive input"}
+        workspace = Workspace(
+            tasks, workspace.inputs_defs, root_dir=workspace.root_dir, file_path=workspace.file_path
+        )
+
+        read_fd, write_fd = os.pipe()
+        # taskrun's own messages (task headers, progress) go to the client too
+        console = os.fdopen(os.dup(write_fd), "w", buffering=1, encoding="utf-8")
+
+        def forward():
+            # Incremental decoding so multi-byte characters split across reads survive
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            with os.fdopen(read_fd, "rb") as pipe:
+                for chunk in iter(lambda: pipe.read1(65536), b""):
+                    send({"out": decoder.decode(chunk)})
+
+        forwarder = threading.Thread(target=forward, daemon=True)
+        forwarder.start()
+        try:
+            record_task_run(workspace.root_dir, task.label)
+            ret = workspace.get(task.label).run(
+                workspace,
+                jobs=jobs,
+                stdout=write_fd,
+                stderr=write_fd,
+                run_options=RunOptions(console=console),
+            )
+        finally:
+            console.close()
+            os.close(write_fd)
+            forwarder.join()
+        return {"ok": True, "exit": ret}
+
+
+def send_request(request, path=None, timeout=5.0):
+    """Send one request to a running daemon and return its final response.
+
+    Returns None when no daemon is listening. ``{"out": ...}`` messages from a run
+    request are written to stdout as they arrive. A resolve or run request is sent
+    with this process's cwd and environment unless it already has them.
+    """
+    if request.get("op") in ("resolve", "run"):
+        request = {"cwd": os.getcwd(), "env": dict(os.environ), **request}
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        if request.get("op") == "run":
+            sock.settimeout(None)
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+                continue
+            return message
+    return None
+
+
+def serve(path=None):
+    """Run the daemon in the foreground until interrupted."""
+    path = path or socket_path()
+    if os.path.exists(path):
+        if send_request({"op": "ping"}, path, timeout=1.0) is not None:
+            print(f"taskrun: a server is already listening on {path}", file=sys.stderr)
+            sys.exit(1)
+        os.unlink(path)  # stale socket from a daemon that died
+
+    server = TaskServer(path)
+
+    def poll():
+        while True:
+            time.sleep(POLL_INTERVAL)
+            server.workspaces.refresh()
+
+    threading.Thread(target=poll, daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"taskrun: serving on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
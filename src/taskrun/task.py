@@ -1,16 +1,233 @@
+import os
+import re
 import shlex
-import subprocess
-
-from simple_term_menu import TerminalMenu
+import signal
+import sys
+import threading
+import time
+from collections import ChainMap, namedtuple
+from contextlib import nullcontext
+from functools import partial
 
 from taskrun.variables import collect_input_ids, expand_variables
+from taskrun.workspace import Workspace
+
+_base_env = None
+
+
+def base_environment():
+    """Return the snapshot of os.environ shared as the base of every task's env."""
+    global _base_env
+    if _base_env is None:
+        _base_env = dict(os.environ)
+    return _base_env
+
+
+def overlay_environment(overrides, base=None):
+    """Return a task env: ``overrides`` layered over the shared base snapshot.
+
+    Lookups fall through to the base; writes only touch the (small) overlay dict.
+    A ``base`` mapping (e.g. a daemon client's environment) replaces the snapshot.
+    """
+    return ChainMap(dict(overrides), base_environment() if base is None else base)
+
+
+def default_jobs():
+    """Return the default cap on concurrently running task processes."""
+    return os.cpu_count() or 1
+
+
+def wait_process(process):
+    """Reap a Popen child with os.wait4; return (exit code, rusage).
+
+    The exit code follows Popen.returncode conventions (-N for death by signal N),
+    and is stored on ``process`` so Popen does not try to reap it again.
+    """
+    _, status, rusage = os.wait4(process.pid, 0)
+    if os.WIFSIGNALED(status):
+        code = -os.WTERMSIG(status)
+    else:
+        code = os.WEXITSTATUS(status)
+    process.returncode = code
+    return code, rusage
+
+
+# Characters that give a command line meaning beyond its words (quotes are fine:
+# shlex splits them as /bin/sh would when none of these appear)
+SHELL_METACHARACTERS = frozenset("|&;<>()$`\\*?[]#~{}!\n")
+
+# Words that /bin/sh runs itself, or runs differently from the binary of that name
+SHELL_BUILTINS = frozenset(
+    """. : alias bg break case cd command continue do done echo elif else esac eval exec
+    exit export fg fi for function getopts hash if jobs printf read readonly return select
+    set shift source then time times trap type ulimit umask unalias unset until wait
+    while""".split()
+)
+
+# Signals Python ignores that a child should start with default handling
+_RESTORED_SIGNALS = tuple(
+    getattr(signal, name) for name in ("SIGPIPE", "SIGXFZ", "SIGXFSZ") if hasattr(signal, name)
+)
+
+
+def shell_argv(command):
+    """Return the argv a shell command line amounts to, or None if it needs a shell.
+
+    A command without metacharacters, variable assignments or shell builtins is
+    just words, so it can be started directly instead of through /bin/sh -c.
+    """
+    if not command or not SHELL_METACHARACTERS.isdisjoint(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in SHELL_BUILTINS or "=" in argv[0]:
+        return None
+    return argv
+
+
+class DirectProcess:
+    """A child started by spawn_direct, with the Popen attributes taskrun uses."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+
+_which_cache = {}
+
 
+def _which(program, path):
+    # A PATH search stats every directory; tight loops look the same programs up
+    key = (program, path)
+    found = _which_cache.get(key)
+    if found is None:
+        import shutil
 
-def resolve_inputs(input_ids, inputs_defs):
-    """Prompt the user for each required input and return a dict of id -> value."""
+        found = shutil.which(program, path=path)
+        if found is not None:
+            _which_cache[key] = found
+    return found
+
+
+def spawn_direct(argv, cwd=None, env=None, stdout=None, stderr=None, new_session=False):
+    """Start argv with os.posix_spawn, without subprocess's fork and exec setup.
+
+    Returns a DirectProcess, or None where posix_spawn cannot do what Popen would:
+    it is unavailable, ``cwd`` is not taskrun's own (posix_spawn cannot chdir),
+    ``stdout``/``stderr`` are not file descriptors, the program is not found, or
+    the spawn fails. Callers then fall back to subprocess.Popen.
+    """
+    if not hasattr(os, "posix_spawn"):
+        return None
+    if cwd and os.path.realpath(cwd) != os.getcwd():
+        return None
+    file_actions = []
+    for fd, target in ((stdout, 1), (stderr, 2)):
+        if fd is None:
+            continue
+        if not isinstance(fd, int) or fd < 0:  # file objects, subprocess.PIPE/DEVNULL
+            return None
+        file_actions.append((os.POSIX_SPAWN_DUP2, fd, target))
+    environ = os.environ if env is None else env
+    program = argv[0]
+    if os.sep not in program:
+        program = _which(program, environ.get("PATH", os.defpath))
+        if program is None:
+            return None
+    try:
+        pid = os.posix_spawn(
+            program,
+            argv,
+            environ,
+            file_actions=file_actions,
+            setsid=new_session,
+            setsigdef=_RESTORED_SIGNALS,
+        )
+    except OSError:
+        return None
+    return DirectProcess(pid)
+
+
+class RunControl:
+    """Lets another thread cancel a run that is in progress.
+
+    Tasks executed under a RunControl start in their own process group, so that
+    cancel() can signal a shell task's children too; once cancelled, no further
+    task of the run starts.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    def started(self, process):
+        """Register a task's child process (signalled at once if already cancelled)."""
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self.cancelled
+        if cancelled:
+            _signal_group(process, signal.SIGTERM)
+
+    def finished(self, process):
+        """Forget a child process once it has been reaped."""
+        with self._lock:
+            self._processes.discard(process)
+
+    def cancel(self, sig=signal.SIGTERM):
+        """Stop the run: send ``sig`` to every running task's process group."""
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            _signal_group(process, sig)
+
+
+def _signal_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except OSError:  # already gone
+        pass
+
+
+class MissingInputError(ValueError):
+    """Raised when an input has no value and cannot be prompted for."""
+
+    def __init__(self, input_id):
+        self.input_id = input_id
+        super().__init__(
+            f"input '{input_id}' has no value; pass --input {input_id}=VALUE "
+            f"or set ${input_env_var(input_id)}"
+        )
+
+
+def input_env_var(input_id):
+    """Return the environment variable that supplies an input's value."""
+    return "TASKRUN_INPUT_" + re.sub(r"\W", "_", input_id).upper()
+
+
+def resolve_inputs(input_ids, inputs, answers=None, interactive=True):
+    """Return a dict of id -> value for each required input.
+
+    ``inputs`` maps input id -> input definition (see Workspace.inputs). A value is
+    taken from ``answers`` (id -> value), else from $TASKRUN_INPUT_<ID>, else the
+    user is prompted. With ``interactive=False`` the input's default is used
+    instead of prompting, and MissingInputError is raised if it has none.
+    """
+    answers = answers or {}
     resolved = {}
     for input_id in sorted(input_ids):
-        input_def = next((i for i in inputs_defs if i.get("id") == input_id), None)
+        if input_id in answers:
+            resolved[input_id] = answers[input_id]
+            continue
+        env_value = os.environ.get(input_env_var(input_id))
+        if env_value is not None:
+            resolved[input_id] = env_value
+            continue
+
+        input_def = inputs.get(input_id)
         if input_def is None:
             continue
 
@@ -18,7 +235,12 @@ def resolve_inputs(input_ids, inputs_defs):
         description = input_def.get("description", input_id)
         default = input_def.get("default", "")
 
-        if input_type == "promptString":
+        if not interactive:
+            if "default" not in input_def:
+                raise MissingInputError(input_id)
+            resolved[input_id] = default
+
+        elif input_type == "promptString":
             prompt = description
             if default:
                 prompt += f" [{default}]"
@@ -39,6 +261,8 @@ def resolve_inputs(input_ids, inputs_defs):
                     labels.append(label)
                     values.append(val)
 
+            from simple_term_menu import TerminalMenu
+
             cursor = values.index(default) if default in values else 0
             print(description)
             terminal_menu = TerminalMenu(labels, cursor_index=cursor)
@@ -50,7 +274,114 @@ def resolve_inputs(input_ids, inputs_defs):
     return resolved
 
 
+# What a run works with besides its tasks, each optional: a FingerprintStore (skips
+# up-to-date tasks), OutputMux (streams output), problems.Diagnostics (collects the
+# problems in it), Profile (records timings), RunControl (cancels the run), the file
+# for taskrun's own messages (default: stdout) and an Admission (slot costs, pressure)
+RunOptions = namedtuple(
+    "RunOptions",
+    "fingerprints output problems profile control console admission",
+    defaults=(None,) * 7,
+)
+
+
+def run_tasks(
+    workspace,
+    labels,
+    jobs=None,
+    stdout=None,
+    stderr=None,
+    estimates=None,
+    slow_estimates=None,
+    durations=None,
+    keep_going=True,
+    answers=None,
+    interactive=True,
+    only=None,
+    run_options=RunOptions(),
+):
+    """Run the tasks with the given labels after their dependsOn graphs, each once.
+
+    Returns label -> exit code as scheduler.run_graph does, at most ``jobs`` tasks
+    running at once. Every ${input:ID} is resolved before any task starts (see
+    resolve_inputs). ``estimates`` (and ``slow_estimates``) order the tasks and
+    report the expected duration; measured ones are added to ``durations``. With
+    ``only``, just those labels of the graph run.
+    """
+    from taskrun.scheduler import build_graph, critical_paths, estimate_duration, run_graph
+
+    fingerprints, output, problems, profile, control, console, admission = run_options
+
+    def run_task(task):
+        if control is not None and control.cancelled:
+            return -signal.SIGTERM
+        if fingerprints is not None and fingerprints.up_to_date(task):
+            print(f"Task '{task.label}' is up to date, skipping.", file=console)
+            return 0
+        start = time.perf_counter()
+        ret = task.execute(
+            stdout=stdout,
+            stderr=stderr,
+            output=output,
+            profile=profile,
+            answers=resolved,
+            control=control,
+            problems=problems,
+            console=console,
+        )
+        if durations is not None:
+            durations[task.label] = time.perf_counter() - start
+        if ret == 0 and fingerprints is not None:
+            fingerprints.record(task)
+        return ret
+
+    with profile.phase("schedule") if profile else nullcontext():
+        graph = build_graph(workspace, labels)
+        if only is not None:
+            order = [label for label in graph[0] if label in only]
+            graph = order, {label: graph[1][label] & set(only) for label in order}
+    if profile:
+        profile.order, profile.prereqs = graph
+
+    input_ids = set()
+    for label in graph[0]:
+        task = workspace.get(label)
+        input_ids |= collect_input_ids([task.command] + task.args)
+    resolved = {}
+    if input_ids:
+        with profile.phase("inputs") if profile else nullcontext():
+            resolved = resolve_inputs(input_ids, workspace.inputs, answers, interactive)
+        if answers is not None:
+            answers.update(resolved)
+
+    jobs = jobs or default_jobs()
+    priority = None
+    if estimates and any(label in estimates for label in graph[0]):
+        priority = critical_paths(*graph, estimates)
+        expected = f"{estimate_duration(*graph, estimates, jobs):.1f}s"
+        if slow_estimates:
+            slow = estimate_duration(*graph, {**estimates, **slow_estimates}, jobs)
+            if f"{slow:.1f}s" != expected:
+                expected += f" (slow runs: {slow:.1f}s)"
+        print(f"Estimated duration: {expected}", file=console)
+    with output or nullcontext():
+        return run_graph(
+            workspace,
+            labels,
+            run_task,
+            jobs=jobs,
+            graph=graph,
+            priority=priority,
+            keep_going=keep_going,
+            admission=admission,
+            console=console,
+        )
+
+
 class Task:
+    # Fields a deferred task computes on first access (see Task.deferred)
+    DEFERRED_FIELDS = ("command", "args", "cwd", "env")
+
     def __init__(
         self,
         label,
@@ -63,69 +394,245 @@ class Task:
         depends_order,
         root_dir,
         hide,
+        extensions=None,
+        problem_matcher=None,
     ):
         self.label = label
         self.command = command  # may still contain ${input:ID}
         self.args = args  # may still contain ${input:ID}
         self.cwd = cwd
-        self.env = env
+        self.env = env  # mapping, typically overlay_environment(options.env)
         self.task_type = task_type  # "shell" or "process"
         self.depends_on = depends_on  # list of label strings
         self.depends_order = depends_order  # "parallel" | "sequence"
         self.root_dir = root_dir
         self.hide = hide  # bool — omit from interactive menu
+        self.extensions = extensions or {}  # the task's taskrun-specific "taskrun" object
+        self.problem_matcher = problem_matcher  # raw "problemMatcher" (see problems.py)
+
+    @classmethod
+    def deferred(
+        cls,
+        label,
+        task_type,
+        depends_on,
+        depends_order,
+        root_dir,
+        hide,
+        resolve,
+        extensions=None,
+        problem_matcher=None,
+    ):
+        """Create a task whose command, args, cwd and env are computed lazily.
 
-    def run(self, all_tasks=None, inputs_defs=None, _visited=None):
-        """Execute the task, running dependsOn tasks first."""
-        if _visited is None:
-            _visited = set()
+        ``resolve()`` returns a dict of DEFERRED_FIELDS; it is called the first time
+        any of them is read, so listing tasks never pays for variable expansion.
+        ``resolve(context=...)`` must accept another VariableContext (see
+        in_context).
+        """
+        task = cls.__new__(cls)
+        task.label = label
+        task.task_type = task_type
+        task.depends_on = depends_on
+        task.depends_order = depends_order
+        task.root_dir = root_dir
+        task.hide = hide
+        task.extensions = extensions or {}
+        task.problem_matcher = problem_matcher
+        task._resolve = resolve
+        task._expand = resolve  # kept after materializing, for in_context
+        return task
 
-        if self.label in _visited:
-            print(f"Warning: circular dependency detected for task '{self.label}', skipping.")
-            return 0
-        _visited.add(self.label)
-
-        # Run dependencies first
-        if self.depends_on and all_tasks:
-            for dep_label in self.depends_on:
-                dep = next((t for t in all_tasks if t.label == dep_label), None)
-                if dep is None:
-                    print(f"Warning: dependency task '{dep_label}' not found.")
-                    continue
-                ret = dep.run(all_tasks=all_tasks, inputs_defs=inputs_defs, _visited=set(_visited))
-                # For sequence order, stop on failure
-                if ret != 0 and self.depends_order == "sequence":
-                    print(f"Dependency '{dep_label}' failed (exit {ret}), aborting.")
-                    return ret
-
-        # Collect and resolve any ${input:ID} references
-        all_strings = [self.command] + self.args
-        input_ids = collect_input_ids(all_strings)
-        resolved_inputs = {}
-        if input_ids and inputs_defs:
-            resolved_inputs = resolve_inputs(input_ids, inputs_defs)
+    def in_context(self, context):
+        """Return a copy of this task with command, args, cwd and env expanded in
+        ``context`` (a VariableContext with another process's cwd and environment).
+
+        This task itself is not materialized, so a copy made for one daemon client
+        never leaks into another's. A task built with fixed fields is returned as is.
+        """
+        expand = self.__dict__.get("_expand")
+        if expand is None:
+            return self
+        return Task.deferred(
+            self.label,
+            self.task_type,
+            self.depends_on,
+            self.depends_order,
+            self.root_dir,
+            self.hide,
+            partial(expand, context=context),
+            self.extensions,
+            self.problem_matcher,
+        )
+
+    @property
+    def materialized(self):
+        """True once command, args, cwd and env have been computed."""
+        return self.__dict__.get("_resolve") is None
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails: a deferred field not yet computed
+        resolve = self.__dict__.get("_resolve")
+        if resolve is None or name not in self.DEFERRED_FIELDS:
+            raise AttributeError(name)
+        self.__dict__.update(resolve())
+        self._resolve = None
+        return self.__dict__[name]
+
+    def run(self, workspace=None, **options):
+        """Execute the task, running its dependsOn graph first; return its exit code.
+
+        ``options`` are those of run_tasks. Raises DependencyCycleError if the graph
+        is cyclic.
+        """
+        from taskrun.scheduler import exit_code
+
+        if workspace is None:
+            workspace = Workspace([self])
+        return exit_code(run_tasks(workspace, [self.label], **options), [self.label])
+
+    def spawn_env(self):
+        """Return the environment to pass to the child process.
+
+        An overlay env is only flattened into a full dict here, at spawn time; with
+        nothing overlaid the child simply inherits taskrun's environment.
+        """
+        env = self.env
+        if isinstance(env, ChainMap):
+            if env.maps[-1] is base_environment() and not any(env.maps[:-1]):
+                return None
+            return dict(env)
+        return env
+
+    def command_line(self, values=None):
+        """Return (command, shown): what to spawn and how to print it.
+
+        ``values`` (id -> value) substitutes ${input:ID}. The command is an argv list
+        for a process task, a shell command line (args appended, quoted) otherwise.
+        """
 
         def subst(s):
-            return expand_variables(s, self.root_dir, resolved_inputs) if resolved_inputs else s
+            return expand_variables(s, self.root_dir, values) if values else s
 
         command = subst(self.command)
         args = [subst(a) for a in self.args]
-        cwd = self.cwd
+        if self.task_type == "process":
+            cmd = [command] + args
+            return cmd, " ".join(cmd)
+        # shell type: append args to the command string
+        if args:
+            command = command + " " + " ".join(shlex.quote(a) for a in args)
+        return command, command
 
+    def replace_process(self, answers=None):
+        """Replace the taskrun process with this task's command (no dependencies).
+
+        Nothing of taskrun stays resident while the task runs; its exit status is
+        the task's. ${input:ID} takes its value from ``answers``. Only returns by
+        raising OSError, when the command cannot be executed.
+        """
+        cmd, shown = self.command_line(answers or {})
         print(f"Running task: {self.label}")
+        print(f"Command: {shown}", flush=True)
+        argv = cmd if self.task_type == "process" else shell_argv(cmd)
+        env = self.spawn_env()
+        environ = os.environ if env is None else env
+        if self.cwd:
+            os.chdir(self.cwd)
+        for signum in _RESTORED_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        sys.stderr.flush()
+        if argv is not None:
+            try:
+                os.execvpe(argv[0], argv, environ)
+            except OSError:
+                if self.task_type == "process":
+                    raise
+        # As in execute, the shell runs what could not be executed directly
+        os.execve("/bin/sh", ["/bin/sh", "-c", cmd], environ)
 
-        if self.task_type == "process":
-            cmd = [command] + args
-            print(f"Command: {' '.join(cmd)}")
-            process = subprocess.Popen(cmd, cwd=cwd, env=self.env)
-        else:
-            # shell type: append args to the command string
-            if args:
-                full_cmd = command + " " + " ".join(shlex.quote(a) for a in args)
-            else:
-                full_cmd = command
-            print(f"Command: {full_cmd}")
-            process = subprocess.Popen(full_cmd, cwd=cwd, env=self.env, shell=True)
-
-        process.wait()
-        return process.returncode
+    def execute(
+        self,
+        stdout=None,
+        stderr=None,
+        output=None,
+        profile=None,
+        answers=None,
+        control=None,
+        problems=None,
+        console=None,
+    ):
+        """Run this task's own command (no dependencies) and return its exit code.
+
+        ${input:ID} references take their values from ``answers`` (id -> value).
+        With an OutputMux, the child's stdout and stderr go through it rather than
+        to ``stdout``/``stderr``, and are scanned by its problemMatcher into the
+        ``problems`` Diagnostics, if given. With a Profile, the child's wall time,
+        CPU time and peak RSS are recorded on it. With a RunControl, the child can
+        be cancelled from another thread. The task's header is printed to
+        ``console`` (default: stdout).
+
+        Process tasks, and shell tasks whose command line is plain words (see
+        shell_argv), are started without /bin/sh: with posix_spawn where possible,
+        else with subprocess.Popen.
+        """
+        cmd, shown = self.command_line(answers or {})
+        cwd = self.cwd
+
+        # Flushed so these lines stay ahead of the child's output, which reaches the
+        # same file or terminal directly or from the mux thread
+        print(f"Running task: {self.label}", file=console)
+        print(f"Command: {shown}", file=console, flush=True)
+
+        piped = None
+        if output is not None:
+            scanners = problems.scanners(self) if problems is not None else None
+            piped = output.attach(self.label, scanners)
+        if piped is not None:
+            stdout, stderr = piped.stdout, piped.stderr
+        env = self.spawn_env()
+        argv = cmd if self.task_type == "process" else shell_argv(cmd)
+        start = time.perf_counter()
+        try:
+            process = None
+            if argv is not None:
+                process = spawn_direct(argv, cwd, env, stdout, stderr, control is not None)
+            if process is None:
+                import subprocess
+
+                popen = partial(
+                    subprocess.Popen,
+                    cwd=cwd,
+                    env=env,
+                    stdout=stdout,
+                    stderr=stderr,
+                    start_new_session=control is not None,
+                )
+                if argv is not None:
+                    try:
+                        process = popen(argv)
+                    except OSError:
+                        if self.task_type == "process":
+                            raise
+                if process is None:
+                    # The shell runs scripts without a shebang, and reports a missing
+                    # (127) or non-executable (126) program as it always has
+                    process = popen(cmd, shell=True)
+        finally:
+            if piped is not None:
+                piped.close_child_ends()
+
+        if control is not None:
+            control.started(process)
+        try:
+            # wait4 rather than wait(): it also reports the child's resource usage
+            ret, rusage = wait_process(process)
+        finally:
+            if control is not None:
+                control.finished(process)
+        end = time.perf_counter()
+        if piped is not None:
+            piped.finish(output)
+        if profile:
+            profile.record_task(self.label, start, end, rusage, ret)
+        return ret
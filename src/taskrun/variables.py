@@ -1,41 +1,85 @@
 import os
 import re
 
+# Every ${...} reference, whatever its namespace; resolved in a single pass
+_VARIABLE_RE = re.compile(r"\$\{([^}]+)\}")
 
-def expand_variables(value, root_dir, resolved_inputs=None):
-    """Expand VS Code predefined variables in a string.
 
-    Supports: ${workspaceFolder}, ${workspaceFolderBasename}, ${userHome},
-              ${cwd}, ${env:VAR}, and ${input:ID} (when resolved_inputs given).
+class VariableContext:
+    """Values of the predefined variables for one run.
+
+    Each value is computed on first use and then reused, so expanding many strings
+    costs at most one expanduser/getcwd call per run rather than one per string.
+
+    ``cwd`` and ``environ`` stand in for taskrun's own working directory and
+    environment, e.g. a daemon client's: they supply ${cwd}, ${env:VAR} and
+    ${userHome}, and ``environ`` is the base of the tasks' env (None: os.environ).
     """
-    home_dir = os.path.expanduser("~")
-    cwd = os.getcwd()
 
-    value = value.replace("${userHome}", home_dir)
-    value = value.replace("${workspaceFolder}", root_dir)
-    value = value.replace("${workspaceFolderBasename}", os.path.basename(root_dir))
-    value = value.replace("${cwd}", cwd)
+    def __init__(self, root_dir, cwd=None, environ=None):
+        self.root_dir = root_dir
+        self.environ = environ
+        self._values = {"workspaceFolder": root_dir}
+        if cwd is not None:
+            self._values["cwd"] = cwd
+        if environ is not None and environ.get("HOME"):
+            self._values["userHome"] = environ["HOME"]
 
-    # Expand ${env:VAR} references
-    def expand_env(match):
-        return os.environ.get(match.group(1), "")
+    def get(self, name):
+        """Return the value of a predefined variable, or None if it is not supported."""
+        value = self._values.get(name)
+        if value is None:
+            if name == "workspaceFolderBasename":
+                value = os.path.basename(self.root_dir)
+            elif name == "userHome":
+                value = os.path.expanduser("~")
+            elif name == "cwd":
+                value = os.getcwd()
+            else:
+                return None
+            self._values[name] = value
+        return value
 
-    value = re.sub(r"\$\{env:([^}]+)\}", expand_env, value)
 
-    # Expand ${input:ID} references if resolved values are provided
-    if resolved_inputs:
+def expand_variables(value, root_dir, resolved_inputs=None, context=None):
+    """Expand VS Code predefined variables in a string.
+
+    Supports: ${workspaceFolder}, ${workspaceFolderBasename}, ${userHome},
+              ${cwd}, ${env:VAR}, and ${input:ID} (when resolved_inputs given).
+    Unknown or unresolved references are left intact. Pass a shared ``context``
+    to reuse computed values across calls.
+    """
+    if "${" not in value:
+        return value
+    if context is None:
+        context = VariableContext(root_dir)
 
-        def expand_input(match):
-            return resolved_inputs.get(match.group(1), match.group(0))
+    environ = os.environ if context.environ is None else context.environ
 
-        value = re.sub(r"\$\{input:([^}]+)\}", expand_input, value)
+    def replace(match):
+        name = match.group(1)
+        if name.startswith("env:"):
+            if len(name) > 4:
+                return environ.get(name[4:], "")
+        elif name.startswith("input:"):
+            if resolved_inputs and len(name) > 6:
+                return resolved_inputs.get(name[6:], match.group(0))
+        else:
+            result = context.get(name)
+            if result is not None:
+                return result
+        return match.group(0)
 
-    return value
+    return _VARIABLE_RE.sub(replace, value)
 
 
 def collect_input_ids(strings):
     """Return the set of ${input:ID} IDs referenced in any of the given strings."""
     ids = set()
     for s in strings:
-        ids.update(re.findall(r"\$\{input:([^}]+)\}", s))
+        if "${" not in s:
+            continue
+        for name in _VARIABLE_RE.findall(s):
+            if name.startswith("input:") and len(name) > 6:
+                ids.add(name[6:])
     return ids
@@ -0,0 +1,364 @@
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+
+from taskrun.fingerprint import expand_globs
+from taskrun.multiroot import PRUNED_DIRS
+
+# Seconds without further file events before a burst of changes is acted on
+DEBOUNCE = 0.2
+
+# Seconds between scans of the watched tree when inotify is unavailable
+POLL_INTERVAL = 0.5
+
+# Seconds a cancelled task gets to exit after SIGTERM before it is killed
+CANCEL_GRACE = 5.0
+
+# Seconds file timestamps may lag the clock (they come from a coarser one)
+MTIME_SLACK = 0.1
+
+# inotify(7) constants
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+
+def _pruned(name):
+    return name.startswith(".") or name in PRUNED_DIRS
+
+
+def _walk_dirs(root):
+    """Yield root and every directory below it that is not hidden or pruned."""
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not _pruned(name)]
+        yield dirpath
+
+
+class Watcher:
+    """Base for the file watchers: collects changed paths, debounced into batches."""
+
+    def read(self, timeout):
+        """Return the paths changed since the last call, waiting up to ``timeout``
+        seconds (None: forever) for at least one."""
+        raise NotImplementedError
+
+    def changes(self, debounce=DEBOUNCE):
+        """Block until files change; return the set of changed paths once events
+        have stopped arriving for ``debounce`` seconds."""
+        changed = set()
+        while not changed:
+            changed = self.read(None)
+        while True:
+            more = self.read(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(Watcher):
+    """Linux inotify watches on a tree of directories plus some extra files.
+
+    Directories created below the root are watched as they appear. Raises OSError
+    where inotify is unavailable.
+    """
+
+    def __init__(self, root, files=()):
+        import ctypes
+
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # watch descriptor -> directory path
+        self._files = {os.path.abspath(path) for path in files}
+        for path in _walk_dirs(root):
+            self._add(path)
+        # Extra files (e.g. tasks.json in the hidden .vscode) are watched via their directory
+        self._extra_dirs = {os.path.dirname(path) for path in self._files} - set(
+            self._dirs.values()
+        )
+        for path in self._extra_dirs:
+            self._add(path)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def read(self, timeout):
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                directory = self._dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if directory in self._extra_dirs and path not in self._files:
+                    continue  # a sibling of a watched file, in an otherwise unwatched directory
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _pruned(os.path.basename(path)):
+                        for new_dir in _walk_dirs(path):
+                            self._add(new_dir)
+                    continue
+                changed.add(path)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher(Watcher):
+    """Portable fallback: rescans the tree every ``interval`` seconds, comparing each
+    file's mtime, size and inode with the previous scan."""
+
+    def __init__(self, root, files=(), interval=POLL_INTERVAL):
+        self.root = root
+        self.files = [os.path.abspath(path) for path in files]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        paths = list(self.files)
+        for dirpath in _walk_dirs(self.root):
+            try:
+                names = os.listdir(dirpath)
+            except OSError:
+                continue
+            paths.extend(os.path.join(dirpath, name) for name in names if not _pruned(name))
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isdir(path):
+                snapshot[path] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+            if wait > 0:
+                time.sleep(wait)
+            snapshot = self._scan()
+            previous, self._snapshot = self._snapshot, snapshot
+            changed = {
+                path
+                for path in previous.keys() | snapshot.keys()
+                if previous.get(path) != snapshot.get(path)
+            }
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def make_watcher(root, files=()):
+    """Return an InotifyWatcher where the platform supports it, else a PollingWatcher."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, files)
+        except OSError:
+            pass
+    return PollingWatcher(root, files)
+
+
+def affected_labels(workspace, graph, changed, previous_inputs):
+    """Return the labels of ``graph`` to rerun after the ``changed`` paths changed.
+
+    A task is hit when a changed path is among the files its declared "inputs"
+    globs match now or matched before (``previous_inputs``, label -> set of paths,
+    is updated in place); every task depending on a hit task, directly or not,
+    reruns too. When no task of the graph declares inputs, any change reruns it all.
+    """
+    order, prereqs = graph
+    hit = set()
+    declared = False
+    for label in order:
+        task = workspace.get(label)
+        patterns = task.extensions.get("inputs")
+        if not patterns:
+            continue
+        declared = True
+        files = set(expand_globs(task, patterns))
+        if changed & (files | previous_inputs.get(label, set())):
+            hit.add(label)
+        previous_inputs[label] = files
+    if not declared:
+        return set(order) if changed else set()
+
+    dependents = {label: [] for label in order}
+    for label in order:
+        for need in prereqs[label]:
+            dependents[need].append(label)
+    affected = set()
+    stack = list(hit)
+    while stack:
+        label = stack.pop()
+        if label not in affected:
+            affected.add(label)
+            stack.extend(dependents[label])
+    return affected
+
+
+def _output_paths(workspace, graph):
+    """Return the files the graph's tasks declare as outputs (never a reason to rerun)."""
+    paths = set()
+    for label in graph[0]:
+        task = workspace.get(label)
+        paths.update(expand_globs(task, task.extensions.get("outputs") or []))
+    return paths
+
+
+def _written_during(path, span):
+    """Whether ``path`` was last changed while the run of ``span`` ([start, end or
+    None]) was in progress, so the change is most likely the run's own."""
+    started, finished = span
+    if finished is None:
+        return True
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return False
+    return started - MTIME_SLACK <= mtime <= finished
+
+
+def watch(load, config_files, labels, watcher=None, iterations=None, **options):
+    """Run the given labels, then rerun the affected tasks whenever files change.
+
+    ``load()`` returns the Workspace; it is called again only when one of the
+    ``config_files`` (the tasks.json files) changes, otherwise the parsed tasks and
+    their graph are reused. Other changes rerun the tasks whose declared inputs
+    changed, plus their dependents (see affected_labels). A run still in progress
+    when relevant changes arrive is cancelled, and its unfinished tasks join the
+    next run. When no task declares inputs, changes made while a run was in
+    progress are taken to be its own writes and ignored. ``options`` are passed
+    to run_tasks, whose ``answers`` dict is kept across runs so inputs are asked
+    for once. ``iterations`` bounds the number of
+    runs (for tests); otherwise this returns only on KeyboardInterrupt.
+    """
+    from taskrun.scheduler import build_graph
+    from taskrun.task import RunControl, RunOptions, run_tasks
+
+    config_files = {os.path.abspath(path) for path in config_files}
+    workspace = load()
+    graph = build_graph(workspace, labels)
+    watcher = watcher or make_watcher(workspace.root_dir, config_files)
+    options.setdefault("answers", {})
+    run_options = options.pop("run_options", RunOptions())
+    previous_inputs = {}
+    affected_labels(workspace, graph, set(), previous_inputs)  # remember current inputs
+
+    runs = 0
+    run = None  # (thread, control, labels, results, [start, end]) of the latest run
+
+    def start(only):
+        nonlocal runs
+        runs += 1
+        control = RunControl()
+        results = {}
+        span = [time.time(), None]
+
+        def target():
+            try:
+                results.update(
+                    run_tasks(
+                        workspace,
+                        labels,
+                        only=only,
+                        run_options=run_options._replace(control=control),
+                        **options,
+                    )
+                )
+            except ValueError as exc:  # DependencyCycleError, MissingInputError
+                print(f"Error: {exc}", file=sys.stderr)
+            finally:
+                span[1] = time.time()
+            if not control.cancelled:
+                print("Watching for changes (Ctrl-C to stop).", flush=True)
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread, control, only, results, span
+
+    def stop(run):
+        # Cancel the run if still in progress; return its tasks that must run again
+        thread, control, only, results, _ = run
+        if not thread.is_alive():
+            return set()
+        print("Changes detected; cancelling the current run.", flush=True)
+        control.cancel()
+        thread.join(CANCEL_GRACE)
+        if thread.is_alive():
+            control.cancel(signal.SIGKILL)
+            thread.join()
+        return {label for label in only if results.get(label) != 0}
+
+    try:
+        run = start(set(graph[0]))
+        while iterations is None or runs < iterations:
+            changed = watcher.changes()
+            if changed & config_files:
+                print("tasks.json changed; reloading.", flush=True)
+                try:
+                    workspace = load()
+                    graph = build_graph(workspace, labels)
+                except ValueError as exc:  # mid-edit files may briefly be invalid
+                    print(f"Error: {exc}", file=sys.stderr)
+                    continue
+                previous_inputs.clear()
+                affected_labels(workspace, graph, set(), previous_inputs)
+                selected = set(graph[0])
+            else:
+                if not any(workspace.get(label).extensions.get("inputs") for label in graph[0]):
+                    # Any change would rerun everything, so the run's own writes must
+                    # neither cancel it nor start the next one
+                    changed -= _output_paths(workspace, graph)
+                    changed = {path for path in changed if not _written_during(path, run[4])}
+                selected = affected_labels(workspace, graph, changed, previous_inputs)
+            if not selected:
+                continue
+            selected |= stop(run) & set(graph[0])
+            run = start(selected)
+        run[0].join()
+    except KeyboardInterrupt:
+        if run is not None:
+            run[1].cancel()
+            run[0].join(CANCEL_GRACE)
+    finally:
+        watcher.close()
@@ -0,0 +1,67 @@
+import fnmatch
+import re
+
+# Prefix marking a --label pattern as a regular expression rather than a glob
+REGEX_PREFIX = "re:"
+
+
+class Workspace:
+    """Parsed tasks.json contents with dict indexes for label and input lookups."""
+
+    def __init__(self, tasks, inputs_defs=None, root_dir=None, file_path=None):
+        self.tasks = list(tasks)  # file order, duplicates included
+        self.inputs_defs = list(inputs_defs or [])
+        self.root_dir = root_dir
+        self.file_path = file_path
+
+        self.by_label = {}
+        self.duplicates = []  # labels defined more than once; the first definition wins
+        for task in self.tasks:
+            if task.label in self.by_label:
+                if task.label not in self.duplicates:
+                    self.duplicates.append(task.label)
+                continue
+            self.by_label[task.label] = task
+
+        self.inputs = {}
+        for input_def in self.inputs_defs:
+            self.inputs.setdefault(input_def.get("id"), input_def)
+
+    def get(self, label):
+        """Return the task with the given label, or None."""
+        return self.by_label.get(label)
+
+    def __contains__(self, label):
+        return label in self.by_label
+
+    def __len__(self):
+        return len(self.by_label)
+
+    def visible(self):
+        """Return the tasks shown in menus and listings (not hidden), in file order."""
+        return [task for task in self.by_label.values() if not task.hide]
+
+    def select(self, patterns):
+        """Resolve label patterns to labels; return (labels, unmatched patterns).
+
+        Each pattern is an exact label, a glob such as ``test:*``, or a regular
+        expression written ``re:PATTERN`` (matched against the whole label). An exact
+        label may name a hidden task; globs and regexes only match visible ones.
+        Labels are returned once each, in pattern order and then file order.
+        """
+        selected = {}
+        unmatched = []
+        for pattern in patterns:
+            if pattern in self.by_label:
+                matches = [pattern]
+            elif pattern.startswith(REGEX_PREFIX):
+                regex = re.compile(pattern[len(REGEX_PREFIX) :])
+                matches = [task.label for task in self.visible() if regex.fullmatch(task.label)]
+            elif any(char in pattern for char in "*?["):
+                matches = [t.label for t in self.visible() if fnmatch.fnmatchcase(t.label, pattern)]
+            else:
+                matches = []
+            if not matches:
+                unmatched.append(pattern)
+            selected.update(dict.fromkeys(matches))
+        return list(selected), unmatched
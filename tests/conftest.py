@@ -0,0 +1,39 @@
+import pytest
+
+from taskrun.task import Task
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path_factory, monkeypatch):
+    """Keep cache files written by the code under test out of the real home directory."""
+    home = tmp_path_factory.mktemp("home")
+    monkeypatch.setenv("HOME", str(home))
+    return home
+
+
+@pytest.fixture
+def make_task():
+    """Return a factory of shell Tasks: make_task(label, command, depends_on=..., root=...).
+
+    Any other Task field (hide, extensions, problem_matcher, env, ...) may be passed too.
+    """
+
+    def make(label, command="echo", *, depends_on=(), root="/tmp", **fields):
+        fields = {
+            "args": [],
+            "cwd": str(root),
+            "env": None,
+            "task_type": "shell",
+            "depends_order": "parallel",
+            "hide": False,
+            **fields,
+        }
+        return Task(
+            label=label,
+            command=command,
+            depends_on=list(depends_on),
+            root_dir=str(root),
+            **fields,
+        )
+
+    return make
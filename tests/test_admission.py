@@ -0,0 +1,97 @@
+import threading
+import time
+
+from taskrun import admission as admission_module
+from taskrun.admission import Admission, available_memory_mib
+from taskrun.scheduler import run_graph
+from taskrun.workspace import Workspace
+
+
+def _tracking_runner(delay=0.05):
+    """Return (run_task, peak) where peak[0] is the most tasks seen running at once."""
+    active, peak, log = [0], [0], []
+    lock = threading.Lock()
+
+    def run_task(task):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            log.append(("start", task.label, active[0]))
+        time.sleep(delay)
+        with lock:
+            active[0] -= 1
+        return 0
+
+    return run_task, peak, log
+
+
+class TestCost:
+    def test_default_weight_and_clamping(self, make_task):
+        admission = Admission()
+        assert admission.cost(make_task("a"), 4) == 1
+        assert admission.cost(make_task("a", extensions={"weight": 3}), 4) == 3
+        assert admission.cost(make_task("a", extensions={"weight": 9}), 4) == 4
+        assert admission.cost(make_task("a", extensions={"weight": 0}), 4) == 1
+        assert admission.cost(make_task("a", extensions={"weight": "x"}), 4) == 1
+
+    def test_exclusive_takes_every_slot(self, make_task):
+        assert Admission().cost(make_task("a", extensions={"exclusive": True}), 6) == 6
+
+
+class TestPressure:
+    def test_no_thresholds(self):
+        assert Admission().pressure() is None
+
+    def test_load_threshold(self, monkeypatch):
+        monkeypatch.setattr(admission_module, "load_average", lambda: 9.5)
+        assert Admission(max_load=8).pressure() == "load average 9.50 above 8"
+        assert Admission(max_load=10).pressure() is None
+
+    def test_memory_threshold(self, monkeypatch):
+        monkeypatch.setattr(admission_module, "available_memory_mib", lambda: 512.0)
+        assert "below 1024 MiB" in Admission(min_available_mib=1024).pressure()
+        assert Admission(min_available_mib=256).pressure() is None
+
+    def test_unavailable_metrics_never_hold_back(self, monkeypatch):
+        monkeypatch.setattr(admission_module, "load_average", lambda: None)
+        monkeypatch.setattr(admission_module, "available_memory_mib", lambda: None)
+        assert Admission(max_load=0, min_available_mib=1e9).pressure() is None
+
+    def test_meminfo_parsing(self, tmp_path):
+        meminfo = tmp_path / "meminfo"
+        meminfo.write_text("MemTotal: 16000000 kB\nMemAvailable:    2097152 kB\n")
+        assert available_memory_mib(str(meminfo)) == 2048.0
+        assert available_memory_mib(str(tmp_path / "missing")) is None
+
+
+class TestRunGraphAdmission:
+    def _wide(self, make_task, extensions=None):
+        tasks = [make_task(f"t{i}", extensions=extensions) for i in range(4)]
+        return tasks + [make_task("all", depends_on=[f"t{i}" for i in range(4)])]
+
+    def test_weights_limit_concurrency(self, make_task):
+        run_task, peak, _ = _tracking_runner()
+        run_graph(Workspace(self._wide(make_task, {"weight": 2})), ["all"], run_task, jobs=4)
+        assert peak[0] == 2
+
+    def test_exclusive_runs_alone(self, make_task):
+        tasks = self._wide(make_task)
+        tasks[0].extensions = {"exclusive": True}
+        run_task, peak, log = _tracking_runner()
+        run_graph(Workspace(tasks), ["all"], run_task, jobs=4)
+        assert ("start", "t0", 1) in log
+
+    def test_pressure_holds_back_until_nothing_runs(self, make_task, monkeypatch, capsys):
+        monkeypatch.setattr(admission_module, "load_average", lambda: 100.0)
+        monkeypatch.setattr("taskrun.scheduler.PRESSURE_POLL_INTERVAL", 0.01)
+        run_task, peak, _ = _tracking_runner(delay=0.02)
+        results = run_graph(
+            Workspace(self._wide(make_task)),
+            ["all"],
+            run_task,
+            jobs=4,
+            admission=Admission(max_load=1),
+        )
+        assert peak[0] == 1
+        assert all(ret == 0 for ret in results.values())
+        assert "Holding back task" in capsys.readouterr().out
@@ -1,6 +1,29 @@
 import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-from taskrun.cache import cache_path, load_cache, save_cache, sort_tasks_by_history
+import pytest
+
+from taskrun import cache as cache_module
+from taskrun.cache import (
+    cache_path,
+    compact_history,
+    duration_estimates,
+    duration_p95,
+    frecency_scores,
+    load_cache,
+    log_path,
+    rank_path,
+    ranked_labels,
+    record_durations,
+    record_task_run,
+    remember_inputs,
+    remembered_inputs,
+    save_cache,
+    sort_tasks_by_history,
+    sort_tasks_by_rank,
+)
 from taskrun.task import Task
 
 
@@ -90,3 +113,196 @@ class TestSortTasksByHistory:
         tasks = [_make_task("x"), _make_task("y")]
         result = sort_tasks_by_history(tasks, {})
         assert [t.label for t in result] == ["x", "y"]
+
+
+def _record_many(args):
+    root, label, count = args
+    for _ in range(count):
+        record_task_run(root, label)
+
+
+class TestRecordTaskRun:
+    def test_increments_count(self, tmp_path):
+        root = str(tmp_path / "proj")
+        record_task_run(root, "build")
+        record_task_run(root, "build")
+        record_task_run(root, "test")
+        tasks = load_cache(root)["tasks"]
+        assert tasks["build"]["count"] == 2
+        assert tasks["test"]["count"] == 1
+        assert tasks["test"]["last_run"] >= tasks["build"]["last_run"]
+
+    def test_appends_single_line_per_run(self, tmp_path):
+        root = str(tmp_path / "proj")
+        record_task_run(root, "build")
+        record_task_run(root, "build")
+        with open(log_path(root)) as fh:
+            assert len(fh.readlines()) == 2
+
+    def test_concurrent_writers_lose_nothing(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cache_module, "COMPACT_THRESHOLD", 2048)
+        root = str(tmp_path / "proj")
+        jobs = [(root, f"task{i % 3}", 40) for i in range(6)]
+        with ProcessPoolExecutor(max_workers=6) as pool:
+            list(pool.map(_record_many, jobs))
+        tasks = load_cache(root)["tasks"]
+        assert sum(stats["count"] for stats in tasks.values()) == 240
+        assert tasks["task0"]["count"] == 80
+
+    def test_compaction_folds_log_into_snapshot(self, tmp_path):
+        root = str(tmp_path / "proj")
+        for _ in range(3):
+            record_task_run(root, "build")
+        assert compact_history(root)
+        assert not os.path.exists(log_path(root))
+        record_task_run(root, "build")
+        assert load_cache(root)["tasks"]["build"]["count"] == 4
+
+    def test_interrupted_compaction_neither_loses_nor_double_counts(self, tmp_path):
+        root = str(tmp_path / "proj")
+        record_task_run(root, "build")
+        compact_history(root)
+        # A log renamed aside and folded, but not yet deleted when the process died
+        with open(cache_path(root)) as fh:
+            snapshot = json.load(fh)
+        snapshot["folded"] = [os.path.basename(log_path(root)) + ".dead"]
+        with open(cache_path(root), "w") as fh:
+            json.dump(snapshot, fh)
+        with open(log_path(root) + ".dead", "w") as fh:
+            fh.write(json.dumps({"label": "build", "ts": 1.0}) + "\n")
+        # A log renamed aside before the snapshot was written
+        with open(log_path(root) + ".lost", "w") as fh:
+            fh.write(json.dumps({"label": "build", "ts": 2.0}) + "\n")
+        assert load_cache(root)["tasks"]["build"]["count"] == 2
+        compact_history(root)
+        assert load_cache(root)["tasks"]["build"]["count"] == 2
+
+    def test_torn_line_ignored(self, tmp_path):
+        root = str(tmp_path / "proj")
+        record_task_run(root, "build")
+        with open(log_path(root), "a") as fh:
+            fh.write('{"label": "bui')
+        assert load_cache(root)["tasks"]["build"]["count"] == 1
+
+
+class TestDurations:
+    def test_ewma_and_window(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cache_module, "DURATION_WINDOW", 3)
+        root = str(tmp_path / "proj")
+        for seconds in (10.0, 20.0, 30.0, 40.0):
+            record_durations(root, {"build": seconds})
+        stats = load_cache(root)["tasks"]["build"]
+        assert stats["durations"] == [20.0, 30.0, 40.0]
+        expected = 10.0
+        for seconds in (20.0, 30.0, 40.0):
+            expected = cache_module.EWMA_ALPHA * seconds + (1 - cache_module.EWMA_ALPHA) * expected
+        assert stats["ewma"] == pytest.approx(expected)
+        assert stats["count"] == 0  # durations are not invocations
+
+    def test_survive_compaction(self, tmp_path):
+        root = str(tmp_path / "proj")
+        record_durations(root, {"build": 2.0, "test": 4.0})
+        compact_history(root)
+        record_durations(root, {"build": 2.0})
+        assert duration_estimates(root) == {"build": 2.0, "test": 4.0}
+
+    def test_do_not_affect_menu_order(self, tmp_path, monkeypatch):
+        root = str(tmp_path / "proj")
+        monkeypatch.setattr(cache_module.time, "time", lambda: 1.0)
+        record_task_run(root, "ci")
+        record_durations(root, {"lint": 1.0, "ci": 3.0})
+        assert ranked_labels(root) == ["ci"]
+        compact_history(root)
+        assert ranked_labels(root) == ["ci"]
+
+    def test_slow_estimates_are_p95(self, tmp_path):
+        root = str(tmp_path / "proj")
+        for seconds in (1.0, 1.0, 1.0, 9.0):
+            record_durations(root, {"build": seconds})
+        assert duration_estimates(root, slow=True) == {"build": 9.0}
+        assert duration_estimates(root)["build"] < 9.0
+
+    def test_p95(self):
+        assert duration_p95({}) is None
+        assert duration_p95({"durations": [3.0]}) == 3.0
+        assert duration_p95({"durations": [float(i) for i in range(1, 21)]}) == 19.0
+        assert duration_p95({"durations": [float(i) for i in range(100, 0, -1)]}) == 95.0
+
+
+class TestFrecency:
+    def test_count_decays_with_age(self, tmp_path, monkeypatch):
+        root = str(tmp_path / "proj")
+        week = cache_module.FRECENCY_HALF_LIFE
+        monkeypatch.setattr(cache_module.time, "time", lambda: 0.0)
+        for _ in range(4):
+            record_task_run(root, "old")
+        monkeypatch.setattr(cache_module.time, "time", lambda: 2.0 * week)
+        record_task_run(root, "new")
+        record_durations(root, {"timed": 1.0})
+        scores = frecency_scores(root, now=2.0 * week)
+        assert scores == {"old": pytest.approx(1.0), "new": pytest.approx(1.0)}
+        scores = frecency_scores(root, now=3.0 * week)
+        assert scores == {"old": pytest.approx(0.5), "new": pytest.approx(0.5)}
+
+
+class TestRememberedInputs:
+    def test_last_answer_wins_across_compaction(self, tmp_path):
+        root = str(tmp_path / "proj")
+        assert remembered_inputs(root) == {}
+        remember_inputs(root, {"target": "debug", "name": "x"})
+        compact_history(root)
+        remember_inputs(root, {"target": "release"})
+        assert remembered_inputs(root) == {"target": "release", "name": "x"}
+        assert ranked_labels(root) == []
+
+
+class TestRankedLabels:
+    def test_empty_history(self, tmp_path):
+        assert ranked_labels(str(tmp_path / "proj")) == []
+
+    def test_log_only_most_recent_first(self, tmp_path, monkeypatch):
+        root = str(tmp_path / "proj")
+        for ts, label in [(1.0, "a"), (2.0, "b"), (3.0, "a"), (4.0, "c")]:
+            monkeypatch.setattr(cache_module.time, "time", lambda ts=ts: ts)
+            record_task_run(root, label)
+        assert ranked_labels(root) == ["c", "a", "b"]
+
+    def test_ranking_merged_with_newer_log_events(self, tmp_path, monkeypatch):
+        root = str(tmp_path / "proj")
+        for ts, label in [(1.0, "a"), (2.0, "b"), (3.0, "c")]:
+            monkeypatch.setattr(cache_module.time, "time", lambda ts=ts: ts)
+            record_task_run(root, label)
+        compact_history(root)
+        with open(rank_path(root)) as fh:
+            assert [label for label, _ in json.load(fh)] == ["c", "b", "a"]
+        monkeypatch.setattr(cache_module.time, "time", lambda: 4.0)
+        record_task_run(root, "a")
+        assert ranked_labels(root) == ["a", "c", "b"]
+
+    def test_matches_sort_tasks_by_history(self, tmp_path):
+        root = str(tmp_path / "proj")
+        cache = {
+            "root_dir": root,
+            "tasks": {
+                "old": {"count": 5, "last_run": 1000.0},
+                "new": {"count": 1, "last_run": 2000.0},
+            },
+        }
+        save_cache(root, cache)
+        tasks = [_make_task("unrun"), _make_task("old"), _make_task("new")]
+        expected = [t.label for t in sort_tasks_by_history(tasks, cache)]
+        ranked = sort_tasks_by_rank(tasks, ranked_labels(root))
+        assert [t.label for t in ranked] == expected == ["new", "old", "unrun"]
+
+    def test_missing_ranking_derived_from_snapshot(self, tmp_path):
+        root = str(tmp_path / "proj")
+        save_cache(root, {"root_dir": root, "tasks": {"x": {"count": 1, "last_run": 5.0}}})
+        os.unlink(rank_path(root))
+        assert ranked_labels(root) == ["x"]
+
+
+class TestSortTasksByRank:
+    def test_unknown_tasks_keep_order_after_ranked(self):
+        tasks = [_make_task("a"), _make_task("b"), _make_task("c"), _make_task("d")]
+        result = sort_tasks_by_rank(tasks, ["c", "gone", "a"])
+        assert [t.label for t in result] == ["c", "a", "b", "d"]
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from taskrun import discovery
+from taskrun.discovery import clear_memo, find_tasks_file, root_dir_for
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.delenv("TASKRUN_FILE", raising=False)
+    clear_memo()
+    yield
+    clear_memo()
+
+
+def _make_tasks(directory):
+    vscode = directory / ".vscode"
+    vscode.mkdir(parents=True, exist_ok=True)
+    path = vscode / "tasks.json"
+    path.write_text("{}")
+    return path
+
+
+class TestFindTasksFile:
+    def test_found_in_ancestor(self, tmp_path):
+        path = _make_tasks(tmp_path / "repo")
+        start = tmp_path / "repo" / "src" / "pkg"
+        start.mkdir(parents=True)
+        assert find_tasks_file(str(start)) == str(path)
+
+    def test_nearest_wins(self, tmp_path):
+        _make_tasks(tmp_path / "repo")
+        inner = _make_tasks(tmp_path / "repo" / "service")
+        assert find_tasks_file(str(tmp_path / "repo" / "service")) == str(inner)
+
+    def test_terminates_outside_home(self, tmp_path, monkeypatch):
+        # HOME is not an ancestor of the start dir: the walk must stop at /
+        monkeypatch.setenv("HOME", str(tmp_path / "elsewhere"))
+        start = tmp_path / "a" / "b"
+        start.mkdir(parents=True)
+        assert find_tasks_file(str(start)) is None
+
+    def test_stops_at_git_boundary(self, tmp_path):
+        _make_tasks(tmp_path)
+        repo = tmp_path / "repo"
+        (repo / ".git").mkdir(parents=True)
+        assert find_tasks_file(str(repo)) is None
+
+    def test_explicit_file_skips_discovery(self, tmp_path, monkeypatch):
+        path = tmp_path / "ci-tasks.json"
+        path.write_text("{}")
+        monkeypatch.setattr(discovery, "_search", lambda start: 1 / 0)
+        assert find_tasks_file(file_path=str(path)) == str(path)
+        monkeypatch.setenv("TASKRUN_FILE", str(path))
+        assert find_tasks_file() == str(path)
+        monkeypatch.setenv("TASKRUN_FILE", str(tmp_path / "missing.json"))
+        assert find_tasks_file() is None
+
+
+class TestMemo:
+    def test_memoized(self, tmp_path, monkeypatch):
+        path = _make_tasks(tmp_path / "repo")
+        start = str(tmp_path / "repo" / "src")
+        os.mkdir(start)
+        assert find_tasks_file(start) == str(path)
+        monkeypatch.setattr(discovery, "_search", lambda start: 1 / 0)
+        assert find_tasks_file(start) == str(path)
+
+    def test_revalidated_when_nearer_file_appears(self, tmp_path):
+        _make_tasks(tmp_path / "repo")
+        start = tmp_path / "repo" / "src"
+        (start / ".vscode").mkdir(parents=True)
+        find_tasks_file(str(start))
+        nearer = start / ".vscode" / "tasks.json"
+        nearer.write_text("{}")
+        os.utime(start / ".vscode", ns=(0, 0))  # mtime change even on coarse clocks
+        assert find_tasks_file(str(start)) == str(nearer)
+
+    def test_revalidated_when_file_removed(self, tmp_path):
+        path = _make_tasks(tmp_path / "repo")
+        find_tasks_file(str(tmp_path / "repo"))
+        path.unlink()
+        assert find_tasks_file(str(tmp_path / "repo")) is None
+
+
+class TestRootDirFor:
+    def test_parent_of_vscode(self, tmp_path):
+        path = _make_tasks(tmp_path / "repo")
+        assert root_dir_for(str(path)) == str(tmp_path / "repo")
+
+    def test_other_location(self, tmp_path):
+        assert root_dir_for(str(tmp_path / "ci" / "tasks.json")) == str(tmp_path / "ci")
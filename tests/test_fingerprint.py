@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from taskrun.fingerprint import FingerprintStore, fingerprint_path
+from taskrun.task import RunOptions, overlay_environment
+from taskrun.workspace import Workspace
+
+
+@pytest.fixture
+def build_task(make_task, tmp_path):
+    """Return a factory of "build" tasks in tmp_path, tracking src/*.c by default."""
+
+    def build(command="true", inputs=("src/*.c",), outputs=(), env=None):
+        return make_task(
+            "build",
+            command,
+            root=tmp_path,
+            env=overlay_environment(env or {}),
+            extensions={"inputs": list(inputs), "outputs": list(outputs)},
+        )
+
+    return build
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+class TestFingerprintStore:
+    def test_untracked_task_is_never_up_to_date(self, build_task, tmp_path):
+        task = build_task(inputs=())
+        store = FingerprintStore(str(tmp_path))
+        assert store.compute(task) is None
+        assert not store.up_to_date(task)
+
+    def test_unchanged_inputs_are_up_to_date_after_save(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task()
+        assert not store.up_to_date(task)
+        store.record(task)
+        store.save()
+        assert os.path.isfile(fingerprint_path(str(tmp_path)))
+
+        assert FingerprintStore(str(tmp_path)).up_to_date(build_task())
+
+    def test_content_change_invalidates(self, build_task, tmp_path):
+        source = tmp_path / "src" / "a.c"
+        _write(source, "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task()
+        store.up_to_date(task)
+        store.record(task)
+        store.save()
+
+        _write(source, "int b;")
+        assert not FingerprintStore(str(tmp_path)).up_to_date(build_task())
+
+    def test_new_input_file_invalidates(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task()
+        store.up_to_date(task)
+        store.record(task)
+
+        _write(tmp_path / "src" / "b.c", "int b;")
+        assert not store.up_to_date(build_task())
+
+    def test_command_and_env_are_part_of_fingerprint(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task()
+        store.up_to_date(task)
+        store.record(task)
+
+        assert store.up_to_date(build_task())
+        assert not store.up_to_date(build_task(command="make -O2"))
+        assert not store.up_to_date(build_task(env={"CFLAGS": "-O2"}))
+
+    def test_unchanged_stat_reuses_hash(self, build_task, tmp_path, monkeypatch):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task()
+        store.up_to_date(task)
+        store.record(task)
+
+        hashed = []
+        monkeypatch.setattr("taskrun.fingerprint._hash_file", lambda path: hashed.append(path))
+        assert store.up_to_date(build_task())
+        assert hashed == []
+
+    def test_missing_output_is_not_up_to_date(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path))
+        task = build_task(outputs=["out/a.o"])
+        store.up_to_date(task)
+        store.record(task)
+        assert not store.up_to_date(build_task(outputs=["out/a.o"]))
+
+        _write(tmp_path / "out" / "a.o", "")
+        assert store.up_to_date(build_task(outputs=["out/a.o"]))
+
+    def test_input_references_are_never_skipped(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        task = build_task(command="make ${input:target}")
+        assert FingerprintStore(str(tmp_path)).compute(task) is None
+
+    def test_force_reruns_but_still_records(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        store = FingerprintStore(str(tmp_path), force=True)
+        task = build_task()
+        store.up_to_date(task)
+        store.record(task)
+        assert not store.up_to_date(build_task())
+        assert FingerprintStore(str(tmp_path))._tasks == {}
+        store.save()
+        assert "build" in FingerprintStore(str(tmp_path))._tasks
+
+
+class TestRunWithFingerprints:
+    def test_second_run_skips_up_to_date_task(self, build_task, tmp_path, capsys):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        marker = tmp_path / "count"
+        task = build_task(command=f"echo x >> {marker}")
+        workspace = Workspace([task])
+
+        store = FingerprintStore(str(tmp_path))
+        assert task.run(workspace, jobs=1, run_options=RunOptions(fingerprints=store)) == 0
+        store.save()
+        store = FingerprintStore(str(tmp_path))
+        assert task.run(workspace, jobs=1, run_options=RunOptions(fingerprints=store)) == 0
+
+        assert marker.read_text().count("x") == 1
+        assert "Task 'build' is up to date, skipping." in capsys.readouterr().out
+
+    def test_failed_run_is_not_recorded(self, build_task, tmp_path):
+        _write(tmp_path / "src" / "a.c", "int a;")
+        task = build_task(command="exit 3")
+        store = FingerprintStore(str(tmp_path))
+        assert task.run(Workspace([task]), jobs=1, run_options=RunOptions(fingerprints=store)) == 3
+        store.save()
+        assert not os.path.exists(fingerprint_path(str(tmp_path)))
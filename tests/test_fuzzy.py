@@ -0,0 +1,48 @@
+import random
+
+from taskrun.fuzzy import FuzzyIndex
+
+LABELS = ["lint:tests", "tests", "build:runTests", "deploy", "test:unit", "setup-env"]
+
+
+class TestFuzzyIndex:
+    def test_tiers_prefix_word_substring_scattered(self):
+        index = FuzzyIndex(["contest", "unit:test", "test:all", "t-e-s-t", "unrelated"])
+        assert index.rank("test") == ["test:all", "unit:test", "contest", "t-e-s-t"]
+
+    def test_camel_case_starts_a_word(self):
+        index = FuzzyIndex(["build:runtests", "build:runTests"])
+        assert index.rank("tests") == ["build:runTests", "build:runtests"]
+
+    def test_case_insensitive(self):
+        assert FuzzyIndex(["Deploy", "lint"]).rank("DEP") == ["Deploy"]
+
+    def test_frecency_orders_within_a_tier(self):
+        index = FuzzyIndex(
+            ["test:unit", "test:e2e", "test:all"], {"test:e2e": 5.0, "test:all": 1.0}
+        )
+        assert index.rank("test") == ["test:e2e", "test:all", "test:unit"]
+        assert index.rank("") == ["test:e2e", "test:all", "test:unit"]
+
+    def test_frecency_does_not_beat_a_better_match(self):
+        index = FuzzyIndex(["tests", "lint:tests"], {"lint:tests": 100.0})
+        assert index.rank("tes") == ["tests", "lint:tests"]
+
+    def test_scattered_ranked_by_span(self):
+        index = FuzzyIndex(["b-x-x-x-d", "b-x-d", "bxd"])
+        assert index.rank("bd") == ["bxd", "b-x-d", "b-x-x-x-d"]
+
+    def test_incremental_matches_cold_search(self):
+        rng = random.Random(7)
+        words = ["build", "test", "lint", "api", "web", "e2e", "docs", "watchAll"]
+        labels = [f"{rng.choice(words)}:{rng.choice(words)}-{i}" for i in range(300)]
+        index = FuzzyIndex(labels)
+        for typed in ["b", "bu", "bui", "bu", "b", "bt", "btw", "e2", "e2e", "wa", "wal"]:
+            assert index.search(typed) == FuzzyIndex(labels).search(typed), typed
+
+    def test_span_prefers_word_start(self):
+        index = FuzzyIndex(LABELS)
+        match = index.span(LABELS.index("lint:tests"), "te")
+        assert match.span() == (5, 7)
+        match = index.span(LABELS.index("setup-env"), "sn")
+        assert (match.start(), match.end()) == (0, 8)
@@ -0,0 +1,29 @@
+from taskrun.jsonc import loads, strip_jsonc
+
+
+class TestStripJsonc:
+    def test_line_and_block_comments(self):
+        text = '{\n  // line\n  "a": 1, /* block\n spanning */ "b": 2\n}'
+        assert loads(strip_jsonc(text)) == ({"a": 1, "b": 2}, "json")
+
+    def test_trailing_commas(self):
+        assert strip_jsonc('{"a": [1, 2,], }').replace(" ", "") == '{"a":[1,2]}'
+
+    def test_comment_markers_inside_strings_kept(self):
+        text = '{"url": "http://example.com/*x*/", "s": "a,]"}'
+        assert strip_jsonc(text) == text
+
+    def test_escaped_quote_in_string(self):
+        text = '{"cmd": "echo \\"//not a comment\\"" // real comment\n}'
+        assert loads(text)[0] == {"cmd": 'echo "//not a comment"'}
+
+
+class TestLoads:
+    def test_strict_json_tier(self):
+        assert loads('{"tasks": []}') == ({"tasks": []}, "json")
+
+    def test_jsonc_tier(self):
+        assert loads('{"tasks": [], // trailing\n}') == ({"tasks": []}, "jsonc")
+
+    def test_json5_tier(self):
+        assert loads("{tasks: ['a']}") == ({"tasks": ["a"]}, "json5")
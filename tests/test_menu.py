@@ -0,0 +1,23 @@
+from taskrun.menu import FuzzySearch
+
+ENTRIES = ["build", "test:unit", "lint:tests", "deploy"]
+
+
+class TestFuzzySearch:
+    def test_matches_in_rank_order_with_spans(self):
+        search = FuzzySearch(ENTRIES, weights={"lint:tests": 2.0})
+        search.search_text = "tes"
+        assert [index for index, _ in search.matches] == [1, 2]
+        assert search.matches[1][1].span() == (5, 8)
+        assert 2 in search and 0 not in search
+
+    def test_regex_characters_are_literal(self):
+        search = FuzzySearch(["a[b", "ab"])
+        search.search_text = "a["
+        assert [index for index, _ in search.matches] == [0]
+
+    def test_cleared_search_matches_nothing(self):
+        search = FuzzySearch(ENTRIES)
+        search.search_text = "b"
+        search.search_text = None
+        assert len(search.matches) == 0
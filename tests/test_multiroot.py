@@ -0,0 +1,122 @@
+import json
+import os
+
+from taskrun import multiroot
+from taskrun.multiroot import (
+    find_folders,
+    load_multi_workspace,
+    read_code_workspace,
+    resolve_folders,
+)
+from taskrun.parse_cache import parse_cache_path
+
+
+def _tasks_json(folder, tasks, inputs=None):
+    os.makedirs(os.path.join(folder, ".vscode"), exist_ok=True)
+    with open(os.path.join(folder, ".vscode", "tasks.json"), "w") as fh:
+        json.dump({"version": "2.0.0", "tasks": tasks, "inputs": inputs or []}, fh)
+
+
+def _monorepo(tmp_path):
+    _tasks_json(
+        str(tmp_path / "services" / "api"),
+        [
+            {"label": "build", "command": "make", "dependsOn": ["db/migrate"]},
+            {"label": "test", "command": "pytest", "dependsOn": "build"},
+        ],
+    )
+    _tasks_json(str(tmp_path / "services" / "db"), [{"label": "migrate", "command": "alembic"}])
+    _tasks_json(str(tmp_path / "node_modules" / "pkg"), [{"label": "ignored", "command": "x"}])
+    _tasks_json(str(tmp_path / ".hidden"), [{"label": "ignored", "command": "x"}])
+    return tmp_path
+
+
+class TestFindFolders:
+    def test_skips_hidden_and_pruned_directories(self, tmp_path):
+        root = _monorepo(tmp_path)
+        assert find_folders(str(root)) == [
+            str(root / "services" / "api"),
+            str(root / "services" / "db"),
+        ]
+
+    def test_base_name_clashes_use_relative_path(self, tmp_path):
+        _tasks_json(str(tmp_path / "a" / "app"), [])
+        _tasks_json(str(tmp_path / "b" / "app"), [])
+        _tasks_json(str(tmp_path / "c" / "lib"), [])
+        _, folders = resolve_folders(str(tmp_path))
+        assert [name for name, _ in folders] == ["a/app", "b/app", "lib"]
+
+
+class TestCodeWorkspace:
+    def test_folders_relative_to_file_with_names(self, tmp_path):
+        path = tmp_path / "mono.code-workspace"
+        path.write_text(
+            '{\n  // VS Code allows comments here\n  "folders": [\n'
+            '    {"path": "services/api", "name": "API"},\n    {"path": "services/db"},\n  ],\n}'
+        )
+        assert read_code_workspace(str(path)) == [
+            ("API", str(tmp_path / "services" / "api")),
+            (None, str(tmp_path / "services" / "db")),
+        ]
+        root, folders = resolve_folders(str(path))
+        assert root == str(tmp_path)
+        assert [name for name, _ in folders] == ["API", "db"]
+
+
+class TestLoadMultiWorkspace:
+    def test_namespaced_labels_and_cross_folder_dependencies(self, tmp_path):
+        root, folders = resolve_folders(str(_monorepo(tmp_path)))
+        workspace = load_multi_workspace(root, folders)
+        assert [task.label for task in workspace.tasks] == ["api/build", "api/test", "db/migrate"]
+        assert workspace.get("api/test").depends_on == ["api/build"]
+        assert workspace.get("api/build").depends_on == ["db/migrate"]
+        assert workspace.get("api/build").root_dir == str(tmp_path / "services" / "api")
+
+    def test_invalid_file_is_skipped(self, tmp_path, capsys):
+        root = _monorepo(tmp_path)
+        with open(root / "services" / "db" / ".vscode" / "tasks.json", "w") as fh:
+            fh.write('{"tasks": [')
+        workspace = load_multi_workspace(*resolve_folders(str(root)))
+        assert [task.label for task in workspace.tasks] == ["api/build", "api/test"]
+        assert "skipping" in capsys.readouterr().err
+
+    def test_process_pool_gives_same_result(self, tmp_path, monkeypatch):
+        root = _monorepo(tmp_path)
+        for i in range(4):
+            _tasks_json(str(root / "extra" / f"svc{i}"), [{"label": "run", "command": "x"}])
+        monkeypatch.setattr(multiroot, "PARALLEL_PARSE_MIN", 100)  # in-process
+        expected = [t.label for t in load_multi_workspace(*resolve_folders(str(root))).tasks]
+        monkeypatch.setattr(multiroot, "PARALLEL_PARSE_MIN", 1)
+        workspace = load_multi_workspace(*resolve_folders(str(root)))
+        assert [task.label for task in workspace.tasks] == expected
+        assert len(expected) == 7
+
+    def test_warm_cache_entries_skip_the_process_pool(self, tmp_path, monkeypatch):
+        import concurrent.futures
+
+        root = _monorepo(tmp_path)
+        for i in range(4):
+            _tasks_json(str(root / "extra" / f"svc{i}"), [{"label": "run", "command": "x"}])
+        past = os.path.getmtime(root) - 10
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                os.utime(os.path.join(dirpath, name), (past, past))  # outside the racy window
+        monkeypatch.setattr(multiroot, "PARALLEL_PARSE_MIN", 1)
+        expected = [t.label for t in load_multi_workspace(*resolve_folders(str(root))).tasks]
+
+        def no_pool(*args, **kwargs):
+            raise AssertionError("process pool started for warm entries")
+
+        monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", no_pool)
+        workspace = load_multi_workspace(*resolve_folders(str(root)))
+        assert [task.label for task in workspace.tasks] == expected
+
+    def test_each_file_cached_separately(self, tmp_path):
+        root, folders = resolve_folders(str(_monorepo(tmp_path)))
+        load_multi_workspace(root, folders)
+        entries = {
+            name: parse_cache_path(os.path.join(folder, ".vscode", "tasks.json"))
+            for name, folder in folders
+        }
+        assert len(set(entries.values())) == 2
+        assert all(os.path.isfile(path) for path in entries.values())
@@ -0,0 +1,130 @@
+import io
+import os
+import threading
+import time
+
+from taskrun.output import MAX_LINE, OutputMux, log_file_name
+from taskrun.scheduler import LAUNCH_FAILED
+from taskrun.task import RunOptions
+from taskrun.workspace import Workspace
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+class TestOutputMux:
+    def test_lines_are_prefixed_per_stream(self):
+        out, err = io.BytesIO(), io.BytesIO()
+        with OutputMux(out=out, err=err) as mux:
+            piped = mux.attach("build")
+            os.write(piped.stdout, b"one\ntw")
+            os.write(piped.stdout, b"o\nthree")
+            os.write(piped.stderr, b"oops\n")
+            piped.close_child_ends()
+            piped.wait()
+        assert out.getvalue() == b"[build] one\n[build] two\n[build] three\n"
+        assert err.getvalue() == b"[build] oops\n"
+
+    def test_concurrent_tasks_never_split_lines(self):
+        out = io.BytesIO()
+        with OutputMux(out=out, err=io.BytesIO()) as mux:
+            a, b = mux.attach("a"), mux.attach("b")
+            for i in range(200):
+                os.write(a.stdout, f"a{i}\n".encode())
+                os.write(b.stdout, f"b{i}\n".encode())
+            for piped in (a, b):
+                piped.close_child_ends()
+        lines = out.getvalue().decode().splitlines()
+        assert [line for line in lines if line.startswith("[a]")] == [
+            f"[a] a{i}" for i in range(200)
+        ]
+        assert [line for line in lines if line.startswith("[b]")] == [
+            f"[b] b{i}" for i in range(200)
+        ]
+
+    def test_unprefixed_passes_bytes_through(self):
+        out = io.BytesIO()
+        with OutputMux(out=out, err=io.BytesIO(), prefix=False) as mux:
+            piped = mux.attach("build")
+            os.write(piped.stdout, b"no newline")
+            piped.close_child_ends()
+        assert out.getvalue() == b"no newline"
+
+    def test_overlong_line_is_emitted_in_pieces(self):
+        out = io.BytesIO()
+        with OutputMux(out=out, err=io.BytesIO()) as mux:
+            piped = mux.attach("x")
+            # More than a pipe buffer: written from a thread while the mux drains it
+            writer = threading.Thread(target=_write_all, args=(piped.stdout, b"y" * (MAX_LINE * 3)))
+            writer.start()
+            writer.join()
+            piped.close_child_ends()
+        pieces = out.getvalue().split(b"\n")[:-1]
+        assert len(pieces) > 1
+        assert all(piece.startswith(b"[x] ") for piece in pieces)
+        assert sum(len(piece) - 4 for piece in pieces) == MAX_LINE * 3
+
+    def test_log_files_receive_raw_output(self, tmp_path):
+        log_dir = tmp_path / "logs"
+        with OutputMux(out=io.BytesIO(), err=io.BytesIO(), log_dir=str(log_dir)) as mux:
+            piped = mux.attach("unit tests")
+            os.write(piped.stdout, b"ok\n")
+            os.write(piped.stderr, b"warn\n")
+            piped.close_child_ends()
+        assert sorted((log_dir / "unit_tests.log").read_bytes().splitlines()) == [
+            b"ok",
+            b"warn",
+        ]
+
+    def test_broken_sink_keeps_draining(self):
+        out = io.BytesIO()
+        out.close()
+        with OutputMux(out=out, err=io.BytesIO()) as mux:
+            piped = mux.attach("x")
+            os.write(piped.stdout, b"lost\n")
+            piped.close_child_ends()
+            assert piped.wait(timeout=5)
+
+    def test_log_file_name(self):
+        assert log_file_name("build") == "build.log"
+        assert log_file_name("lint: all/files") == "lint_all_files.log"
+        assert log_file_name("///") == "task.log"
+
+
+class TestRunWithOutputMux:
+    def test_dependencies_output_is_prefixed(self, make_task, tmp_path):
+        dep = make_task("dep", "echo from-dep; echo err-dep >&2", root=tmp_path)
+        main = make_task("main", "echo from-main", root=tmp_path, depends_on=["dep"])
+        out, err = io.BytesIO(), io.BytesIO()
+        ret = main.run(
+            Workspace([dep, main]),
+            jobs=2,
+            run_options=RunOptions(output=OutputMux(out=out, err=err)),
+        )
+        assert ret == 0
+        assert out.getvalue().splitlines() == [b"[dep] from-dep", b"[main] from-main"]
+        assert err.getvalue() == b"[dep] err-dep\n"
+
+    def test_background_process_holding_the_pipes_does_not_stall_the_run(self, make_task, tmp_path):
+        bg = make_task("bg", "sleep 3 & echo started", root=tmp_path)
+        after = make_task("after", "echo after", root=tmp_path, depends_on=["bg"])
+        out = io.BytesIO()
+        start = time.monotonic()
+        ret = after.run(
+            Workspace([bg, after]),
+            jobs=2,
+            run_options=RunOptions(output=OutputMux(out=out, err=io.BytesIO())),
+        )
+        assert ret == 0
+        assert time.monotonic() - start < 2
+        assert out.getvalue().splitlines() == [b"[bg] started", b"[after] after"]
+
+    def test_mux_is_closed_when_spawn_fails(self, make_task, tmp_path):
+        task = make_task("p", "/nonexistent/binary", root=tmp_path, task_type="process")
+        mux = OutputMux(out=io.BytesIO(), err=io.BytesIO())
+        assert (
+            task.run(Workspace([task]), jobs=1, run_options=RunOptions(output=mux)) == LAUNCH_FAILED
+        )
+        assert mux._thread is None
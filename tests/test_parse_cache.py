@@ -0,0 +1,73 @@
+import json
+import os
+import time
+
+import pytest
+
+from taskrun import jsonc
+from taskrun.parse_cache import load_tasks_data, parse_cache_path
+
+
+@pytest.fixture
+def tasks_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    path = tmp_path / "tasks.json"
+    _write(path, {"version": "2.0.0", "tasks": [{"label": "build"}]})
+    return path
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    calls = []
+    real_loads = jsonc.loads
+
+    def counting_loads(text):
+        calls.append(text)
+        return real_loads(text)
+
+    monkeypatch.setattr(jsonc, "loads", counting_loads)
+    return calls
+
+
+def _write(path, data, age=60):
+    """Write JSON and backdate its mtime so cache entries are not considered racy."""
+    path.write_text(json.dumps(data))
+    past = time.time() - age
+    os.utime(path, (past, past))
+
+
+class TestLoadTasksData:
+    def test_cold_then_warm(self, tasks_file, parse_calls):
+        first = load_tasks_data(str(tasks_file))
+        second = load_tasks_data(str(tasks_file))
+        assert first == second == {"version": "2.0.0", "tasks": [{"label": "build"}]}
+        assert len(parse_calls) == 1
+        assert os.path.exists(parse_cache_path(str(tasks_file)))
+
+    def test_content_change_reparses(self, tasks_file, parse_calls):
+        load_tasks_data(str(tasks_file))
+        _write(tasks_file, {"version": "2.0.0", "tasks": [{"label": "test"}]}, age=30)
+        data = load_tasks_data(str(tasks_file))
+        assert data["tasks"] == [{"label": "test"}]
+        assert len(parse_calls) == 2
+
+    def test_touch_without_change_skips_parse(self, tasks_file, parse_calls):
+        load_tasks_data(str(tasks_file))
+        os.utime(tasks_file, None)
+        load_tasks_data(str(tasks_file))
+        assert len(parse_calls) == 1
+
+    def test_json5_syntax(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        path = tmp_path / "tasks.json"
+        path.write_text("{ // comment\n tasks: [{label: 'x',},], }")
+        assert load_tasks_data(str(path)) == {"tasks": [{"label": "x"}]}
+        with open(parse_cache_path(str(path))) as fh:
+            assert json.load(fh)["parser"] == "json5"
+
+    def test_corrupt_cache_entry_ignored(self, tasks_file, parse_calls):
+        load_tasks_data(str(tasks_file))
+        with open(parse_cache_path(str(tasks_file)), "w") as fh:
+            fh.write("{not json")
+        assert load_tasks_data(str(tasks_file))["tasks"] == [{"label": "build"}]
+        assert len(parse_calls) == 2
@@ -193,3 +193,49 @@ class TestParseTasks:
 
         tasks, _ = parse_tasks(root_dir, str(tasks_file))
         assert tasks[0].depends_on == ["build"]
+
+    def test_tasks_materialized_lazily(self, tmp_path):
+        root_dir = str(tmp_path)
+        vscode_dir = tmp_path / ".vscode"
+        vscode_dir.mkdir()
+        tasks_file = vscode_dir / "tasks.json"
+        tasks_file.write_text(
+            json.dumps(
+                {
+                    "version": "2.0.0",
+                    "tasks": [
+                        {"label": "a", "command": "echo ${workspaceFolder}"},
+                        {"label": "b", "command": "echo b", "hide": True},
+                    ],
+                }
+            )
+        )
+
+        tasks, _ = parse_tasks(root_dir, str(tasks_file))
+        assert not any(t.materialized for t in tasks)
+        assert [t.label for t in tasks if not t.hide] == ["a"]
+        assert not any(t.materialized for t in tasks)
+
+        assert tasks[0].command == f"echo {root_dir}"
+        assert tasks[0].materialized
+        assert not tasks[1].materialized
+
+    def test_problem_matcher_kept_raw(self, tmp_path):
+        vscode_dir = tmp_path / ".vscode"
+        vscode_dir.mkdir()
+        tasks_file = vscode_dir / "tasks.json"
+        tasks_file.write_text(
+            json.dumps(
+                {
+                    "version": "2.0.0",
+                    "tasks": [
+                        {"label": "build", "command": "make", "problemMatcher": ["$gcc"]},
+                        {"label": "other", "command": "true"},
+                    ],
+                }
+            )
+        )
+
+        tasks, _ = parse_tasks(str(tmp_path), str(tasks_file))
+        assert tasks[0].problem_matcher == ["$gcc"]
+        assert tasks[1].problem_matcher is None
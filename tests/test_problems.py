@@ -0,0 +1,258 @@
+import io
+
+import pytest
+
+from taskrun.output import OutputMux
+from taskrun.problems import (
+    Diagnostic,
+    Diagnostics,
+    ProblemMatcherError,
+    ProblemScanner,
+    compile_matcher,
+    compile_matchers,
+    format_diagnostic,
+)
+from taskrun.task import RunOptions
+from taskrun.workspace import Workspace
+
+
+def _scan(spec, *chunks, root="/proj", cwd=None):
+    found = []
+    scanner = ProblemScanner(compile_matchers(spec), found.append, root, cwd)
+    for chunk in chunks:
+        scanner.feed(chunk)
+    scanner.close()
+    return found
+
+
+class TestCompile:
+    def test_builtin_by_name(self):
+        (matcher,) = compile_matchers("$gcc")
+        assert matcher.owner == "cpp"
+        assert len(matcher.patterns) == 1
+
+    def test_compiled_once(self):
+        assert compile_matchers(["$tsc", "$gcc"]) is compile_matchers(["$tsc", "$gcc"])
+
+    def test_base_is_overridden(self):
+        matcher = compile_matcher({"base": "$gcc", "owner": "mine", "fileLocation": "absolute"})
+        assert matcher.owner == "mine"
+        assert matcher.file_location[0] == "absolute"
+        assert matcher.patterns == compile_matcher("$gcc").patterns
+
+    def test_javascript_named_groups(self):
+        matcher = compile_matcher(
+            {"pattern": {"regexp": r"^(?<file>\S+): (?<=: )(.*)$", "file": 1, "message": 2}}
+        )
+        assert matcher.patterns[0].regexp.search("a.c: boom").group("file") == "a.c"
+
+    @pytest.mark.parametrize(
+        "definition",
+        [
+            "$nope",
+            "gcc",
+            {"base": "$nope"},
+            {"pattern": {"regexp": "(", "file": 1, "message": 1}},
+            {"pattern": {"regexp": "(a)", "file": 1, "message": 2}},
+            {"pattern": {"regexp": "(a)", "file": 1}},
+            {"pattern": []},
+            {"pattern": {"regexp": "(a)(b)", "file": 1, "message": 2}, "fileLocation": "x"},
+        ],
+    )
+    def test_invalid_definitions(self, definition):
+        with pytest.raises(ProblemMatcherError):
+            compile_matchers(definition)
+
+
+class TestScanner:
+    def test_gcc(self):
+        found = _scan(
+            "$gcc",
+            b"cc -c a.c\nsrc/a.c:3:5: error: 'x' undeclared\n",
+            b"src/a.c:9:1: warning: unused\ninclude/b.h:2:: fatal error: no such file\n",
+        )
+        assert found == [
+            Diagnostic("/proj/src/a.c", 3, 5, "error", "'x' undeclared", None, "cpp"),
+            Diagnostic("/proj/src/a.c", 9, 1, "warning", "unused", None, "cpp"),
+            Diagnostic("/proj/include/b.h", 2, None, "error", "no such file", None, "cpp"),
+        ]
+
+    def test_tsc_relative_to_task_cwd(self):
+        found = _scan(
+            "$tsc",
+            b"src/a.ts(3,5): error TS2322: Type 'x' is not assignable.\n"
+            b"src/b.ts:1:2 - warning TS6133: 'y' is declared but never used.\n",
+            cwd="/proj/web",
+        )
+        assert [(d.file, d.line, d.code) for d in found] == [
+            ("/proj/web/src/a.ts", 3, "2322"),
+            ("/proj/web/src/b.ts", 1, "6133"),
+        ]
+
+    def test_lines_split_across_chunks(self):
+        found = _scan("$gcc", b"a.c:1:2: err", b"or: bro", b"ken\r\na.c:4:1: warning: last")
+        assert [(d.line, d.message) for d in found] == [(1, "broken"), (4, "last")]
+
+    def test_colour_codes_are_ignored(self):
+        found = _scan("$gcc", b"\x1b[01ma.c:1:2: \x1b[31merror:\x1b[0m oops\n")
+        assert [(d.file, d.message) for d in found] == [("/proj/a.c", "oops")]
+
+    def test_multi_line_loop(self):
+        output = (
+            b"/src/a.js\n"
+            b"  1:10  error    'x' is unused  no-unused-vars\n"
+            b"  2:1   warning  Unexpected console  no-console\n"
+            b"\n"
+            b"/src/b.js\n"
+            b"  7:3  error  Missing semicolon  semi\n"
+            b"\n"
+            b"x 3 problems\n"
+            b"  9:9  error  orphan  rule\n"
+        )
+        found = _scan("$eslint-stylish", output)
+        assert [(d.file, d.line, d.severity, d.message, d.code) for d in found] == [
+            ("/src/a.js", 1, "error", "'x' is unused", "no-unused-vars"),
+            ("/src/a.js", 2, "warning", "Unexpected console", "no-console"),
+            ("/src/b.js", 7, "error", "Missing semicolon", "semi"),
+            # any unindented line may name a file, as in VS Code
+            ("x 3 problems", 9, "error", "orphan", "rule"),
+        ]
+
+    def test_multi_line_without_loop_needs_consecutive_lines(self):
+        spec = {
+            "fileLocation": "absolute",
+            "pattern": [
+                {"regexp": r"^In (\S+):$", "file": 1},
+                {"regexp": r"^line (\d+): (.*)$", "line": 1, "message": 2},
+            ],
+        }
+        found = _scan(spec, b"In /a:\nline 1: one\nline 2: two\nIn /b:\nnoise\nline 3: x\n")
+        assert [(d.file, d.line, d.message) for d in found] == [("/a", 1, "one")]
+
+    def test_location_and_default_severity(self):
+        spec = {
+            "severity": "warning",
+            "fileLocation": ["relative", "${workspaceFolder}/sub"],
+            "pattern": {
+                "regexp": r"^(\S+)\((\S+)\): (.*)$",
+                "file": 1,
+                "location": 2,
+                "message": 3,
+            },
+        }
+        (found,) = _scan(spec, b"x.c(4,7,4,9): careful\n")
+        assert (found.file, found.line, found.column, found.severity) == (
+            "/proj/sub/x.c",
+            4,
+            7,
+            "warning",
+        )
+
+    def test_huge_output_keeps_only_the_partial_line(self):
+        found = []
+        scanner = ProblemScanner(compile_matchers("$gcc"), found.append, "/proj")
+        noise = b"compiling something or other\n" * 2000
+        for _ in range(200):
+            scanner.feed(noise + b"a.c:1:1: warning: again\nno newline yet")
+            assert len(scanner._partial) < 64
+        scanner.close()
+        assert len(found) == 200
+
+
+class TestDiagnostics:
+    def test_duplicates_are_kept_once_in_order(self):
+        diagnostics = Diagnostics()
+        a = Diagnostic("/p/a.c", 1, 2, "error", "a", None, "cpp")
+        b = Diagnostic("/p/b.c", 3, None, "warning", "b", "W1", "cpp")
+        for diagnostic in (a, b, a, b, a):
+            diagnostics.add(diagnostic)
+        assert list(diagnostics) == [a, b]
+        out = io.StringIO()
+        diagnostics.report(relative_to="/p", file=out)
+        assert out.getvalue().splitlines() == [
+            "",
+            "Problems:",
+            "  a.c:1:2: error: a",
+            "  b.c:3: warning: b [W1]",
+            "  1 error, 1 warning",
+        ]
+
+    def test_limit_counts_the_rest(self):
+        diagnostics = Diagnostics(limit=2)
+        for line in range(5):
+            diagnostics.add(Diagnostic("/a", line, None, "error", "x", None, "o"))
+        assert len(diagnostics) == 2
+        assert diagnostics.dropped == 3
+
+    def test_quickfix_file(self, tmp_path):
+        diagnostics = Diagnostics()
+        diagnostics.add(Diagnostic(str(tmp_path / "a.c"), 1, 2, "error", "boom", None, "cpp"))
+        path = tmp_path / "problems.qf"
+        diagnostics.write_quickfix(str(path))
+        assert path.read_text() == f"{tmp_path / 'a.c'}:1:2: error: boom\n"
+
+    def test_format_outside_the_root_stays_absolute(self):
+        diagnostic = Diagnostic("/elsewhere/a.c", 1, None, "info", "hi", None, "o")
+        assert format_diagnostic(diagnostic, "/proj") == "/elsewhere/a.c:1: info: hi"
+
+
+class TestRunTasks:
+    def test_problems_of_every_task_are_collected(self, make_task, tmp_path):
+        gcc = "echo 'a.c:1:2: error: bad' >&2; echo 'a.c:1:2: error: bad' >&2"
+        workspace = Workspace(
+            [
+                make_task("build", gcc, root=tmp_path, problem_matcher="$gcc"),
+                make_task(
+                    "lint", "echo 'lint.c:5:1: warning: w'", root=tmp_path, problem_matcher=["$gcc"]
+                ),
+                make_task("plain", "echo 'x.c:1:1: error: ignored'", root=tmp_path),
+                make_task("all", "true", root=tmp_path, depends_on=["build", "lint", "plain"]),
+            ]
+        )
+        problems = Diagnostics()
+        out, err = io.BytesIO(), io.BytesIO()
+        workspace.get("all").run(
+            workspace,
+            jobs=2,
+            run_options=RunOptions(output=OutputMux(out=out, err=err), problems=problems),
+        )
+        assert sorted((d.file, d.severity) for d in problems) == [
+            (str(tmp_path / "a.c"), "error"),
+            (str(tmp_path / "lint.c"), "warning"),
+        ]
+        assert err.getvalue().count(b"[build] a.c:1:2: error: bad") == 2
+
+    def test_invalid_matcher_warns_and_runs(self, make_task, tmp_path, capsys):
+        task = make_task("t", "echo ran", root=tmp_path, problem_matcher="$nope")
+        out = io.BytesIO()
+        problems = Diagnostics()
+        assert (
+            task.run(
+                run_options=RunOptions(
+                    output=OutputMux(out=out, err=io.BytesIO()), problems=problems
+                )
+            )
+            == 0
+        )
+        assert "unknown problem matcher '$nope'" in capsys.readouterr().err
+        assert out.getvalue() == b"[t] ran\n"
+        assert len(problems) == 0
+
+    def test_invalid_matcher_in_a_list_leaves_the_others(self, make_task, tmp_path, capsys):
+        task = make_task(
+            "t",
+            "echo 'a.c:1:2: error: bad'",
+            root=tmp_path,
+            problem_matcher=["$nope", "$gcc", {"x": 1}],
+        )
+        problems = Diagnostics()
+        task.run(
+            run_options=RunOptions(
+                output=OutputMux(out=io.BytesIO(), err=io.BytesIO()), problems=problems
+            )
+        )
+        err = capsys.readouterr().err
+        assert "unknown problem matcher '$nope'" in err
+        assert "needs a 'pattern'" in err
+        assert "$gcc" not in err
+        assert [(d.file, d.message) for d in problems] == [(str(tmp_path / "a.c"), "bad")]
@@ -0,0 +1,102 @@
+import io
+import json
+import subprocess
+import sys
+
+from taskrun.profile import Profile
+from taskrun.task import RunOptions, wait_process
+from taskrun.workspace import Workspace
+
+
+class _Usage:
+    def __init__(self, user=0.0, sys=0.0, maxrss=1024):
+        self.ru_utime = user
+        self.ru_stime = sys
+        self.ru_maxrss = maxrss
+
+
+class TestWaitProcess:
+    def test_exit_code_and_rusage(self):
+        process = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+        code, rusage = wait_process(process)
+        assert code == 3
+        assert process.returncode == 3
+        assert rusage.ru_maxrss > 0
+
+    def test_signal_is_negative(self):
+        process = subprocess.Popen(["sh", "-c", "kill -TERM $$"])
+        code, _ = wait_process(process)
+        assert code == -15
+        assert process.poll() == -15
+
+
+class TestProfile:
+    def test_critical_path_follows_longest_chain(self):
+        profile = Profile()
+        profile.order = ["slow", "fast", "top"]
+        profile.prereqs = {"slow": set(), "fast": set(), "top": {"slow", "fast"}}
+        profile.record_task("slow", 0.0, 3.0, _Usage(), 0)
+        profile.record_task("fast", 0.0, 1.0, _Usage(), 0)
+        profile.record_task("top", 3.0, 3.5, _Usage(), 0)
+        assert profile.critical_path() == (3.5, ["slow", "top"])
+
+    def test_unexecuted_tasks_weigh_nothing(self):
+        profile = Profile()
+        profile.order = ["cached", "build"]
+        profile.prereqs = {"cached": set(), "build": {"cached"}}
+        profile.record_task("build", 0.0, 2.0, _Usage(), 0)
+        assert profile.critical_path() == (2.0, ["cached", "build"])
+
+    def test_empty_profile(self):
+        assert Profile().critical_path() == (0.0, [])
+
+    def test_phase_totals_accumulate(self):
+        profile = Profile()
+        for _ in range(2):
+            with profile.phase("inputs"):
+                pass
+        with profile.phase("parse"):
+            pass
+        assert list(profile.phase_totals()) == ["inputs", "parse"]
+
+    def test_report(self):
+        profile = Profile()
+        profile.order, profile.prereqs = ["build"], {"build": set()}
+        profile.record_task("build", 1.0, 2.5, _Usage(user=1.25, maxrss=2048), 0)
+        out = io.StringIO()
+        profile.report(out)
+        text = out.getvalue()
+        assert "build" in text and "1.50s" in text and "1.25s" in text
+        assert "critical path (1.50s): build" in text
+
+    def test_chrome_trace_events(self, tmp_path):
+        profile = Profile()
+        with profile.phase("parse"):
+            pass
+        profile.order, profile.prereqs = ["build"], {"build": set()}
+        start = profile.origin + 0.5
+        profile.record_task("build", start, start + 0.25, _Usage(), 1)
+        path = tmp_path / "trace.json"
+        profile.write_trace(str(path))
+
+        events = json.loads(path.read_text())["traceEvents"]
+        complete = {event["name"]: event for event in events if event["ph"] == "X"}
+        assert set(complete) == {"parse", "build"}
+        assert complete["build"]["ts"] == 500000
+        assert complete["build"]["dur"] == 250000
+        assert complete["build"]["args"]["exit"] == 1
+
+
+class TestRunWithProfile:
+    def test_records_graph_and_each_task(self, make_task, tmp_path):
+        dep = make_task("dep", "true", root=tmp_path)
+        main = make_task("main", "exit 2", root=tmp_path, depends_on=["dep"])
+        profile = Profile()
+        assert (
+            main.run(Workspace([dep, main]), jobs=1, run_options=RunOptions(profile=profile)) == 2
+        )
+        assert profile.order == ["dep", "main"]
+        assert set(profile.tasks) == {"dep", "main"}
+        assert profile.tasks["main"].exit_code == 2
+        assert profile.tasks["dep"].end <= profile.tasks["main"].start
+        assert "schedule" in profile.phase_totals()
@@ -0,0 +1,237 @@
+import threading
+import time
+
+import pytest
+
+from taskrun.scheduler import (
+    LAUNCH_FAILED,
+    DependencyCycleError,
+    build_graph,
+    critical_paths,
+    estimate_duration,
+    exit_code,
+    run_graph,
+)
+from taskrun.workspace import Workspace
+
+
+@pytest.fixture
+def diamond(make_task):
+    return [
+        make_task("codegen"),
+        make_task("lint", depends_on=["codegen"]),
+        make_task("test", depends_on=["codegen"]),
+        make_task("ci", depends_on=["lint", "test"]),
+    ]
+
+
+class TestBuildGraph:
+    def test_topological_order(self, diamond):
+        order, prereqs = build_graph(Workspace(diamond), ["ci"])
+        assert order.index("codegen") < order.index("lint") < order.index("ci")
+        assert order.index("test") < order.index("ci")
+        assert prereqs["ci"] == {"lint", "test"}
+
+    def test_only_reachable_tasks(self, diamond):
+        order, _ = build_graph(Workspace(diamond), ["lint"])
+        assert order == ["codegen", "lint"]
+
+    def test_sequence_chains_dependencies(self, make_task):
+        tasks = [
+            make_task("a"),
+            make_task("b"),
+            make_task("all", depends_on=["a", "b"], depends_order="sequence"),
+        ]
+        order, prereqs = build_graph(Workspace(tasks), ["all"])
+        assert order == ["a", "b", "all"]
+        assert prereqs["b"] == {"a"}
+
+    def test_cycle_detected(self, make_task):
+        tasks = [
+            make_task("a", depends_on=["b"]),
+            make_task("b", depends_on=["c"]),
+            make_task("c", depends_on=["a"]),
+        ]
+        with pytest.raises(DependencyCycleError) as excinfo:
+            build_graph(Workspace(tasks), ["a"])
+        assert excinfo.value.cycle == ["a", "b", "c", "a"]
+
+    def test_self_dependency_is_cycle(self, make_task):
+        with pytest.raises(DependencyCycleError):
+            build_graph(Workspace([make_task("a", depends_on=["a"])]), ["a"])
+
+    def test_missing_dependency_ignored(self, make_task, capsys):
+        order, _ = build_graph(Workspace([make_task("a", depends_on=["ghost"])]), ["a"])
+        assert order == ["a"]
+        assert "ghost" in capsys.readouterr().out
+
+
+class TestRunGraph:
+    def test_shared_dependency_runs_once(self, diamond):
+        ran = []
+        lock = threading.Lock()
+
+        def run_task(task):
+            with lock:
+                ran.append(task.label)
+            return 0
+
+        results = run_graph(Workspace(diamond), ["ci"], run_task, jobs=4)
+        assert sorted(ran) == ["ci", "codegen", "lint", "test"]
+        assert exit_code(results, ["ci"]) == 0
+
+    def test_independent_branch_not_held_back(self, make_task):
+        # "fast2" depends only on "fast1", so it must finish before the slow task does
+        tasks = [
+            make_task("slow"),
+            make_task("fast1"),
+            make_task("fast2", depends_on=["fast1"]),
+            make_task("all", depends_on=["slow", "fast2"]),
+        ]
+        finished = []
+
+        def run_task(task):
+            if task.label == "slow":
+                time.sleep(0.3)
+            finished.append(task.label)
+            return 0
+
+        run_graph(Workspace(tasks), ["all"], run_task, jobs=4)
+        assert finished.index("fast2") < finished.index("slow")
+
+    def test_failure_skips_dependents(self, make_task):
+        tasks = [
+            make_task("bad"),
+            make_task("mid", depends_on=["bad"]),
+            make_task("top", depends_on=["mid"]),
+        ]
+        results = run_graph(Workspace(tasks), ["top"], lambda task: 5 if task.label == "bad" else 0)
+        assert results == {"bad": 5, "mid": None, "top": None}
+        assert exit_code(results, ["top"]) == 5
+
+    def test_exception_fails_the_task_only(self, make_task, capsys):
+        tasks = [make_task("bad"), make_task("mid", depends_on=["bad"]), make_task("other")]
+
+        def run_task(task):
+            if task.label == "bad":
+                raise FileNotFoundError(2, "No such file or directory", "nope")
+            return 0
+
+        results = run_graph(Workspace(tasks), ["mid", "other"], run_task, jobs=2)
+        assert results == {"bad": LAUNCH_FAILED, "mid": None, "other": 0}
+        assert "task 'bad' could not run" in capsys.readouterr().err
+
+    def test_priority_orders_ready_tasks_within_job_limit(self, make_task):
+        tasks = [
+            make_task("short"),
+            make_task("long"),
+            make_task("all", depends_on=["short", "long"]),
+        ]
+        started = []
+
+        def run_task(task):
+            started.append(task.label)
+            return 0
+
+        run_graph(Workspace(tasks), ["all"], run_task, jobs=1, priority={"long": 5, "short": 1})
+        assert started == ["long", "short", "all"]
+        started.clear()
+        run_graph(Workspace(tasks), ["all"], run_task, jobs=1)
+        assert started == ["short", "long", "all"]
+
+    def test_job_limit_bounds_concurrency(self, make_task):
+        tasks = [make_task(f"t{i}") for i in range(6)] + [
+            make_task("all", depends_on=[f"t{i}" for i in range(6)])
+        ]
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def run_task(task):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return 0
+
+        run_graph(Workspace(tasks), ["all"], run_task, jobs=2)
+        assert peak[0] == 2
+
+    def test_fail_fast_stops_starting_tasks(self, make_task, capsys):
+        tasks = [
+            make_task("bad"),
+            make_task("other"),
+            make_task("all", depends_on=["bad", "other"]),
+        ]
+        started = []
+
+        def run_task(task):
+            started.append(task.label)
+            return 1 if task.label == "bad" else 0
+
+        results = run_graph(Workspace(tasks), ["all"], run_task, jobs=1, keep_going=False)
+        assert started == ["bad"]
+        assert results == {"bad": 1, "all": None, "other": None}
+        assert "stopped after 'bad' failed" in capsys.readouterr().out
+
+    def test_keep_going_runs_independent_tasks(self, make_task):
+        tasks = [
+            make_task("bad"),
+            make_task("other"),
+            make_task("all", depends_on=["bad", "other"]),
+        ]
+        results = run_graph(
+            Workspace(tasks), ["all"], lambda task: 1 if task.label == "bad" else 0, jobs=1
+        )
+        assert results == {"bad": 1, "all": None, "other": 0}
+
+    def test_multiple_targets_share_dependencies(self, diamond):
+        ran = []
+        results = run_graph(
+            Workspace(diamond),
+            ["lint", "test"],
+            lambda task: ran.append(task.label) or 0,
+        )
+        assert sorted(ran) == ["codegen", "lint", "test"]
+        assert set(results) == {"codegen", "lint", "test"}
+
+
+class TestEstimates:
+    @pytest.fixture
+    def graph(self, diamond):
+        # codegen -> lint -> ci and codegen -> test -> ci
+        return build_graph(Workspace(diamond), ["ci"])
+
+    def test_critical_paths(self, graph):
+        estimates = {"codegen": 1.0, "lint": 2.0, "test": 5.0, "ci": 1.0}
+        paths = critical_paths(*graph, estimates)
+        assert paths == {"ci": 1.0, "lint": 3.0, "test": 6.0, "codegen": 7.0}
+
+    def test_unknown_tasks_use_mean_estimate(self, graph):
+        paths = critical_paths(*graph, {"codegen": 2.0, "ci": 4.0})
+        assert paths["lint"] == 3.0 + 4.0
+
+    def test_estimate_duration(self, graph):
+        estimates = {"codegen": 1.0, "lint": 2.0, "test": 5.0, "ci": 1.0}
+        assert estimate_duration(*graph, estimates, jobs=4) == 7.0
+        assert estimate_duration(*graph, estimates, jobs=1) == 9.0
+
+    def test_run_prints_estimate(self, diamond, capsys):
+        tasks = diamond
+        tasks[-1].run(Workspace(tasks), jobs=1, estimates={"codegen": 1.5})
+        assert "Estimated duration: 6.0s" in capsys.readouterr().out
+
+    def test_run_prints_slow_estimate(self, diamond, capsys):
+        tasks = diamond
+        tasks[-1].run(
+            Workspace(tasks), jobs=1, estimates={"codegen": 1.5}, slow_estimates={"codegen": 3.0}
+        )
+        assert "Estimated duration: 6.0s (slow runs: 12.0s)" in capsys.readouterr().out
+
+    def test_run_records_durations_of_executed_tasks(self, make_task):
+        tasks = [make_task("bad"), make_task("never", depends_on=["bad"])]
+        tasks[0].command = "exit 1"
+        durations = {}
+        tasks[1].run(Workspace(tasks), jobs=1, durations=durations)
+        assert list(durations) == ["bad"]
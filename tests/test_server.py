@@ -0,0 +1,109 @@
+import json
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from taskrun.server import TaskServer, send_request
+
+
+def _write_tasks(project, tasks):
+    vscode = project / ".vscode"
+    vscode.mkdir(parents=True, exist_ok=True)
+    path = vscode / "tasks.json"
+    path.write_text(json.dumps({"version": "2.0.0", "tasks": tasks}))
+    return path
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "s.sock")
+    server = TaskServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+
+
+class TestTaskServer:
+    def test_ping(self, server):
+        _, path = server
+        assert send_request({"op": "ping"}, path) == {"ok": True}
+
+    def test_socket_is_private_to_its_user(self, server):
+        _, path = server
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    def test_list_and_reload_on_change(self, server, tmp_path):
+        _, path = server
+        project = tmp_path / "project"
+        tasks_file = _write_tasks(project, [{"label": "build"}, {"label": "x", "hide": True}])
+        response = send_request({"op": "list", "cwd": str(project)}, path)
+        assert response == {"ok": True, "labels": ["build"]}
+
+        _write_tasks(project, [{"label": "build"}, {"label": "test"}])
+        past = time.time() - 5
+        os.utime(tasks_file, (past, past))  # make the change visible even on coarse mtimes
+        response = send_request({"op": "list", "cwd": str(project / "sub")}, path)
+        assert response["labels"] == ["build", "test"]
+
+    def test_query_ranks_fuzzy_matches(self, server, tmp_path):
+        _, path = server
+        project = tmp_path / "project"
+        _write_tasks(project, [{"label": "lint:tests"}, {"label": "build"}, {"label": "tests"}])
+        response = send_request({"op": "query", "cwd": str(project), "query": "tst"}, path)
+        assert response == {"ok": True, "labels": ["tests", "lint:tests"]}
+
+    def test_resolve(self, server, tmp_path):
+        _, path = server
+        project = tmp_path / "project"
+        _write_tasks(project, [{"label": "build", "command": "make -C ${workspaceFolder}"}])
+        response = send_request({"op": "resolve", "cwd": str(project), "label": "build"}, path)
+        assert response["task"]["command"] == f"make -C {project}"
+        assert response["task"]["type"] == "shell"
+
+    def test_run_streams_output(self, server, tmp_path, capsys):
+        _, path = server
+        project = tmp_path / "project"
+        _write_tasks(
+            project,
+            [
+                {"label": "dep", "command": "echo from-dep"},
+                {"label": "main", "command": "echo from-main; exit 3", "dependsOn": "dep"},
+            ],
+        )
+        response = send_request({"op": "run", "cwd": str(project), "label": "main"}, path)
+        assert response == {"ok": True, "exit": 3}
+        out = capsys.readouterr().out
+        assert out.index("from-dep") < out.index("from-main")
+
+    def test_resolve_and_run_use_the_clients_cwd_and_env(self, server, tmp_path, capsys):
+        srv, path = server
+        project = tmp_path / "project"
+        (project / "sub").mkdir(parents=True)
+        _write_tasks(project, [{"label": "show", "command": "echo ${cwd} ${env:WHO} $WHO"}])
+        request = {"label": "show", "cwd": str(project / "sub"), "env": {"WHO": "client"}}
+        response = send_request({"op": "resolve", **request}, path)
+        assert response["task"]["command"] == f"echo {project / 'sub'} client $WHO"
+
+        assert send_request({"op": "run", **request}, path) == {"ok": True, "exit": 0}
+        out = capsys.readouterr().out
+        assert "Running task: show" in out
+        assert f"{project / 'sub'} client client\n" in out
+        # Nothing expanded for this client is cached for the next one
+        assert not srv.workspaces.get(str(project)).get("show").materialized
+        response = send_request({"op": "resolve", **request, "env": {"WHO": "other"}}, path)
+        assert response["task"]["command"].endswith("other $WHO")
+
+    def test_errors_reported(self, server, tmp_path):
+        _, path = server
+        project = tmp_path / "project"
+        _write_tasks(project, [{"label": "build"}])
+        response = send_request({"op": "resolve", "cwd": str(project), "label": "nope"}, path)
+        assert response["ok"] is False and "nope" in response["error"]
+
+    def test_no_daemon(self, tmp_path):
+        assert send_request({"op": "ping"}, str(tmp_path / "missing.sock")) is None
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+# Modules the --list / --choice-only --label paths must not pay for
+HEAVY_MODULES = ["simple_term_menu", "json5", "subprocess", "concurrent.futures", "platform"]
+
+PROBE = """
+import json, sys
+from taskrun.cli import main
+sys.argv = ["taskrun"] + sys.argv[1:]
+main()
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _loaded_modules(tmp_path, *args):
+    project = tmp_path / "project"
+    (project / ".vscode").mkdir(parents=True, exist_ok=True)
+    (project / ".vscode" / "tasks.json").write_text(
+        "{\n  // JSONC, so the cold parse needs the comment-stripping tier\n"
+        + json.dumps({"tasks": [{"label": "build"}, {"label": "test"}]})[1:]
+    )
+    env = dict(os.environ, HOME=str(tmp_path))
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *args],
+        cwd=str(project),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(json.loads(result.stdout.splitlines()[-1])), result.stdout
+
+
+class TestImportBudget:
+    def test_list_avoids_heavy_modules(self, tmp_path):
+        modules, out = _loaded_modules(tmp_path, "--list")
+        assert out.splitlines()[:2] == ["build", "test"]
+        assert [m for m in HEAVY_MODULES if m in modules] == []
+
+    def test_choice_only_label_avoids_heavy_modules(self, tmp_path):
+        modules, out = _loaded_modules(tmp_path, "--choice-only", "--label", "test")
+        assert out.splitlines()[0] == "test"
+        assert [m for m in HEAVY_MODULES if m in modules] == []
+
+    def test_query_avoids_heavy_modules(self, tmp_path):
+        modules, out = _loaded_modules(tmp_path, "--query", "tst")
+        assert out.splitlines()[0] == "test"
+        assert [m for m in HEAVY_MODULES if m in modules] == []
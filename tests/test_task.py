@@ -1,4 +1,25 @@
-from taskrun.task import Task
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from taskrun.task import (
+    MissingInputError,
+    RunControl,
+    RunOptions,
+    Task,
+    base_environment,
+    input_env_var,
+    overlay_environment,
+    resolve_inputs,
+    run_tasks,
+    shell_argv,
+    spawn_direct,
+)
+from taskrun.workspace import Workspace
 
 
 class TestTaskInit:
@@ -43,3 +64,296 @@ class TestTaskInit:
         assert task.task_type == "shell"
         assert task.depends_on == []
         assert task.hide is False
+
+
+class TestTaskRun:
+    def test_parallel_dependencies_run_concurrently(self, make_task, tmp_path):
+        deps = [make_task(f"dep{i}", "sleep 0.3") for i in range(4)]
+        parent = make_task("all", "true", depends_on=[d.label for d in deps])
+        start = time.monotonic()
+        ret = parent.run(Workspace(deps + [parent]), jobs=4)
+        assert ret == 0
+        assert time.monotonic() - start < 1.0
+
+    def test_jobs_caps_concurrency(self, make_task, tmp_path):
+        deps = [make_task(f"dep{i}", "sleep 0.2") for i in range(3)]
+        parent = make_task("all", "true", depends_on=[d.label for d in deps])
+        start = time.monotonic()
+        assert parent.run(Workspace(deps + [parent]), jobs=1) == 0
+        assert time.monotonic() - start >= 0.6
+
+    def test_failed_parallel_dependency_fails_parent(self, make_task, tmp_path):
+        marker = tmp_path / "ran"
+        ok = make_task("ok", "true")
+        bad = make_task("bad", "exit 3")
+        parent = make_task("all", f"touch {marker}", depends_on=["ok", "bad"])
+        assert parent.run(Workspace([ok, bad, parent])) == 3
+        assert not marker.exists()
+
+    def test_sequence_stops_on_first_failure(self, make_task, tmp_path):
+        marker = tmp_path / "ran"
+        bad = make_task("bad", "exit 2")
+        after = make_task("after", f"touch {marker}")
+        parent = make_task("all", "true", depends_on=["bad", "after"], depends_order="sequence")
+        assert parent.run(Workspace([bad, after, parent])) == 2
+        assert not marker.exists()
+
+
+class TestDeferredTask:
+    def test_resolved_on_first_access(self):
+        calls = []
+
+        def resolve():
+            calls.append(1)
+            return {"command": "make", "args": ["all"], "cwd": "/src", "env": {}}
+
+        task = Task.deferred("build", "shell", [], "parallel", "/src", False, resolve)
+        assert not task.materialized
+        assert task.label == "build"
+        assert task.args == ["all"]
+        assert task.command == "make"
+        assert task.materialized
+        assert calls == [1]
+
+    def test_unknown_attribute_raises(self):
+        task = Task.deferred("build", "shell", [], "parallel", "/src", False, dict)
+        with pytest.raises(AttributeError):
+            task.missing
+        assert not task.materialized
+
+    def test_run_materializes_only_reachable_tasks(self):
+        def resolve():
+            return {"command": "true", "args": [], "cwd": "/tmp", "env": None}
+
+        tasks = [
+            Task.deferred("dep", "shell", [], "parallel", "/tmp", False, resolve),
+            Task.deferred("top", "shell", ["dep"], "parallel", "/tmp", False, resolve),
+            Task.deferred("other", "shell", [], "parallel", "/tmp", False, resolve),
+        ]
+        assert tasks[1].run(Workspace(tasks)) == 0
+        assert [t.materialized for t in tasks] == [True, True, False]
+
+
+class TestEnvironment:
+    def test_overlay_shares_base(self):
+        first = overlay_environment({"A": "1"})
+        second = overlay_environment({})
+        assert first.maps[-1] is second.maps[-1] is base_environment()
+        assert first["A"] == "1"
+
+    def test_overlay_writes_do_not_touch_base(self):
+        env = overlay_environment({})
+        env["TASKRUN_ONLY_HERE"] = "x"
+        assert "TASKRUN_ONLY_HERE" not in base_environment()
+
+    def test_spawn_env_inherits_without_overrides(self, make_task):
+        task = make_task("t", "true")
+        task.env = overlay_environment({})
+        assert task.spawn_env() is None
+
+    def test_spawn_env_flattens_overlay(self, make_task, tmp_path):
+        out = tmp_path / "out"
+        task = make_task("t", f'printf "%s" "$TASKRUN_TEST_OVERLAY" > {out}')
+        task.env = overlay_environment({"TASKRUN_TEST_OVERLAY": "hello"})
+        env = task.spawn_env()
+        assert type(env) is dict and env["TASKRUN_TEST_OVERLAY"] == "hello"
+        assert task.execute() == 0
+        assert out.read_text() == "hello"
+
+
+class TestResolveInputs:
+    DEFS = {
+        "target": {"id": "target", "type": "promptString", "default": "debug"},
+        "name": {"id": "name", "type": "promptString"},
+    }
+
+    def test_env_var_name(self):
+        assert input_env_var("build.target-os") == "TASKRUN_INPUT_BUILD_TARGET_OS"
+
+    def test_answers_then_env_then_prompt(self, monkeypatch):
+        monkeypatch.setenv("TASKRUN_INPUT_NAME", "from-env")
+        monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("prompted"))
+        resolved = resolve_inputs({"target", "name"}, self.DEFS, answers={"target": "release"})
+        assert resolved == {"target": "release", "name": "from-env"}
+
+    def test_non_interactive_uses_default_or_fails(self, monkeypatch):
+        monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("prompted"))
+        assert resolve_inputs({"target"}, self.DEFS, interactive=False) == {"target": "debug"}
+        with pytest.raises(MissingInputError, match="--input name=VALUE"):
+            resolve_inputs({"name"}, self.DEFS, interactive=False)
+
+
+class TestRunTasksInputs:
+    def _workspace(self, make_task, tmp_path):
+        out = tmp_path / "out"
+        tasks = [
+            make_task("a", f"echo a-${{input:name}} >> {out}"),
+            make_task("b", f"echo b-${{input:name}} >> {out}"),
+            make_task("all", "true", depends_on=["a", "b"]),
+        ]
+        inputs = [{"id": "name", "type": "promptString", "description": "Name"}]
+        return Workspace(tasks, inputs), out
+
+    def test_shared_input_prompted_once_before_any_task(self, make_task, tmp_path, monkeypatch):
+        workspace, out = self._workspace(make_task, tmp_path)
+        prompts = []
+
+        def fake_input(prompt):
+            assert not out.exists()  # nothing has started yet
+            prompts.append(prompt)
+            return "x"
+
+        monkeypatch.setattr("builtins.input", fake_input)
+        answers = {}
+        results = run_tasks(workspace, ["all"], jobs=2, answers=answers)
+        assert prompts == ["Name: "]
+        assert sorted(out.read_text().split()) == ["a-x", "b-x"]
+        assert answers == {"name": "x"}
+        assert set(results.values()) == {0}
+
+    def test_missing_input_fails_before_any_task(self, make_task, tmp_path):
+        workspace, out = self._workspace(make_task, tmp_path)
+        with pytest.raises(MissingInputError):
+            run_tasks(workspace, ["all"], jobs=2, interactive=False)
+        assert not out.exists()
+
+
+class TestRunControl:
+    def test_cancel_stops_running_and_pending_tasks(self, make_task, tmp_path):
+        marker = tmp_path / "ran"
+        slow = make_task("slow", "sleep 10; true")
+        after = make_task("after", f"touch {marker}")
+        control = RunControl()
+        results = {}
+        thread = threading.Thread(
+            target=lambda: results.update(
+                run_tasks(
+                    Workspace([slow, after]),
+                    ["slow", "after"],
+                    jobs=1,
+                    run_options=RunOptions(control=control),
+                )
+            )
+        )
+        start = time.monotonic()
+        thread.start()
+        time.sleep(0.3)
+        control.cancel()
+        thread.join(5)
+        assert time.monotonic() - start < 5
+        assert results == {"slow": -signal.SIGTERM, "after": -signal.SIGTERM}
+        assert not marker.exists()
+
+    def test_only_runs_the_given_part_of_the_graph(self, make_task, tmp_path):
+        out = tmp_path / "out"
+        tasks = [
+            make_task("a", f"echo a >> {out}"),
+            make_task("b", f"echo b >> {out}", depends_on=["a"]),
+        ]
+        results = run_tasks(Workspace(tasks), ["b"], only={"b"})
+        assert results == {"b": 0}
+        assert out.read_text().split() == ["b"]
+
+
+class TestShellArgv:
+    def test_plain_words_need_no_shell(self):
+        assert shell_argv("make build") == ["make", "build"]
+        assert shell_argv("make 'a b' CFLAGS=-O2") == ["make", "a b", "CFLAGS=-O2"]
+
+    def test_shell_syntax_needs_a_shell(self):
+        for command in ["make && ls", "ls *.c", "echo $HOME", "FOO=1 make", "cd src", "exit 3", ""]:
+            assert shell_argv(command) is None, command
+
+
+class TestDirectSpawn:
+    def test_simple_command_skips_subprocess(self, make_task, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "in").write_text("hello\n")
+
+        def no_popen(*args, **kwargs):
+            raise AssertionError("Popen used")
+
+        monkeypatch.setattr("subprocess.Popen", no_popen)
+        with open(tmp_path / "out", "wb") as out:
+            task = make_task("cat", "cat in", root=tmp_path)
+            assert task.execute(stdout=out.fileno()) == 0
+        assert (tmp_path / "out").read_text() == "hello\n"
+        assert make_task("false", "false", root=tmp_path).execute() == 1
+
+    def test_shell_syntax_and_other_cwd_use_subprocess(self, make_task, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        other = tmp_path / "other"
+        other.mkdir()
+        assert spawn_direct(["true"], cwd=str(other)) is None
+        assert make_task("exit", "exit 3", root=tmp_path).execute() == 3
+        marker = other / "ran"
+        assert make_task("touch", f"touch {marker}", root=other).execute() == 0
+        assert marker.exists()
+
+    def test_other_cwd_still_skips_the_shell(self, make_task, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        other = tmp_path / "other"
+        other.mkdir()
+        calls = []
+        popen = subprocess.Popen
+
+        def recording_popen(args, **kwargs):
+            calls.append((args, kwargs.get("shell", False)))
+            return popen(args, **kwargs)
+
+        monkeypatch.setattr("subprocess.Popen", recording_popen)
+        marker = other / "ran"
+        assert make_task("touch", f"touch {marker}", root=other).execute() == 0
+        assert marker.exists()
+        assert calls == [(["touch", str(marker)], False)]
+
+    def test_unknown_program_falls_back_to_the_shell(self, make_task, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        task = make_task("missing", "no-such-program-here", root=tmp_path)
+        assert task.execute(stderr=subprocess.DEVNULL) == 127
+
+    @pytest.mark.parametrize("cwd_is_ours", [True, False])
+    def test_scripts_the_kernel_cannot_run_fall_back_to_the_shell(
+        self, make_task, tmp_path, monkeypatch, cwd_is_ours
+    ):
+        monkeypatch.chdir(tmp_path if cwd_is_ours else "/")
+        script = tmp_path / "script.sh"
+        script.write_text("echo no shebang > ran\n")  # ENOEXEC when executed directly
+        script.chmod(0o755)
+        task = make_task("a", "./script.sh", root=tmp_path)
+        assert task.execute() == 0
+        assert (tmp_path / "ran").read_text() == "no shebang\n"
+        script.chmod(0o644)  # EACCES, which the shell reports as 126
+        assert task.execute(stderr=subprocess.DEVNULL) == 126
+
+
+REPLACE = """
+import os, sys
+from taskrun.task import Task
+print(os.getpid(), flush=True)
+task = Task("t", "sh", ["-c", sys.argv[1]], None, None, "process", [], "parallel", ".", False)
+task.replace_process()
+"""
+
+
+class TestReplaceProcess:
+    def test_task_takes_over_the_process(self):
+        result = subprocess.run(
+            [sys.executable, "-c", REPLACE, "echo $$; exit 5"], capture_output=True, text=True
+        )
+        lines = result.stdout.splitlines()
+        assert result.returncode == 5
+        assert lines[0] == lines[-1]  # the task ran in taskrun's own process
+        assert "Running task: t" in lines
+
+    def test_script_without_shebang_runs_through_the_shell(self, tmp_path):
+        (tmp_path / "script.sh").write_text("echo from-script; exit 4\n")
+        (tmp_path / "script.sh").chmod(0o755)
+        code = (
+            "from taskrun.task import Task\n"
+            f"Task('t', './script.sh', [], {str(tmp_path)!r}, None, 'shell', [],"
+            " 'parallel', '.', False).replace_process()\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        assert result.returncode == 4
+        assert result.stdout.splitlines()[-1] == "from-script"
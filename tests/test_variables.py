@@ -1,6 +1,6 @@
 import os
 
-from taskrun.variables import collect_input_ids, expand_variables
+from taskrun.variables import VariableContext, collect_input_ids, expand_variables
 
 
 class TestCollectInputIds:
@@ -75,3 +75,42 @@ class TestExpandVariables:
     def test_no_variables(self):
         result = expand_variables("plain string", "/root")
         assert result == "plain string"
+
+    def test_unknown_variable_left_intact(self):
+        result = expand_variables("${file} ${workspaceFolder}", "/root")
+        assert result == "${file} /root"
+
+    def test_single_pass_does_not_reexpand_values(self, monkeypatch):
+        monkeypatch.setenv("TASKRUN_TEST_VAR", "${workspaceFolder}")
+        result = expand_variables("${env:TASKRUN_TEST_VAR}", "/root")
+        assert result == "${workspaceFolder}"
+
+
+class TestVariableContext:
+    def test_values_computed_once(self, monkeypatch):
+        calls = []
+        real_getcwd = os.getcwd
+
+        def counting_getcwd():
+            calls.append(1)
+            return real_getcwd()
+
+        monkeypatch.setattr(os, "getcwd", counting_getcwd)
+        context = VariableContext("/root")
+        for _ in range(3):
+            expand_variables("${cwd}/x", "/root", context=context)
+        assert len(calls) == 1
+
+    def test_no_placeholders_skips_context(self, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: 1 / 0)
+        assert expand_variables("make all", "/root") == "make all"
+        assert expand_variables("${workspaceFolder}", "/root") == "/root"
+
+    def test_unsupported_name(self):
+        assert VariableContext("/root").get("file") is None
+
+    def test_context_with_another_cwd_and_environment(self, monkeypatch):
+        monkeypatch.setenv("WHO", "taskrun")
+        context = VariableContext("/root", cwd="/client", environ={"WHO": "client", "HOME": "/h"})
+        value = expand_variables("${cwd} ${env:WHO} ${userHome}", "/root", context=context)
+        assert value == "/client client /h"
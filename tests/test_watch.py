@@ -0,0 +1,223 @@
+import sys
+import time
+
+import pytest
+
+from taskrun.scheduler import build_graph
+from taskrun.watch import InotifyWatcher, PollingWatcher, Watcher, affected_labels, watch
+from taskrun.workspace import Workspace
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+class _ScriptedWatcher(Watcher):
+    """Hands out queued batches of changes, each once the run before it has finished."""
+
+    def __init__(self, batches, log, expected_lines):
+        self.batches = list(batches)
+        self.log = log
+        self.expected_lines = list(expected_lines)
+
+    def changes(self, debounce=0):
+        expected = self.expected_lines.pop(0)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if self.log.exists() and len(self.log.read_text().split()) >= expected:
+                break
+            time.sleep(0.02)
+        return self.batches.pop(0)
+
+
+class TestAffectedLabels:
+    def _workspace(self, make_task, root):
+        _write(root / "src" / "a.c", "int a;")
+        _write(root / "src" / "b.py", "b = 1")
+        return Workspace(
+            [
+                make_task("build", root=root, extensions={"inputs": ["src/*.c"]}),
+                make_task("lint", root=root, extensions={"inputs": ["src/*.py"]}),
+                make_task("test", root=root, depends_on=["build"]),
+                make_task("all", root=root, depends_on=["test", "lint"]),
+            ],
+            root_dir=str(root),
+        )
+
+    def test_changed_input_reruns_task_and_dependents(self, make_task, tmp_path):
+        workspace = self._workspace(make_task, tmp_path)
+        graph = build_graph(workspace, ["all"])
+        previous = {}
+        affected_labels(workspace, graph, set(), previous)
+        changed = {str(tmp_path / "src" / "a.c")}
+        assert affected_labels(workspace, graph, changed, previous) == {"build", "test", "all"}
+
+    def test_created_and_deleted_files_count(self, make_task, tmp_path):
+        workspace = self._workspace(make_task, tmp_path)
+        graph = build_graph(workspace, ["all"])
+        previous = {}
+        affected_labels(workspace, graph, set(), previous)
+        _write(tmp_path / "src" / "c.py", "c = 1")
+        changed = {str(tmp_path / "src" / "c.py")}
+        assert affected_labels(workspace, graph, changed, previous) == {"lint", "all"}
+        (tmp_path / "src" / "b.py").unlink()
+        changed = {str(tmp_path / "src" / "b.py")}
+        assert affected_labels(workspace, graph, changed, previous) == {"lint", "all"}
+
+    def test_unrelated_change_reruns_nothing(self, make_task, tmp_path):
+        workspace = self._workspace(make_task, tmp_path)
+        graph = build_graph(workspace, ["all"])
+        changed = {str(tmp_path / "README")}
+        assert affected_labels(workspace, graph, changed, {}) == set()
+
+    def test_without_declared_inputs_everything_reruns(self, make_task, tmp_path):
+        workspace = Workspace(
+            [make_task("a", root=tmp_path), make_task("b", root=tmp_path, depends_on=["a"])]
+        )
+        graph = build_graph(workspace, ["b"])
+        assert affected_labels(workspace, graph, {str(tmp_path / "x")}, {}) == {"a", "b"}
+
+
+class TestWatchers:
+    def test_debounce_merges_a_burst(self):
+        class Bursty(Watcher):
+            reads = [{"a"}, {"b"}, {"c"}, set(), {"d"}, set()]
+
+            def read(self, timeout):
+                return self.reads.pop(0)
+
+        watcher = Bursty()
+        assert watcher.changes() == {"a", "b", "c"}
+        assert watcher.changes() == {"d"}
+
+    def test_polling_sees_modified_created_and_deleted_files(self, tmp_path):
+        _write(tmp_path / "a.txt", "a")
+        _write(tmp_path / "node_modules" / "x.js", "x")
+        watcher = PollingWatcher(str(tmp_path), interval=0.01)
+        assert watcher.read(0.05) == set()
+        _write(tmp_path / "a.txt", "changed")
+        _write(tmp_path / "sub" / "b.txt", "b")
+        _write(tmp_path / "node_modules" / "x.js", "ignored")
+        assert watcher.read(1) == {str(tmp_path / "a.txt"), str(tmp_path / "sub" / "b.txt")}
+        (tmp_path / "a.txt").unlink()
+        assert watcher.read(1) == {str(tmp_path / "a.txt")}
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+    def test_inotify_sees_changes_in_new_directories_and_extra_files(self, tmp_path):
+        config = tmp_path / ".vscode" / "tasks.json"
+        _write(config, "{}")
+        _write(tmp_path / ".vscode" / "settings.json", "{}")
+        watcher = InotifyWatcher(str(tmp_path), [str(config)])
+        try:
+            (tmp_path / "sub").mkdir()
+            watcher.read(0.1)
+            _write(tmp_path / "sub" / "a.c", "int a;")
+            _write(tmp_path / ".vscode" / "settings.json", "{ }")
+            _write(config, "{ }")
+            assert watcher.changes(debounce=0.05) == {str(tmp_path / "sub" / "a.c"), str(config)}
+        finally:
+            watcher.close()
+
+
+class TestWatch:
+    def test_reruns_affected_subgraph_and_reloads_on_config_change(self, make_task, tmp_path):
+        log = tmp_path / "log"
+        config = tmp_path / ".vscode" / "tasks.json"
+        _write(tmp_path / "src" / "a.c", "int a;")
+        loads = []
+
+        def load():
+            loads.append(1)
+            return Workspace(
+                [
+                    make_task("gen", f"echo gen >> {log}", root=tmp_path),
+                    make_task(
+                        "build",
+                        f"echo build >> {log}",
+                        root=tmp_path,
+                        depends_on=["gen"],
+                        extensions={"inputs": ["src/*.c"]},
+                    ),
+                ],
+                root_dir=str(tmp_path),
+            )
+
+        batches = [{str(tmp_path / "src" / "a.c")}, {str(tmp_path / "other")}, {str(config)}]
+        watcher = _ScriptedWatcher(batches, log, [2, 3, 3])
+        watch(load, [str(config)], ["build"], watcher=watcher, iterations=3)
+        assert log.read_text().split() == ["gen", "build", "build", "gen", "build"]
+        assert len(loads) == 2
+
+    def test_new_changes_cancel_a_running_run(self, make_task, tmp_path):
+        log = tmp_path / "log"
+        marker = tmp_path / "started"
+        once = tmp_path / "once"
+        # Only the first run is slow
+        command = (
+            f"if [ ! -e {once} ]; then touch {once} {marker}; sleep 10; fi; echo slow >> {log}"
+        )
+
+        _write(tmp_path / "x", "")
+
+        def load():
+            task = make_task("slow", command, root=tmp_path, extensions={"inputs": ["x"]})
+            return Workspace([task], root_dir=str(tmp_path))
+
+        class OneChange(Watcher):
+            def changes(self, debounce=0):
+                while not marker.exists():
+                    time.sleep(0.02)
+                return {str(tmp_path / "x")}
+
+        start = time.monotonic()
+        watch(load, [], ["slow"], watcher=OneChange(), iterations=2)
+        assert time.monotonic() - start < 5
+        assert log.read_text().split() == ["slow"]
+
+    def test_task_writing_into_the_tree_does_not_retrigger_itself(
+        self, make_task, tmp_path, capsys
+    ):
+        out = tmp_path / "build" / "out.txt"
+        marker = tmp_path / "started"
+        edit = tmp_path / "src" / "a.c"
+        command = f"touch {marker}; sleep 0.3; mkdir -p build; date >> {out}"
+
+        def load():
+            return Workspace([make_task("build", command, root=tmp_path)], root_dir=str(tmp_path))
+
+        class Events(Watcher):
+            """The task's own write, seen during and after its run, then a user edit."""
+
+            def __init__(self):
+                self.steps = [self.during, self.after, self.edit]
+                self.printed = ""
+
+            def wait_for(self, condition):
+                deadline = time.monotonic() + 5
+                while not condition() and time.monotonic() < deadline:
+                    time.sleep(0.02)
+
+            def during(self):
+                self.wait_for(marker.exists)
+                return {str(out)}
+
+            def after(self):
+                self.wait_for(lambda: "Watching" in self.read(capsys))
+                return {str(out)}
+
+            def edit(self):
+                _write(edit, "int a;")
+                return {str(edit)}
+
+            def read(self, capsys):
+                self.printed += capsys.readouterr().out
+                return self.printed
+
+            def changes(self, debounce=0):
+                return self.steps.pop(0)()
+
+        events = Events()
+        watch(load, [], ["build"], watcher=events, iterations=2)
+        assert len(out.read_text().splitlines()) == 2
+        assert "cancelling" not in events.read(capsys)
@@ -0,0 +1,64 @@
+from taskrun.workspace import Workspace
+
+
+class TestWorkspace:
+    def test_lookup_by_label(self, make_task):
+        workspace = Workspace([make_task("build"), make_task("test")])
+        assert workspace.get("test").label == "test"
+        assert workspace.get("missing") is None
+        assert "build" in workspace
+        assert len(workspace) == 2
+
+    def test_duplicate_labels_first_wins(self, make_task):
+        first = make_task("build", "make")
+        workspace = Workspace([first, make_task("build", "ninja"), make_task("build")])
+        assert workspace.get("build") is first
+        assert workspace.duplicates == ["build"]
+        assert len(workspace) == 1
+
+    def test_inputs_indexed_by_id(self):
+        inputs_defs = [{"id": "name", "type": "promptString"}, {"id": "env", "type": "pickString"}]
+        workspace = Workspace([], inputs_defs)
+        assert workspace.inputs["env"]["type"] == "pickString"
+        assert workspace.inputs_defs == inputs_defs
+
+    def test_visible_excludes_hidden(self, make_task):
+        workspace = Workspace([make_task("a"), make_task("b", hide=True), make_task("c")])
+        assert [t.label for t in workspace.visible()] == ["a", "c"]
+
+
+class TestSelect:
+    def _workspace(self, make_task):
+        return Workspace(
+            [
+                make_task("build"),
+                make_task("test:unit"),
+                make_task("test:e2e"),
+                make_task("test:helper", hide=True),
+                make_task("lint [all]"),
+            ]
+        )
+
+    def test_exact_labels_keep_pattern_order(self, make_task):
+        assert self._workspace(make_task).select(["lint [all]", "build"]) == (
+            ["lint [all]", "build"],
+            [],
+        )
+
+    def test_glob_matches_visible_tasks_in_file_order(self, make_task):
+        assert self._workspace(make_task).select(["test:*"]) == (["test:unit", "test:e2e"], [])
+
+    def test_exact_label_may_name_hidden_task(self, make_task):
+        assert self._workspace(make_task).select(["test:helper"]) == (["test:helper"], [])
+
+    def test_regex_matches_whole_label(self, make_task):
+        workspace = self._workspace(make_task)
+        assert workspace.select(["re:test:(unit|e2e)"]) == (["test:unit", "test:e2e"], [])
+        assert workspace.select(["re:unit"]) == ([], ["re:unit"])
+
+    def test_duplicates_removed_and_unmatched_reported(self, make_task):
+        labels, unmatched = self._workspace(make_task).select(
+            ["test:unit", "test:*", "deploy", "x*"]
+        )
+        assert labels == ["test:unit", "test:e2e"]
+        assert unmatched == ["deploy", "x*"]